@@ -1,9 +1,104 @@
 import streamlit as st
+import gc
 import os
 from pathlib import Path
 import json
 import time
-from datetime import datetime
+import uuid
+
+from study_tool import ChatHistory, get_ai_response
+from study_tool.content import (CHAPTER_TOPICS_MD, EXAM_TIPS_HEADING_MD, EXAM_TIPS_SUMMARY_MD, KEY_CONCEPTS_MD,
+                                OVERVIEW_HTML, PAGE_FOOTER_HTML, PAGE_HEADER_HTML, VIDEO_LECTURES_HTML)
+from study_tool.dialogue import INTRODUCTION, DialogueLibrary, DialoguePlayback, topic_title
+from study_tool.economics import LINEAR, POWER, Curve, classify_elasticity, cost_chart_data, market_chart_data
+from study_tool.flashcards import (AGAIN, EASY, GOOD, HARD, DistractorPool, ReviewState, Scheduler,
+                                   generate_cards, quiz_item)
+from study_tool.ingest import Ingestor, PassageIndex
+from study_tool.kbfile import open_knowledge_store
+from study_tool.llm import get_tutor
+from study_tool.metrics import get_metrics
+from study_tool.snapshot import format_startup, load_engine
+from study_tool.storage import SessionStore
+from study_tool.transcripts import TRANSCRIPT_DIR, TranscriptIndex, format_timestamp
+from study_tool.tts import synthesize_dialogue
+
+# Messages kept in memory per session; older ones are spilled to disk
+CHAT_HISTORY_CAP = 100
+# Messages rendered per page of the chat history
+HISTORY_PAGE_SIZE = 20
+
+USER_MESSAGE_HTML = """<div class="chat-message user-message">
+<strong>🙋 You ({}):</strong><br>
+{}
+</div>"""
+
+BOT_MESSAGE_HTML = """<div class="chat-message bot-message">
+<strong>🤖 AI Tutor ({}):</strong><br>
+{}
+</div>"""
+
+# Transcript moments listed per search in the Video Resources tab
+TRANSCRIPT_SEARCH_RESULTS = 10
+
+# Seconds between polls of the dialogue during playback, and a line's time on
+# screen when it has no clip to wait for
+DIALOGUE_LINE_INTERVAL = 0.5
+
+TEACHER_LINE_HTML = """<div class="chat-message bot-message">
+<strong>👨‍🏫 Teacher:</strong><br>
+{}
+</div>"""
+
+STUDENT_LINE_HTML = """<div class="chat-message user-message">
+<strong>👨‍🎓 Student:</strong><br>
+{}
+</div>"""
+
+# Curve kind -> (kind, coefficient slider, shape slider); sliders are (label, min, max, default)
+DEMAND_CONTROLS = {
+    "Linear": (LINEAR, ("Quantity demanded at price 0", 20.0, 200.0, 100.0),
+               ("Quantity lost per unit of price", 0.5, 5.0, 2.0)),
+    "Constant elasticity": (POWER, ("Scale", 100.0, 2000.0, 1000.0),
+                            ("Price elasticity (absolute)", 0.2, 3.0, 1.5)),
+}
+SUPPLY_CONTROLS = {
+    "Linear": (LINEAR, ("Quantity supplied at price 0", 0.0, 50.0, 10.0),
+               ("Quantity added per unit of price", 0.5, 5.0, 1.0)),
+    "Constant elasticity": (POWER, ("Scale", 0.5, 10.0, 2.0),
+                            ("Price elasticity", 0.2, 3.0, 1.0)),
+}
+
+def line_chart_spec(x, y, fold=None, order=None):
+    """Vega-Lite spec for one or more lines, coloured by the "Curve" field"""
+    spec = {
+        "mark": {"type": "line"},
+        "encoding": {
+            "x": {"field": x, "type": "quantitative"},
+            "y": {"field": y, "type": "quantitative"},
+            "color": {"field": "Curve", "type": "nominal"},
+        },
+    }
+    if fold:
+        # Wide columns become (Curve, y) rows
+        spec["transform"] = [{"fold": fold, "as": ["Curve", y]}]
+    if order:
+        # Connect points along this field instead of along the x axis
+        spec["encoding"]["order"] = {"field": order}
+    return spec
+
+
+# Static chart specs: st.line_chart would rebuild an Altair chart on every run
+MARKET_CURVES_SPEC = line_chart_spec("Quantity", "Price", order="Price")
+DEMAND_SHIFT_SPEC = line_chart_spec("Demand shift (%)", "Value",
+                                    fold=["Equilibrium price", "Equilibrium quantity"])
+PER_UNIT_COST_SPEC = line_chart_spec("Quantity", "Cost per unit", fold=["ATC", "AVC", "AFC", "MC"])
+TOTAL_COST_SPEC = line_chart_spec("Quantity", "Cost", fold=["TC", "VC", "FC"])
+
+# (button label, review grade) for the flashcard self-assessment
+FLASHCARD_GRADES = (("🔁 Again", AGAIN), ("😓 Hard", HARD), ("🙂 Good", GOOD), ("😎 Easy", EASY))
+
+# Seconds between refreshes of the admin metrics panel
+ADMIN_PANEL_INTERVAL = 5.0
 
 # Set page configuration
 st.set_page_config(
@@ -12,590 +107,654 @@ st.set_page_config(
     layout="wide"
 )
 
-# Custom CSS for better UI
-st.markdown("""
-<style>
-    .main-header {
-        font-size: 2.5rem;
-        color: #1E88E5;
-        text-align: center;
-        margin-bottom: 2rem;
-    }
-    .feature-box {
-        background-color: #f0f2f6;
-        padding: 20px;
-        border-radius: 10px;
-        margin: 10px 0;
-        color: #000000 !important;
-    }
-    .feature-box h3, .feature-box h4,
-    .feature-box p, .feature-box li {
-        color: #000000 !important;
-    }
-    .chat-message {
-        padding: 15px;
-        border-radius: 10px;
-        margin: 10px 0;
-        color: #000000 !important;
-    }
-    .user-message {
-        background-color: #E3F2FD;
-        border-left: 5px solid #1E88E5;
-    }
-    .bot-message {
-        background-color: #F1F8E9;
-        border-left: 5px solid #66BB6A;
-    }
-    .stButton>button {
-        width: 100%;
-        background-color: #1E88E5;
-        color: white;
-    }
-</style>
-""", unsafe_allow_html=True)
+# Timing spans and counters; no-ops unless STUDY_TOOL_METRICS is set
+metrics = get_metrics()
+run_started = time.perf_counter()
+
+# Custom CSS, title and tagline in one element
+st.markdown(PAGE_HEADER_HTML, unsafe_allow_html=True)
+
+@st.cache_resource
+def load_session_store():
+    """SQLite store for chat history and notes, shared by all sessions"""
+    return SessionStore()
+
+
+def current_student_id():
+    """Identify the student by a query parameter so history survives reloads and redeploys"""
+    if "student" not in st.query_params:
+        st.query_params["student"] = uuid.uuid4().hex
+    return st.query_params["student"]
+
 
 # Initialize session state
+if 'student_id' not in st.session_state:
+    st.session_state.student_id = current_student_id()
 if 'chat_history' not in st.session_state:
-    st.session_state.chat_history = []
+    st.session_state.chat_history = ChatHistory(max_messages=CHAT_HISTORY_CAP, store=load_session_store(),
+                                                student_id=st.session_state.student_id)
+if 'history_page' not in st.session_state:
+    st.session_state.history_page = 0
+if 'dialogue_topic' not in st.session_state:
+    st.session_state.dialogue_topic = INTRODUCTION
 if 'study_notes' not in st.session_state:
-    st.session_state.study_notes = {}
-
-# Economics content based on typical microeconomics chapters
-ECONOMICS_KNOWLEDGE_BASE = {
-    "demand": {
-        "definition": "Demand refers to the quantity of a good or service that consumers are willing and able to purchase at various prices during a given period of time.",
-        "law": "The Law of Demand states that, other things being equal (ceteris paribus), as the price of a good increases, the quantity demanded decreases, and vice versa.",
-        "factors": [
-            "Price of the commodity",
-            "Income of the consumer",
-            "Prices of related goods (substitutes and complements)",
-            "Consumer preferences and tastes",
-            "Consumer expectations about future prices",
-            "Number of consumers in the market"
-        ],
-        "types": "Individual demand (single consumer) and Market demand (all consumers)"
-    },
-    "supply": {
-        "definition": "Supply refers to the quantity of a good or service that producers are willing and able to offer for sale at various prices during a given period of time.",
-        "law": "The Law of Supply states that, other things being equal, as the price of a good increases, the quantity supplied increases, and vice versa.",
-        "factors": [
-            "Price of the commodity",
-            "Prices of inputs/factors of production",
-            "Technology",
-            "Number of sellers",
-            "Government policies (taxes and subsidies)",
-            "Expectations about future prices"
-        ]
-    },
-    "equilibrium": {
-        "definition": "Market equilibrium occurs when the quantity demanded equals the quantity supplied at a particular price, called the equilibrium price.",
-        "concept": "At equilibrium, there is no tendency for the price to change as the market clears with no excess demand or supply.",
-        "changes": "Shifts in demand or supply curves will create new equilibrium points with different prices and quantities."
-    },
-    "elasticity": {
-        "definition": "Elasticity measures the responsiveness of quantity demanded or supplied to changes in price or other factors.",
-        "types": [
-            "Price Elasticity of Demand (PED): Responsiveness of quantity demanded to price changes",
-            "Income Elasticity of Demand: Responsiveness to income changes",
-            "Cross Elasticity of Demand: Responsiveness to changes in prices of related goods",
-            "Price Elasticity of Supply: Responsiveness of quantity supplied to price changes"
-        ],
-        "formula": "Elasticity = (% Change in Quantity) / (% Change in Price)",
-        "categories": {
-            "elastic": "When elasticity > 1 (highly responsive)",
-            "inelastic": "When elasticity < 1 (less responsive)",
-            "unitary": "When elasticity = 1 (proportionate change)"
-        }
-    },
-    "consumer_behavior": {
-        "utility": "Utility is the satisfaction or pleasure derived from consuming a good or service.",
-        "marginal_utility": "The additional satisfaction from consuming one more unit of a good.",
-        "law_diminishing": "Law of Diminishing Marginal Utility: As consumption increases, the additional satisfaction from each additional unit decreases.",
-        "consumer_equilibrium": "A consumer is in equilibrium when they maximize total utility given their budget constraint."
-    },
-    "production": {
-        "definition": "Production is the process of transforming inputs (factors of production) into outputs (goods and services).",
-        "factors": ["Land", "Labor", "Capital", "Entrepreneurship"],
-        "short_run": "Period where at least one factor of production is fixed.",
-        "long_run": "Period where all factors of production are variable.",
-        "concepts": [
-            "Total Product (TP): Total output produced",
-            "Marginal Product (MP): Additional output from one more unit of input",
-            "Average Product (AP): Output per unit of input"
-        ]
-    },
-    "costs": {
-        "fixed_costs": "Costs that do not vary with output level (e.g., rent, salaries)",
-        "variable_costs": "Costs that vary directly with output level (e.g., raw materials)",
-        "total_cost": "TC = Fixed Cost + Variable Cost",
-        "marginal_cost": "The additional cost of producing one more unit of output",
-        "average_cost": "Total cost divided by quantity of output"
-    },
-    "market_structures": {
-        "perfect_competition": {
-            "characteristics": "Many buyers and sellers, homogeneous products, free entry/exit, perfect information",
-            "pricing": "Price takers - firms accept market price"
-        },
-        "monopoly": {
-            "characteristics": "Single seller, unique product, barriers to entry, price maker",
-            "pricing": "Firm has market power to set prices"
-        },
-        "monopolistic_competition": {
-            "characteristics": "Many sellers, differentiated products, relatively free entry/exit",
-            "pricing": "Some control over price due to product differentiation"
-        },
-        "oligopoly": {
-            "characteristics": "Few large firms, interdependent decision-making, barriers to entry",
-            "pricing": "Strategic pricing decisions considering rivals' reactions"
-        }
-    }
-}
+    st.session_state.study_notes = PassageIndex(store=load_session_store(),
+                                                student_id=st.session_state.student_id)
+if 'ingestion_jobs' not in st.session_state:
+    st.session_state.ingestion_jobs = {}
 
-def get_ai_response(question):
-    """Generate AI response based on question"""
-    question_lower = question.lower()
-
-    # Search through knowledge base
-    response = ""
-
-    # Check for greetings
-    if any(word in question_lower for word in ["hello", "hi", "hey"]):
-        return "Hello! I'm your AI Economics tutor. I'm here to help you understand economics concepts. Ask me anything about demand, supply, elasticity, consumer behavior, production, costs, or market structures!"
-
-    # Check for specific topics
-    if "demand" in question_lower:
-        topic = ECONOMICS_KNOWLEDGE_BASE["demand"]
-        response = "**Understanding Demand:**\n\n"
-        response += topic['definition'] + "\n\n"
-        response += "**" + topic['law'] + "**\n\n"
-        response += "**Factors affecting demand:**\n"
-        for factor in topic['factors']:
-            response += "- " + factor + "\n"
-        response += "\n**Types:** " + topic['types']
-
-    elif "supply" in question_lower:
-        topic = ECONOMICS_KNOWLEDGE_BASE["supply"]
-        response = "**Understanding Supply:**\n\n"
-        response += topic['definition'] + "\n\n"
-        response += "**" + topic['law'] + "**\n\n"
-        response += "**Factors affecting supply:**\n"
-        for factor in topic['factors']:
-            response += "- " + factor + "\n"
-
-    elif "equilibrium" in question_lower or "market clearing" in question_lower:
-        topic = ECONOMICS_KNOWLEDGE_BASE["equilibrium"]
-        response = "**Market Equilibrium:**\n\n"
-        response += topic['definition'] + "\n\n"
-        response += topic['concept'] + "\n\n"
-        response += "**Important:** " + topic['changes']
-
-    elif "elasticity" in question_lower or "elastic" in question_lower:
-        topic = ECONOMICS_KNOWLEDGE_BASE["elasticity"]
-        response = "**Elasticity:**\n\n"
-        response += topic['definition'] + "\n\n"
-        response += "**Formula:** " + topic['formula'] + "\n\n"
-        response += "**Types of Elasticity:**\n"
-        for elas_type in topic['types']:
-            response += "- " + elas_type + "\n"
-        response += "\n**Categories:**\n"
-        for category, description in topic['categories'].items():
-            response += "- **" + category.title() + ":** " + description + "\n"
-
-    elif any(word in question_lower for word in ["utility", "consumer", "satisfaction"]):
-        topic = ECONOMICS_KNOWLEDGE_BASE["consumer_behavior"]
-        response = "**Consumer Behavior:**\n\n"
-        response += "**Utility:** " + topic['utility'] + "\n\n"
-        response += "**Marginal Utility:** " + topic['marginal_utility'] + "\n\n"
-        response += "**" + topic['law_diminishing'] + "**\n\n"
-        response += "**Consumer Equilibrium:** " + topic['consumer_equilibrium']
-
-    elif "production" in question_lower:
-        topic = ECONOMICS_KNOWLEDGE_BASE["production"]
-        response = "**Production:**\n\n"
-        response += topic['definition'] + "\n\n"
-        response += "**Factors of Production:**\n"
-        for factor in topic['factors']:
-            response += "- " + factor + "\n"
-        response += "\n**Short Run:** " + topic['short_run'] + "\n"
-        response += "**Long Run:** " + topic['long_run'] + "\n\n"
-        response += "**Key Concepts:**\n"
-        for concept in topic['concepts']:
-            response += "- " + concept + "\n"
-
-    elif "cost" in question_lower:
-        topic = ECONOMICS_KNOWLEDGE_BASE["costs"]
-        response = "**Cost Concepts:**\n\n"
-        response += "**Fixed Costs:** " + topic['fixed_costs'] + "\n\n"
-        response += "**Variable Costs:** " + topic['variable_costs'] + "\n\n"
-        response += "**Total Cost:** " + topic['total_cost'] + "\n\n"
-        response += "**Marginal Cost:** " + topic['marginal_cost'] + "\n\n"
-        response += "**Average Cost:** " + topic['average_cost']
-
-    elif any(word in question_lower for word in ["market", "competition", "monopoly", "oligopoly"]):
-        topic = ECONOMICS_KNOWLEDGE_BASE["market_structures"]
-        response = "**Market Structures:**\n\n"
-        for market_type, details in topic.items():
-            response += "**" + market_type.replace('_', ' ').title() + ":**\n"
-            response += "- Characteristics: " + details['characteristics'] + "\n"
-            response += "- Pricing: " + details['pricing'] + "\n\n"
-
-    elif "exam" in question_lower or "tip" in question_lower or "prepare" in question_lower:
-        response = """**Exam Preparation Tips:**
-
-1. **Understand Core Concepts:** Focus on laws of demand and supply, elasticity, and market equilibrium
-2. **Practice Diagrams:** Be able to draw and explain supply-demand curves, shifts, and equilibrium changes
-3. **Learn Formulas:** Memorize elasticity formulas and understand how to apply them
-4. **Real-World Examples:** Connect concepts to current economic events
-5. **Solve Numerical Problems:** Practice calculating elasticity, costs, and equilibrium prices
-6. **Key Terms:** Create flashcards for important definitions
-7. **Past Papers:** Review previous exam questions to understand patterns"""
-
-    elif "difference" in question_lower:
-        if "demand" in question_lower and "supply" in question_lower:
-            response = """**Difference Between Demand and Supply:**
-
-**Demand:**
-- Consumer perspective
-- Inverse relationship with price (Law of Demand)
-- Shows buyer's willingness to purchase
-- Affected by income, preferences, prices of related goods
-
-**Supply:**
-- Producer perspective  
-- Direct relationship with price (Law of Supply)
-- Shows seller's willingness to sell
-- Affected by production costs, technology, number of sellers"""
 
-    else:
-        response = """I'd be happy to help you with economics! I can explain concepts about:
-
-- **Demand and Supply:** Laws, factors, curves
-- **Market Equilibrium:** Price determination
-- **Elasticity:** Price, income, and cross elasticity
-- **Consumer Behavior:** Utility theory
-- **Production:** Factors, short run vs long run
-- **Costs:** Fixed, variable, marginal costs
-- **Market Structures:** Perfect competition, monopoly, oligopoly, monopolistic competition
-
-Please ask a specific question about any of these topics!"""
-
-    return response
-
-def simulate_dialogue():
-    """Generate pre-recorded teacher-student dialogue"""
-    dialogues = [
-        {
-            "speaker": "Teacher",
-            "text": "Welcome to today's lesson on Microeconomics! We'll be covering the fundamentals of demand and supply. Are you ready to begin?"
-        },
-        {
-            "speaker": "Student",
-            "text": "Yes, I'm ready! Can you explain what demand means in economics?"
-        },
-        {
-            "speaker": "Teacher",
-            "text": "Great question! Demand refers to the quantity of a good or service that consumers are willing and able to purchase at various prices during a given time period. The key words here are 'willing' and 'able' - both conditions must be met."
-        },
-        {
-            "speaker": "Student",
-            "text": "So if I want to buy something but can't afford it, that's not demand?"
-        },
-        {
-            "speaker": "Teacher",
-            "text": "Exactly! That would just be a desire, not economic demand. Now, there's an important principle called the Law of Demand. It states that as price increases, quantity demanded decreases, and vice versa, assuming all other factors remain constant."
-        },
-        {
-            "speaker": "Student",
-            "text": "That makes sense - when things get more expensive, people buy less. What about supply?"
-        },
-        {
-            "speaker": "Teacher",
-            "text": "Supply is the opposite side of the market. It's the quantity of a good that producers are willing and able to offer for sale at various prices. The Law of Supply states that as price increases, quantity supplied increases."
-        },
-        {
-            "speaker": "Student",
-            "text": "So sellers want to sell more when prices are higher because they can make more profit?"
-        },
-        {
-            "speaker": "Teacher",
-            "text": "Precisely! Higher prices incentivize producers to supply more. Now, when we bring demand and supply together, we get market equilibrium - the point where quantity demanded equals quantity supplied."
-        },
-        {
-            "speaker": "Student",
-            "text": "What happens if the market isn't at equilibrium?"
-        },
-        {
-            "speaker": "Teacher",
-            "text": "Excellent question! If price is above equilibrium, we get excess supply (surplus). If price is below equilibrium, we get excess demand (shortage). Market forces will push the price toward equilibrium."
-        },
-        {
-            "speaker": "Student",
-            "text": "This is really helpful! Can we talk about elasticity next time?"
-        },
-        {
-            "speaker": "Teacher",
-            "text": "Absolutely! Elasticity is crucial for understanding how responsive consumers and producers are to price changes. Keep studying, and you'll do great on your exam!"
-        }
-    ]
-    return dialogues
+@st.cache_resource
+def load_knowledge_store():
+    """Open the compiled knowledge base file, or fall back to the built-in one"""
+    return open_knowledge_store()
 
-# Main App Layout
-st.markdown('<h1 class="main-header">📚 Interactive Economics Study Tool</h1>', unsafe_allow_html=True)
-st.markdown("### Inspired by NotebookLM - Your AI-Powered Learning Companion")
 
-# Create tabs for different features
-tab1, tab2, tab3, tab4 = st.tabs(["🎯 Overview", "💬 Interactive Q&A", "🎙️ Audio Dialogue", "📹 Video Resources"])
+def current_knowledge_base():
+    """Return (knowledge_base, version), picking up a rebuilt file without a restart"""
+    return load_knowledge_store().snapshot()
 
-with tab1:
-    st.header("Welcome to Your Economics Study Tool")
 
-    col1, col2 = st.columns(2)
+@st.cache_resource(max_entries=2)
+def build_answer_engine(version, _knowledge_base):
+    """Load the answer engine once per knowledge base version and share it across sessions.
 
-    with col1:
-        st.markdown("""
-        <div class="feature-box">
-        <h3>🎓 What You'll Learn</h3>
-        <ul>
-            <li>Demand and Supply Analysis</li>
-            <li>Market Equilibrium</li>
-            <li>Price Elasticity</li>
-            <li>Consumer Behavior Theory</li>
-            <li>Production and Costs</li>
-            <li>Market Structures</li>
-        </ul>
-        </div>
-        """, unsafe_allow_html=True)
+    The engine comes from the snapshot file when it matches this version.
+    """
+    return load_engine(_knowledge_base, version)
 
-    with col2:
-        st.markdown("""
-        <div class="feature-box">
-        <h3>✨ Features</h3>
-        <ul>
-            <li>AI-powered Q&A chatbot</li>
-            <li>Teacher-Student dialogue simulations</li>
-            <li>Video summaries and concepts</li>
-            <li>Exam preparation tips</li>
-            <li>Interactive learning experience</li>
-        </ul>
-        </div>
-        """, unsafe_allow_html=True)
-
-    st.markdown("---")
-    st.subheader("📖 Study Material Overview")
-    st.info("""
-    **Chapter Topics Covered:**
-    - Introduction to Microeconomics
-    - Demand: Definition, Law, Determinants
-    - Supply: Definition, Law, Determinants  
-    - Market Equilibrium and Price Determination
-    - Elasticity of Demand and Supply
-    - Consumer Behavior and Utility Analysis
-    - Production Function and Costs
-    - Market Structures (Perfect Competition, Monopoly, etc.)
-    """)
 
-with tab2:
-    st.header("💬 Ask Your Economics Questions")
-    st.write("Chat with your AI tutor to get instant clarifications on any economics concept!")
+def load_answer_engine():
+    """Answer engine for the current knowledge base version"""
+    knowledge_base, version = current_knowledge_base()
+    return build_answer_engine(version, knowledge_base)
+
+
+@st.cache_resource
+def freeze_shared_resources(version):
+    """Exempt everything loaded so far from garbage collection, once per knowledge base version.
+
+    The engine, deck and dialogues live as long as the process. Frozen, they are
+    no longer walked by the full collections that would otherwise land on some
+    student's rerun.
+    """
+    gc.freeze()
+
+
+@st.cache_resource
+def load_tutor():
+    """Streaming model backend shared by all sessions, or None when STUDY_TOOL_LLM_URL is unset"""
+    return get_tutor()
+
+
+@st.cache_resource
+def load_transcript_index():
+    """Positional index of the video transcripts, shared by all sessions"""
+    return TranscriptIndex(TRANSCRIPT_DIR)
+
+
+def current_transcripts():
+    """Transcript index with any new or changed files indexed"""
+    index = load_transcript_index()
+    index.refresh()
+    return index
+
+
+@st.cache_resource
+def load_ingestor():
+    """Background thread pool for note ingestion, shared by all sessions"""
+    return Ingestor()
+
+
+def ingestion_progress():
+    """Progress bars for the notes being indexed in this session"""
+    for job in st.session_state.ingestion_jobs.values():
+        if job.error:
+            st.error("Could not read {}: {}".format(job.name, job.error))
+        elif job.done:
+            st.caption("✅ {}: {} passages indexed".format(job.name, job.passages))
+        else:
+            st.progress(job.progress(), text="Indexing {} ({} passages so far)".format(job.name, job.passages))
+
+    if st.session_state.get("ingestion_running") and all(
+            job.done for job in st.session_state.ingestion_jobs.values()):
+        # Stop polling once every file is indexed
+        st.session_state.ingestion_running = False
+        st.rerun()
+
+
+def render_chat_message(message):
+    """Build the HTML block for one chat message"""
+    if message.role == "user":
+        return USER_MESSAGE_HTML.format(message.time_label(), message.content)
+    return BOT_MESSAGE_HTML.format(message.time_label(), message.content)
+
+
+def render_dialogue_line(dialogue):
+    """Build the HTML block for one dialogue line"""
+    if dialogue["speaker"] == "Teacher":
+        return TEACHER_LINE_HTML.format(dialogue['text'])
+    return STUDENT_LINE_HTML.format(dialogue['text'])
+
+
+@st.cache_resource
+def load_dialogue_library():
+    """Dialogue scripts and audio for every topic, shared by all sessions.
+
+    Every topic of the current knowledge base is queued on the library's
+    worker pool right away, so the scripts are ready before anyone asks.
+    """
+    library = DialogueLibrary(synthesize=synthesize_dialogue)
+    library.prefetch(*current_knowledge_base())
+    return library
+
+
+def current_dialogue():
+    """The selected topic's dialogue for the current knowledge base version"""
+    knowledge_base, version = current_knowledge_base()
+    library = load_dialogue_library()
+    topic = st.session_state.dialogue_topic
+    if not library.ready(knowledge_base, version, topic):
+        with st.spinner("Preparing the {} dialogue...".format(topic_title(topic))):
+            return library.get(knowledge_base, version, topic)
+    return library.get(knowledge_base, version, topic)
+
+
+def dialogue_playback(dialogue):
+    """Playback from the first line, moving on as each line's clip ends"""
+    durations = dialogue.audio["durations"] if dialogue.audio is not None else None
+    return DialoguePlayback(len(dialogue.lines), DIALOGUE_LINE_INTERVAL, durations)
+
+
+def select_dialogue_topic():
+    """Start the newly selected topic's dialogue from the beginning"""
+    knowledge_base, version = current_knowledge_base()
+    dialogue = load_dialogue_library().get(knowledge_base, version, st.session_state.dialogue_topic)
+    st.session_state.dialogue_playback = dialogue_playback(dialogue)
+
+
+@st.cache_resource(max_entries=2)
+def build_deck(version, _knowledge_base):
+    """Generate the flashcards and their quiz distractors once per knowledge base version
+    and share them across sessions
+    """
+    cards = generate_cards(_knowledge_base)
+    return cards, DistractorPool(cards)
+
+
+def load_deck():
+    """Return (version, cards, distractors) for the current knowledge base"""
+    knowledge_base, version = current_knowledge_base()
+    return (version,) + build_deck(version, knowledge_base)
+
+
+def flashcard_scheduler(version, cards):
+    """This student's review scheduler, restored from the store for a new session or deck"""
+    if st.session_state.get("flashcard_deck") != version:
+        state = None
+        saved = load_session_store().load_flashcards(st.session_state.student_id)
+        if saved and saved[0] == version:
+            try:
+                state = ReviewState.from_bytes(len(cards), saved[1])
+            except ValueError:
+                # Saved for a deck of another size: start over
+                state = None
+        st.session_state.flashcards = Scheduler(len(cards), state)
+        st.session_state.flashcard_deck = version
+        st.session_state.flashcard_revealed = False
+        st.session_state.quiz_item = None
+    return st.session_state.flashcards
+
+
+def reveal_flashcard():
+    st.session_state.flashcard_revealed = True
+
+
+def grade_flashcard(card_id, grade):
+    """Schedule the card's next review and save the student's review state"""
+    scheduler = st.session_state.flashcards
+    scheduler.review(card_id, grade)
+    st.session_state.flashcard_revealed = False
+    load_session_store().save_flashcards(st.session_state.student_id, st.session_state.flashcard_deck,
+                                         scheduler.state.to_bytes())
+    metrics.count("flashcard_reviews_total", grade=grade)
+
+
+def check_quiz_answer(card_id, options, answer):
+    """Grade a quiz answer: right counts as Good, wrong as Again"""
+    correct = st.session_state.get("quiz_choice_{}".format(card_id)) == options[answer]
+    st.session_state.quiz_result = (correct, options[answer])
+    st.session_state.quiz_item = None
+    grade_flashcard(card_id, GOOD if correct else AGAIN)
+
+
+def clear_chat():
+    """Forget the chat history and go back to the newest page"""
+    st.session_state.chat_history.clear()
+    st.session_state.history_page = 0
+
+
+def show_history_page(page):
+    st.session_state.history_page = page
+
+
+def ask_suggestion(question):
+    st.session_state.temp_question = question
+
+
+@st.fragment
+@metrics.timed("tab.qa")
+def qa_tab():
+    """Q&A tab; its widgets rerun only this fragment, not the other tabs"""
+    st.markdown("## 💬 Ask Your Economics Questions\n\n"
+                "Chat with your AI tutor to get instant clarifications on any economics concept!")
+
+    # Loaded with the tab, so the first question does not wait for the engine
+    engine = load_answer_engine()
 
     # Chat interface
     question = st.text_input("Type your question here:", placeholder="e.g., What is the law of demand?")
 
+    with st.expander("📂 Add your own study notes"):
+        uploads = st.file_uploader("Upload text or markdown notes", type=["txt", "md"],
+                                   accept_multiple_files=True)
+        for upload in uploads or []:
+            if upload.file_id not in st.session_state.ingestion_jobs:
+                # Files are read in chunks on a background thread
+                st.session_state.ingestion_jobs[upload.file_id] = load_ingestor().submit(
+                    st.session_state.study_notes, upload.name, upload, upload.size)
+                st.session_state.ingestion_running = True
+        if st.session_state.ingestion_jobs:
+            # A fragment call copies the page's containers, so it is skipped until there is progress to show
+            st.fragment(ingestion_progress,
+                        run_every=1.0 if st.session_state.get("ingestion_running") else None)()
+
     col1, col2 = st.columns([1, 5])
     with col1:
         ask_button = st.button("Ask Question")
     with col2:
-        if st.button("Clear Chat"):
-            st.session_state.chat_history = []
-            st.rerun()
+        st.button("Clear Chat", on_click=clear_chat)
 
     if ask_button and question:
         # Add user question to history
-        st.session_state.chat_history.append({
-            "role": "user",
-            "content": question,
-            "timestamp": datetime.now().strftime("%H:%M:%S")
-        })
+        st.session_state.chat_history.append("user", question)
 
         # Generate AI response
-        response = get_ai_response(question)
+        response = get_ai_response(question, engine=engine,
+                                   notes=st.session_state.study_notes, transcripts=current_transcripts())
+        tutor = load_tutor()
+        if tutor is not None:
+            # Stream the model's answer as it arrives; the rule-based answer is
+            # its context and stands in when the model is slow or down
+            stream = tutor.stream_answer(question, response)
+            placeholder = st.empty()
+            with placeholder.container():
+                st.write_stream(stream)
+            # The finished answer is shown in the chat history below
+            placeholder.empty()
+            response = stream.text
 
         # Add AI response to history
-        st.session_state.chat_history.append({
-            "role": "assistant",
-            "content": response,
-            "timestamp": datetime.now().strftime("%H:%M:%S")
-        })
+        st.session_state.chat_history.append("assistant", response)
+        st.session_state.history_page = 0
 
     # Display chat history
-    st.markdown("---")
-    st.subheader("Chat History")
-
-    if st.session_state.chat_history:
-        for message in st.session_state.chat_history:
-            if message["role"] == "user":
-                st.markdown("""
-                <div class="chat-message user-message">
-                <strong>🙋 You ({}):</strong><br>
-                {}
-                </div>
-                """.format(message['timestamp'], message['content']), unsafe_allow_html=True)
-            else:
-                st.markdown("""
-                <div class="chat-message bot-message">
-                <strong>🤖 AI Tutor ({}):</strong><br>
-                {}
-                </div>
-                """.format(message['timestamp'], message['content']), unsafe_allow_html=True)
+    st.markdown("---\n\n### Chat History")
+
+    history = st.session_state.chat_history
+    if history:
+        page_count = history.page_count(HISTORY_PAGE_SIZE)
+        page = min(st.session_state.history_page, page_count - 1)
+
+        # Only the visible window is rendered, in a single markdown call
+        with metrics.span("history.render", page=page):
+            st.markdown("\n\n".join(render_chat_message(message)
+                                     for message in history.window(page, HISTORY_PAGE_SIZE)),
+                        unsafe_allow_html=True)
+
+        if page_count > 1:
+            col1, col2, col3 = st.columns([1, 2, 1])
+            with col1:
+                st.button("⬅️ Older", disabled=page >= page_count - 1,
+                          on_click=show_history_page, args=(page + 1,))
+            with col2:
+                st.caption("Page {} of {} ({} messages)".format(page_count - page, page_count, len(history)))
+            with col3:
+                st.button("Newer ➡️", disabled=page == 0, on_click=show_history_page, args=(page - 1,))
     else:
         st.info("👆 Start by asking a question above!")
 
     # Quick question suggestions
-    st.markdown("---")
-    st.subheader("📌 Quick Question Suggestions")
+    st.markdown("---\n\n### 📌 Quick Question Suggestions")
     col1, col2, col3 = st.columns(3)
 
     with col1:
-        if st.button("What is demand?"):
-            st.session_state.temp_question = "What is demand?"
+        st.button("What is demand?", on_click=ask_suggestion, args=("What is demand?",))
     with col2:
-        if st.button("Explain elasticity"):
-            st.session_state.temp_question = "Explain elasticity"
+        st.button("Explain elasticity", on_click=ask_suggestion, args=("Explain elasticity",))
     with col3:
-        if st.button("Market equilibrium?"):
-            st.session_state.temp_question = "What is market equilibrium?"
-
-with tab3:
-    st.header("🎙️ Teacher-Student Audio Dialogue")
-    st.write("Listen to a simulated conversation between a teacher and student discussing economics concepts.")
+        st.button("Market equilibrium?", on_click=ask_suggestion, args=("What is market equilibrium?",))
 
-    st.info("🔊 **Audio Feature:** This dialogue demonstrates interactive learning. In a full implementation, this would include text-to-speech audio generation.")
 
-    if st.button("▶️ Play Dialogue Simulation"):
-        dialogues = simulate_dialogue()
+@metrics.timed("dialogue.lines")
+def dialogue_lines():
+    """Dialogue lines played so far, polled on a timer while playing"""
+    playback = st.session_state.dialogue_playback
+    dialogue = current_dialogue()
 
+    visible = playback.visible_lines()
+    if visible:
         st.markdown("---")
-        for dialogue in dialogues:
-            if dialogue["speaker"] == "Teacher":
-                st.markdown("""
-                <div class="chat-message bot-message">
-                <strong>👨‍🏫 Teacher:</strong><br>
-                {}
-                </div>
-                """.format(dialogue['text']), unsafe_allow_html=True)
-                time.sleep(0.5)
-            else:
-                st.markdown("""
-                <div class="chat-message user-message">
-                <strong>👨‍🎓 Student:</strong><br>
-                {}
-                </div>
-                """.format(dialogue['text']), unsafe_allow_html=True)
-                time.sleep(0.5)
-
-    st.markdown("---")
-    st.subheader("📝 Dialogue Transcript")
+        st.markdown("\n\n".join(render_dialogue_line(line) for line in dialogue.lines[:visible]),
+                    unsafe_allow_html=True)
+        if dialogue.audio is not None:
+            # Stream the clip for the line that was just revealed; the next line waits for it to end
+            st.audio(dialogue.audio["paths"][visible - 1], format="audio/wav", autoplay=playback.playing)
+
+    if playback.playing and playback.finished():
+        # Stop the timer once the last line has played
+        playback.pause()
+        st.rerun()
+
+
+@st.fragment
+@metrics.timed("tab.dialogue")
+def dialogue_tab():
+    """Audio Dialogue tab; the playback controls rerun only this fragment"""
+    st.markdown("## 🎙️ Teacher-Student Audio Dialogue\n\n"
+                "Listen to a simulated conversation between a teacher and student discussing economics concepts.")
+
+    knowledge_base, version = current_knowledge_base()
+    topics = load_dialogue_library().topics(knowledge_base, version)
+    if st.session_state.dialogue_topic not in topics:
+        # The topic was dropped from a rebuilt knowledge base
+        st.session_state.dialogue_topic = INTRODUCTION
+        select_dialogue_topic()
+    st.selectbox("Choose a topic:", topics, format_func=topic_title, key="dialogue_topic",
+                 on_change=select_dialogue_topic)
+
+    st.info("🔊 **Audio Feature:** Each line is voiced by an offline text-to-speech engine. Clips are generated once and cached on disk.")
+    dialogue = current_dialogue()
+    audio = dialogue.audio
+    if audio is None:
+        st.caption("Audio is unavailable for this dialogue, so its lines are shown without sound.")
+    else:
+        st.caption("Audio clips: {} generated, {} cached ({:.2f}s)".format(
+            audio["generated"], audio["cached"], audio["seconds"]))
+
+    if "dialogue_playback" not in st.session_state:
+        st.session_state.dialogue_playback = dialogue_playback(dialogue)
+    playback = st.session_state.dialogue_playback
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.button("▶️ Play Dialogue Simulation", on_click=playback.play)
+    with col2:
+        if playback.playing:
+            st.button("⏸️ Pause", on_click=playback.pause)
+        else:
+            st.button("⏯️ Resume", disabled=not playback.started or playback.finished(),
+                      on_click=playback.resume)
+    with col3:
+        st.button("⏭️ Skip to End", disabled=playback.finished(), on_click=playback.skip)
+
+    # The lines poll on a timer only while playing, so no thread sleeps; before
+    # the first play there are none to show and no fragment to set up
+    if playback.started:
+        st.fragment(dialogue_lines, run_every=DIALOGUE_LINE_INTERVAL if playback.playing else None)()
+
+    st.markdown("---\n\n### 📝 Dialogue Transcript")
     with st.expander("View Full Transcript"):
-        dialogues = simulate_dialogue()
-        for i, dialogue in enumerate(dialogues, 1):
-            st.write("**{}. {}:** {}".format(i, dialogue['speaker'], dialogue['text']))
+        st.markdown(dialogue.transcript)
 
-with tab4:
-    st.header("📹 Video Resources & Summaries")
-    st.write("Visual explanations and exam tips for better understanding.")
 
-    st.subheader("🎥 Recommended Video Lectures")
+@metrics.timed("tab.overview")
+def overview_tab():
+    """Static Overview tab"""
+    st.markdown(OVERVIEW_HTML, unsafe_allow_html=True)
+    st.info(CHAPTER_TOPICS_MD)
+
+
+@st.cache_data(max_entries=256)
+def market_chart(demand_kind, demand_coefficient, demand_shape, supply_kind, supply_coefficient, supply_shape):
+    """Downsampled curves and equilibrium, computed once per slider setting"""
+    return market_chart_data(Curve(demand_kind, demand_coefficient, demand_shape),
+                             Curve(supply_kind, supply_coefficient, supply_shape))
+
+
+@st.cache_data(max_entries=256)
+def cost_chart(fixed_cost, wage, productivity, labor_share):
+    """Downsampled cost curves, computed once per slider setting"""
+    return cost_chart_data(fixed_cost, wage, productivity, labor_share)
+
+
+def curve_controls(name, controls, sign):
+    """Curve type and parameter sliders; returns (kind, coefficient, shape)"""
+    choice = st.selectbox(name + " curve", list(controls), key=name + "_kind")
+    kind, coefficient, shape = controls[choice]
+    coefficient_value = st.slider(coefficient[0], *coefficient[1:], key=name + "_" + choice + "_coefficient")
+    shape_value = st.slider(shape[0], *shape[1:], key=name + "_" + choice + "_shape")
+    return kind, coefficient_value, sign * shape_value
+
+
+def format_number(value, pattern="{:.2f}"):
+    return "—" if value != value else pattern.format(value)
 
-    col1, col2 = st.columns(2)
 
+@st.fragment
+@metrics.timed("tab.video.market")
+def market_explorer():
+    """Interactive demand and supply solver; sliders rerun only this fragment"""
+    st.markdown("### 🧮 Solve a Market")
+    # Closed by default, so a full page run neither computes nor sends its charts
+    if not st.toggle("Open the market solver", key="market_explorer_open"):
+        return
+    col1, col2 = st.columns(2)
+    with col1:
+        demand = curve_controls("Demand", DEMAND_CONTROLS, -1)
+    with col2:
+        supply = curve_controls("Supply", SUPPLY_CONTROLS, 1)
+    data = market_chart(*demand, *supply)
+
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Equilibrium price", format_number(data["price"]))
+    col2.metric("Equilibrium quantity", format_number(data["quantity"]))
+    col3.metric("Demand elasticity", format_number(data["demand_elasticity"]),
+                classify_elasticity(data["demand_elasticity"]), delta_color="off")
+    col4.metric("Arc elasticity (+10% price)", format_number(data["arc_elasticity"]))
+    if data["price"] != data["price"]:
+        st.warning("These curves do not cross at a positive price and quantity.")
+
+    st.vega_lite_chart(data["curves"], MARKET_CURVES_SPEC, width="stretch")
+    st.caption("How the equilibrium moves as demand shifts")
+    st.vega_lite_chart(data["shifts"], DEMAND_SHIFT_SPEC, width="stretch")
+
+
+@st.fragment
+@metrics.timed("tab.video.costs")
+def cost_explorer():
+    """Cost curves derived from a short-run production function"""
+    st.markdown("### 🏭 Cost Curves from Production")
+    if not st.toggle("Open the cost curves", key="cost_explorer_open"):
+        return
+    st.caption("Output is Q = A · L^α with fixed capital; each worker is paid the wage.")
+    col1, col2, col3, col4 = st.columns(4)
     with col1:
-        st.markdown("""
-        <div class="feature-box">
-        <h4>📺 Video 1: Microeconomics Fundamentals</h4>
-        <p><strong>Topics Covered:</strong></p>
-        <ul>
-            <li>Introduction to Microeconomics</li>
-            <li>Demand and Supply Basics</li>
-            <li>Market Equilibrium</li>
-            <li>Real-world Applications</li>
-        </ul>
-        <p><strong>Duration:</strong> ~30 minutes</p>
-        </div>
-        """, unsafe_allow_html=True)
-
-        st.markdown("🔗 [Watch Video 1](https://youtu.be/Ec19ljjvlCI)")
+        fixed_cost = st.slider("Fixed cost", 0.0, 500.0, 100.0, key="fixed_cost")
+    with col2:
+        wage = st.slider("Wage", 5.0, 50.0, 20.0, key="wage")
+    with col3:
+        productivity = st.slider("Productivity A", 1.0, 20.0, 10.0, key="productivity")
+    with col4:
+        labor_share = st.slider("Labour exponent α", 0.3, 0.9, 0.5, key="labor_share")
+    data = cost_chart(fixed_cost, wage, productivity, labor_share)
+
+    col1, col2 = st.columns(2)
+    col1.metric("Efficient scale (lowest ATC)", format_number(data["efficient_scale"]))
+    col2.metric("Lowest average total cost", format_number(data["minimum_average_cost"]))
 
+    col1, col2 = st.columns(2)
+    with col1:
+        st.caption("Per-unit costs: MC crosses ATC at its lowest point")
+        st.vega_lite_chart(data["per_unit"], PER_UNIT_COST_SPEC, width="stretch")
     with col2:
-        st.markdown("""
-        <div class="feature-box">
-        <h4>📺 Video 2: Advanced Concepts</h4>
-        <p><strong>Topics Covered:</strong></p>
-        <ul>
-            <li>Elasticity of Demand</li>
-            <li>Consumer Behavior</li>
-            <li>Production Theory</li>
-            <li>Market Structures</li>
-        </ul>
-        <p><strong>Duration:</strong> ~25 minutes</p>
-        </div>
-        """, unsafe_allow_html=True)
-
-        st.markdown("🔗 [Watch Video 2](https://www.youtube.com/watch?v=Z_S0VA4jKes)")
-
-    st.markdown("---")
-    st.subheader("📊 Key Concepts Visualization")
-
-    st.markdown("""
-    ### Demand and Supply Curve
-
-    The fundamental model of microeconomics shows:
-    - **Demand Curve:** Slopes downward (inverse relationship between price and quantity)
-    - **Supply Curve:** Slopes upward (direct relationship between price and quantity)
-    - **Equilibrium Point:** Where the curves intersect
-
-    ### Elasticity Spectrum
-
-    | Type | Elasticity Value | Consumer Response |
-    |------|------------------|-------------------|
-    | Perfectly Inelastic | 0 | No response to price changes |
-    | Inelastic | < 1 | Weak response to price changes |
-    | Unit Elastic | = 1 | Proportional response |
-    | Elastic | > 1 | Strong response to price changes |
-    | Perfectly Elastic | ∞ | Infinite response |
-
-    ### Market Structure Comparison
-
-    | Feature | Perfect Competition | Monopoly | Oligopoly | Monopolistic Competition |
-    |---------|-------------------|----------|-----------|--------------------------|
-    | Number of Firms | Many | One | Few | Many |
-    | Product Type | Homogeneous | Unique | Differentiated/Similar | Differentiated |
-    | Entry Barriers | None | High | High | Low |
-    | Price Control | None (Price Taker) | High (Price Maker) | Some | Some |
-    """)
-
-    st.markdown("---")
-    st.subheader("🎯 Exam Tips Summary")
-
-    st.success("""
-    **Top 10 Exam Success Tips:**
-
-    1. **Master the Graphs:** Practice drawing supply-demand diagrams until you can do them perfectly
-    2. **Memorize Key Formulas:** Especially elasticity calculations
-    3. **Understand, Don't Memorize:** Focus on WHY things happen, not just WHAT happens
-    4. **Use Real Examples:** Connect theories to real-world scenarios (gas prices, food markets, etc.)
-    5. **Practice Numerical Problems:** Work through calculation questions multiple times
-    6. **Create Summary Sheets:** One-page notes for each major topic
-    7. **Explain to Others:** Teaching concepts helps solidify your understanding
-    8. **Time Management:** Practice past papers under timed conditions
-    9. **Review Mistakes:** Learn from errors in practice questions
-    10. **Stay Current:** Follow economic news to see theories in action
-    """)
+        st.caption("Total costs")
+        st.vega_lite_chart(data["totals"], TOTAL_COST_SPEC, width="stretch")
+
+
+@st.fragment
+@metrics.timed("tab.video.transcripts")
+def transcript_search():
+    """Search what is said in the lectures; typing reruns only this fragment"""
+    st.markdown("### 🔎 Search the Lecture Transcripts")
+    index = current_transcripts()
+    if not len(index):
+        st.info("No transcripts yet. Add .srt, .vtt or .json transcript files to `{}`.".format(TRANSCRIPT_DIR))
+        return
+
+    stats = index.stats()
+    query = st.text_input("Find where something is said:", placeholder='e.g. "law of demand" or elasticity price')
+    if not query:
+        st.caption("{videos} videos, {words:,} words indexed. Quote a phrase to match it word for word.".format(**stats))
+        return
+
+    started = time.perf_counter()
+    hits = index.search(query, TRANSCRIPT_SEARCH_RESULTS)
+    st.caption("{} {} found in {:.1f} ms".format(len(hits), "moment" if len(hits) == 1 else "moments",
+                                                (time.perf_counter() - started) * 1000))
+    for hit in hits:
+        stamp = format_timestamp(hit.start)
+        link = hit.link()
+        st.markdown("**{}** · {} — {}".format(
+            hit.video.title, "[{}]({})".format(stamp, link) if link else stamp, hit.text))
+
+
+@metrics.timed("tab.video")
+def video_tab():
+    """Static Video Resources tab"""
+    st.markdown(VIDEO_LECTURES_HTML, unsafe_allow_html=True)
+    transcript_search()
+    st.markdown(KEY_CONCEPTS_MD)
+    market_explorer()
+    cost_explorer()
+    st.markdown(EXAM_TIPS_HEADING_MD)
+    st.success(EXAM_TIPS_SUMMARY_MD)
+
+
+def flashcard_review(card_id, card):
+    """Front of the card, then its back and the grade buttons once revealed"""
+    st.markdown("#### " + card.front)
+    if not st.session_state.flashcard_revealed:
+        st.button("Show answer", on_click=reveal_flashcard)
+        return
+
+    st.markdown(card.back)
+    for column, (label, grade) in zip(st.columns(len(FLASHCARD_GRADES)), FLASHCARD_GRADES):
+        with column:
+            st.button(label, on_click=grade_flashcard, args=(card_id, grade))
+
+
+def flashcard_quiz(card_id, cards, distractors):
+    """Multiple-choice question for the card, kept fixed until it is answered"""
+    if st.session_state.get("quiz_result"):
+        correct, answer = st.session_state.quiz_result
+        if correct:
+            st.success("✅ Correct!")
+        else:
+            st.error("❌ Not quite. The answer was: " + answer)
+
+    item = st.session_state.quiz_item
+    if item is None or item[0] != card_id:
+        item = st.session_state.quiz_item = (card_id,) + quiz_item(cards, card_id, distractors=distractors)
+    _, prompt, options, answer = item
+    st.markdown("#### " + prompt)
+    st.radio("Your answer:", options, index=None, key="quiz_choice_{}".format(card_id))
+    st.button("Check answer", on_click=check_quiz_answer, args=(card_id, options, answer))
+
+
+@st.fragment
+@metrics.timed("tab.flashcards")
+def flashcards_tab():
+    """Flashcards tab; reviews rerun only this fragment"""
+    st.markdown("## 🗂️ Flashcards & Quiz\n\n"
+                "Review every definition, law and factor list. Cards you struggle with come back sooner.")
+
+    version, cards, distractors = load_deck()
+    scheduler = flashcard_scheduler(version, cards)
+    mode = st.radio("Mode", ["Flashcards", "Quiz"], horizontal=True, key="flashcard_mode")
+    st.caption("{} cards · {} new · {} due for review".format(
+        len(cards), scheduler.new_count, scheduler.due_count()))
+
+    card_id = scheduler.next_card()
+    if card_id is None:
+        next_due = scheduler.next_due()
+        st.success("🎉 All caught up!" + (" Next review due {}.".format(
+            time.strftime("%b %d, %H:%M", time.localtime(next_due))) if next_due else ""))
+        return
+
+    card = cards[card_id]
+    st.caption("Topic: " + card.topic.replace("_", " ").title())
+    if mode == "Quiz":
+        flashcard_quiz(card_id, cards, distractors)
+    else:
+        flashcard_review(card_id, card)
+
+
+def admin_panel():
+    """Live span percentiles and question counters for operators"""
+    st.subheader("📈 Metrics")
+    rows = ["| Span | Count | p50 ms | p95 ms | p99 ms |", "|---|---|---|---|---|"]
+    for name, summary in metrics.span_summary().items():
+        rows.append("| {} | {count} | {p50_ms:.1f} | {p95_ms:.1f} | {p99_ms:.1f} |".format(name, **summary))
+    st.markdown("\n".join(rows))
+
+    questions = {dict(labels)["topic"]: value
+                 for labels, value in metrics.counter_values("questions_total").items()}
+    total = sum(questions.values())
+    st.metric("Questions", total)
+    st.metric("Fallback rate", "{:.1%}".format(questions.get("fallback", 0) / total if total else 0.0))
+    if questions:
+        st.markdown("\n".join("- {}: {}".format(topic, count)
+                               for topic, count in sorted(questions.items(), key=lambda item: -item[1])))
+    engine = load_answer_engine()
+    st.caption("Answer cache: {hits} hits, {misses} misses, {size} entries".format(**engine.cache.stats()))
+    st.caption("Answer engine: " + format_startup(engine.startup))
+    store = load_session_store()
+    if store.last_error is not None:
+        st.error("{} history and notes writes were lost; last error: {}".format(
+            store.failed_writes, store.last_error))
+
+
+# Create tabs for different features
+tab1, tab2, tab3, tab4, tab5 = st.tabs(["🎯 Overview", "💬 Interactive Q&A", "🎙️ Audio Dialogue",
+                                        "📹 Video Resources", "🗂️ Flashcards"])
+
+# Interactive tabs are fragments: a click reruns its own tab only. Streamlit
+# cannot cache elements, so every full page run sends the static tabs again;
+# each of their sections is one pre-rendered element from study_tool.content
+with tab1:
+    overview_tab()
+
+with tab2:
+    qa_tab()
+
+with tab3:
+    dialogue_tab()
+
+with tab4:
+    video_tab()
+
+with tab5:
+    flashcards_tab()
+
+# Operators open the app with ?admin=1 to watch the metrics
+if metrics.enabled and st.query_params.get("admin") == "1":
+    with st.sidebar:
+        st.fragment(admin_panel, run_every=ADMIN_PANEL_INTERVAL)()
 
 # Footer
-st.markdown("---")
-st.markdown("""
-<div style='text-align: center; color: #666;'>
-    <p>📚 Interactive Study Tool | Built with Streamlit | Economics Learning Assistant</p>
-    <p>💡 Tip: Use all features together for maximum learning effectiveness!</p>
-</div>
-""", unsafe_allow_html=True)
\ No newline at end of file
+st.markdown(PAGE_FOOTER_HTML, unsafe_allow_html=True)
+
+# Every tab has loaded its shared resources by now
+freeze_shared_resources(current_knowledge_base()[1])
+
+metrics.observe("app.run", time.perf_counter() - run_started)
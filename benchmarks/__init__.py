@@ -0,0 +1 @@
+"""Benchmarks for the answer engine and Streamlit page reruns"""
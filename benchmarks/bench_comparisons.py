@@ -0,0 +1,77 @@
+"""Comparison matrix: full and incremental builds, and lookups against rendering on demand"""
+
+import random
+import time
+
+from study_tool.comparisons import ComparisonMatrix, render_comparison, topic_concepts
+from study_tool.knowledge_base import ECONOMICS_KNOWLEDGE_BASE
+
+from .bench_engine import summarize
+
+
+def synthetic_knowledge_base(topics=100, concepts=12):
+    """The built-in topics plus ``topics`` generated ones, each listing ``concepts`` comparable entries"""
+    knowledge_base = dict(ECONOMICS_KNOWLEDGE_BASE)
+    for topic in range(topics):
+        knowledge_base["synthetic_{}".format(topic)] = {
+            "definition": "Synthetic topic {} for benchmarking.".format(topic),
+            "kinds": {"kind{}x{}".format(topic, concept): {
+                "characteristics": "Characteristics of kind {} in topic {}".format(concept, topic),
+                "pricing": "Pricing of kind {} in topic {}".format(concept, topic)}
+                for concept in range(concepts)},
+        }
+    return knowledge_base
+
+
+def run(rounds=20, lookups=5000):
+    """Time a full build, a rebuild after one topic changes, and answering "X vs Y" questions"""
+    knowledge_base = synthetic_knowledge_base()
+    results = {}
+
+    samples = []
+    for _ in range(rounds):
+        started = time.perf_counter_ns()
+        matrix = ComparisonMatrix(knowledge_base)
+        samples.append(time.perf_counter_ns() - started)
+    results["comparisons_build_p50_ms"] = summarize(samples)["p50_us"] / 1000
+    results["comparisons_pairs"] = float(matrix.pair_count)
+    results["comparisons_topics"] = float(len(knowledge_base))
+
+    samples = []
+    for round_number in range(rounds):
+        edited = dict(knowledge_base, costs=dict(knowledge_base["costs"], total_cost="Edit {}".format(round_number)))
+        started = time.perf_counter_ns()
+        rebuilt = ComparisonMatrix(edited, matrix)
+        samples.append(time.perf_counter_ns() - started)
+    results["comparisons_rebuild_one_topic_p50_ms"] = summarize(samples)["p50_us"] / 1000
+    results["comparisons_rebuild_rendered_topics"] = float(rebuilt.rendered_topics)
+
+    # Questions naming a random comparable pair, and the concepts to render them from
+    rng = random.Random(7)
+    groups = [concepts for topic_key, topic in knowledge_base.items()
+              for _, concepts in topic_concepts(topic_key, topic)]
+    cases = []
+    for _ in range(500):
+        concepts = rng.choice(groups)
+        first, second = rng.sample(concepts, 2)
+        cases.append(("What is the difference between {} and {}?".format(first[1][0], second[1][0]), first, second))
+
+    samples = []
+    for _ in range(lookups // len(cases)):
+        for question, _, _ in cases:
+            started = time.perf_counter_ns()
+            matrix.lookup(question)
+            samples.append(time.perf_counter_ns() - started)
+    results.update({"comparisons_lookup_" + key: value for key, value in summarize(samples).items()})
+
+    # Without the matrix: find the concepts, then render their table for each question
+    samples = []
+    route = matrix.router.route
+    for _ in range(lookups // len(cases)):
+        for question, first, second in cases:
+            started = time.perf_counter_ns()
+            route(question)
+            render_comparison(first, second)
+            samples.append(time.perf_counter_ns() - started)
+    results.update({"comparisons_on_demand_" + key: value for key, value in summarize(samples).items()})
+    return results
@@ -0,0 +1,47 @@
+"""Dialogue generation timings: inline versus from the pregenerated library"""
+
+import functools
+import tempfile
+import time
+
+from study_tool.dialogue import DialogueLibrary, generate_dialogue
+from study_tool.knowledge_base import ECONOMICS_KNOWLEDGE_BASE
+from study_tool.tts import AudioCache, synthesize_dialogue
+
+from .bench_engine import summarize
+
+
+def run(rounds=200):
+    """Time a topic switch that generates on the spot against a library lookup"""
+    knowledge_base = ECONOMICS_KNOWLEDGE_BASE
+    keys = list(knowledge_base)
+    samples = []
+    for _ in range(rounds):
+        for key in keys:
+            started = time.perf_counter_ns()
+            generate_dialogue(key, knowledge_base[key])
+            samples.append(time.perf_counter_ns() - started)
+    results = {"dialogue_generate_" + key: value for key, value in summarize(samples).items()}
+
+    # A fresh audio cache, so the library pays for every clip as on a cold start
+    with tempfile.TemporaryDirectory() as root:
+        synthesize = functools.partial(synthesize_dialogue, cache=AudioCache(root))
+        started = time.perf_counter()
+        synthesize(generate_dialogue(keys[-1], knowledge_base[keys[-1]]))
+        results["dialogue_inline_with_audio_ms"] = (time.perf_counter() - started) * 1000
+
+        library = DialogueLibrary(synthesize=synthesize)
+        started = time.perf_counter()
+        for future in library.prefetch(knowledge_base, "bench").values():
+            future.result()
+        results["dialogue_pregenerate_all_ms"] = (time.perf_counter() - started) * 1000
+        results["dialogue_topics"] = float(len(library.topics(knowledge_base, "bench")))
+
+        samples = []
+        for _ in range(rounds):
+            for key in keys:
+                started = time.perf_counter_ns()
+                library.get(knowledge_base, "bench", key)
+                samples.append(time.perf_counter_ns() - started)
+        results.update({"dialogue_switch_" + key: value for key, value in summarize(samples).items()})
+    return results
@@ -0,0 +1,75 @@
+"""Latency and allocation benchmark for the answer engine"""
+
+import time
+import tracemalloc
+
+from study_tool import ECONOMICS_KNOWLEDGE_BASE, AnswerEngine
+
+from .corpus import build_corpus
+
+
+def percentile(samples, fraction):
+    """Return the value at the given fraction of the sorted samples"""
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize(samples_ns):
+    """Summarize nanosecond timings as microsecond percentiles"""
+    return {
+        "p50_us": percentile(samples_ns, 0.50) / 1000,
+        "p99_us": percentile(samples_ns, 0.99) / 1000,
+        "mean_us": sum(samples_ns) / len(samples_ns) / 1000,
+    }
+
+
+def time_calls(func, questions):
+    """Time func on every question, one sample per call"""
+    samples = []
+    for question in questions:
+        start = time.perf_counter_ns()
+        func(question)
+        samples.append(time.perf_counter_ns() - start)
+    return samples
+
+
+def measure_allocations(func, questions):
+    """Return peak traced memory and bytes allocated per call, in bytes"""
+    tracemalloc.start()
+    try:
+        before, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        for question in questions:
+            func(question)
+        after, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {
+        "alloc_peak_bytes": peak - before,
+        "alloc_retained_bytes_per_call": (after - before) / len(questions),
+    }
+
+
+def run(corpus_size=5000):
+    """Benchmark uncached and cached answering over the synthetic corpus"""
+    questions = build_corpus(corpus_size)
+
+    start = time.perf_counter()
+    engine = AnswerEngine(ECONOMICS_KNOWLEDGE_BASE)
+    build_ms = (time.perf_counter() - start) * 1000
+
+    results = {"engine_build_ms": build_ms}
+
+    uncached = time_calls(engine.compose_answer, questions)
+    results.update({"uncached_" + key: value for key, value in summarize(uncached).items()})
+    results.update({"uncached_" + key: value
+                    for key, value in measure_allocations(engine.compose_answer, questions).items()})
+
+    # The first pass fills the cache, the second measures hits
+    time_calls(engine.answer, questions)
+    cached = time_calls(engine.answer, questions)
+    results.update({"cached_" + key: value for key, value in summarize(cached).items()})
+    results.update({"cached_" + key: value
+                    for key, value in measure_allocations(engine.answer, questions).items()})
+    return results
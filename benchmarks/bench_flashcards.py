@@ -0,0 +1,42 @@
+"""Spaced-repetition scheduler timings on a large synthetic deck"""
+
+import random
+import time
+
+from study_tool.flashcards import AGAIN, EASY, GOOD, HARD, ReviewState, Scheduler
+
+from .bench_engine import summarize
+
+
+def run(card_count=100000, review_count=50000, seed=17):
+    """Time building a scheduler and picking plus grading cards one at a time"""
+    rng = random.Random(seed)
+    start = time.perf_counter()
+    scheduler = Scheduler(card_count)
+    results = {"flashcards_build_ms": (time.perf_counter() - start) * 1000,
+               "flashcards_cards": float(card_count),
+               "flashcards_state_bytes_per_card": float(ReviewState.bytes_per_card())}
+
+    # A simulated clock a second apart per review, so forgotten cards come back
+    now = 1.7e9
+    samples = []
+    for _ in range(review_count):
+        grade = rng.choice((AGAIN, HARD, GOOD, GOOD, EASY))
+        started = time.perf_counter_ns()
+        card_id = scheduler.next_card(now)
+        scheduler.review(card_id, grade, now)
+        samples.append(time.perf_counter_ns() - started)
+        now += 1.0
+    results.update({"flashcards_review_" + key: value for key, value in summarize(samples).items()})
+
+    # The tab shows the due count on every rerun
+    start = time.perf_counter()
+    scheduler.due_count(now)
+    results["flashcards_due_count_ms"] = (time.perf_counter() - start) * 1000
+
+    # Restoring a student's saved state rebuilds the heap from the arrays
+    data = scheduler.state.to_bytes()
+    start = time.perf_counter()
+    Scheduler(card_count, ReviewState.from_bytes(card_count, data))
+    results["flashcards_restore_ms"] = (time.perf_counter() - start) * 1000
+    return results
@@ -0,0 +1,224 @@
+"""Rerun timings against a real ``streamlit run`` server over its websocket.
+
+AppTest always re-executes the whole script, so it cannot show what a
+fragment saves. This suite starts app.py as a headless server, then drives
+one browser-like session with the same protobuf messages the frontend
+sends: a widget event inside a fragment asks for a fragment-only rerun, as
+a real browser would. For each interaction it records the time until the
+server reports the run finished and how many elements were re-sent.
+"""
+
+import os
+import socket
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+
+from .bench_engine import summarize
+from .bench_reruns import APP_PATH
+
+# ScriptFinishedStatus.FINISHED_EARLY_FOR_RERUN: an st.rerun() follows
+FINISHED_EARLY_FOR_RERUN = 2
+
+
+def _free_port():
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        return probe.getsockname()[1]
+
+
+@contextmanager
+def running_app(port=None, startup_timeout=60):
+    """Serve app.py headlessly on a local port for the duration of the block.
+
+    Yields (websocket url, server process id).
+    """
+    port = port or _free_port()
+    command = [sys.executable, "-m", "streamlit", "run", APP_PATH,
+               "--server.headless", "true", "--server.port", str(port),
+               "--server.enableXsrfProtection", "false", "--browser.gatherUsageStats", "false"]
+    server = subprocess.Popen(command, cwd=os.path.dirname(APP_PATH),
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        deadline = time.monotonic() + startup_timeout
+        while True:
+            try:
+                socket.create_connection(("127.0.0.1", port), timeout=0.2).close()
+                break
+            except OSError:
+                if server.poll() is not None or time.monotonic() > deadline:
+                    raise RuntimeError("streamlit server did not start on port {}".format(port))
+                time.sleep(0.2)
+        yield "ws://127.0.0.1:{}/_stcore/stream".format(port), server.pid
+    finally:
+        server.terminate()
+        server.wait()
+
+
+class LiveSession:
+    """One browser-like session speaking Streamlit's websocket protocol"""
+
+    def __init__(self, url, student="bench-live", timeout=120):
+        from websockets.sync.client import connect
+
+        self.connection = connect(url, subprotocols=["streamlit"], max_size=None)
+        self.query_string = "student=" + student
+        # Seconds to wait for the server before giving up on a run
+        self.timeout = timeout
+        # Messages of exceptions the app displayed
+        self.exceptions = []
+        # label -> (element type, widget id, fragment id)
+        self.widgets = {}
+        self.text_values = {}
+        self.slider_values = {}
+        self.toggle_values = {}
+
+    def close(self):
+        self.connection.close()
+
+    def _send(self, widget_states, fragment_id):
+        from streamlit.proto.BackMsg_pb2 import BackMsg
+
+        message = BackMsg()
+        message.rerun_script.query_string = self.query_string
+        message.rerun_script.fragment_id = fragment_id
+        message.rerun_script.widget_states.widgets.extend(widget_states)
+        self.connection.send(message.SerializeToString())
+
+    def _receive_run(self):
+        """Read messages until the run (and any st.rerun() it chains) finishes"""
+        from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+
+        deltas = 0
+        while True:
+            message = ForwardMsg()
+            message.ParseFromString(self.connection.recv(timeout=self.timeout))
+            kind = message.WhichOneof("type")
+            if kind == "delta":
+                deltas += 1
+                if message.delta.WhichOneof("type") == "new_element":
+                    element = message.delta.new_element
+                    element_type = element.WhichOneof("type")
+                    # st.toggle is sent as a checkbox
+                    if element_type in ("button", "text_input", "slider", "checkbox"):
+                        widget = getattr(element, element_type)
+                        self.widgets[widget.label] = (element_type, widget.id, message.delta.fragment_id)
+                    elif element_type == "exception":
+                        self.exceptions.append(element.exception.message)
+            elif kind == "script_finished" and message.script_finished != FINISHED_EARLY_FOR_RERUN:
+                return deltas
+
+    def _widget_states(self):
+        from streamlit.proto.WidgetStates_pb2 import WidgetState
+
+        states = []
+        for label, value in self.text_values.items():
+            state = WidgetState(id=self.widgets[label][1])
+            state.string_value = value
+            states.append(state)
+        for label, value in self.slider_values.items():
+            state = WidgetState(id=self.widgets[label][1])
+            state.double_array_value.data.append(value)
+            states.append(state)
+        for label, value in self.toggle_values.items():
+            state = WidgetState(id=self.widgets[label][1])
+            state.bool_value = value
+            states.append(state)
+        return states
+
+    def load(self):
+        """Open the page; returns (seconds, deltas)"""
+        start = time.perf_counter()
+        self._send([], "")
+        deltas = self._receive_run()
+        return time.perf_counter() - start, deltas
+
+    def type_text(self, label, value):
+        """Change a text input without rerunning, as typing does before a click"""
+        self.text_values[label] = value
+
+    def slide(self, label, value):
+        """Move a slider; returns (seconds, deltas) for the rerun it causes"""
+        self.slider_values[label] = value
+        start = time.perf_counter()
+        self._send(self._widget_states(), self.widgets[label][2])
+        deltas = self._receive_run()
+        return time.perf_counter() - start, deltas
+
+    def switch(self, label, value):
+        """Turn a toggle on or off; returns (seconds, deltas) for the rerun it causes"""
+        self.toggle_values[label] = value
+        start = time.perf_counter()
+        self._send(self._widget_states(), self.widgets[label][2])
+        deltas = self._receive_run()
+        return time.perf_counter() - start, deltas
+
+    def click(self, label):
+        """Click a button; returns (seconds, deltas) for the rerun it causes"""
+        from streamlit.proto.WidgetStates_pb2 import WidgetState
+
+        _, widget_id, fragment_id = self.widgets[label]
+        trigger = WidgetState(id=widget_id)
+        trigger.trigger_value = True
+        start = time.perf_counter()
+        self._send(self._widget_states() + [trigger], fragment_id)
+        deltas = self._receive_run()
+        return time.perf_counter() - start, deltas
+
+
+def _page_load(session):
+    return session.load()
+
+
+def _ask(session):
+    session.type_text("Type your question here:", "What is the law of demand?")
+    return session.click("Ask Question")
+
+
+def _clear_chat(session):
+    return session.click("Clear Chat")
+
+
+def _skip_dialogue(session):
+    return session.click("⏭️ Skip to End")
+
+
+def _slide_demand(session):
+    if not session.toggle_values.get("Open the market solver"):
+        # The solver stays closed, and its sliders unsent, until a student opens it
+        session.switch("Open the market solver", True)
+    # Alternates between two settings, so after the first pass both are cached
+    session.toggle = not getattr(session, "toggle", False)
+    return session.slide("Quantity demanded at price 0", 120.0 if session.toggle else 100.0)
+
+
+SCENARIOS = {
+    "page_load": _page_load,
+    "qa_ask": _ask,
+    "qa_clear": _clear_chat,
+    "dialogue_skip": _skip_dialogue,
+    "market_slider": _slide_demand,
+}
+
+
+def run(iterations=10):
+    """Time each interaction against a live server"""
+    results = {}
+    with running_app() as (url, _):
+        session = LiveSession(url)
+        try:
+            # The first load fills the caches and learns the widget ids
+            session.load()
+            for name, interact in SCENARIOS.items():
+                samples, deltas = [], []
+                for _ in range(iterations):
+                    seconds, sent = interact(session)
+                    samples.append(seconds * 1e9)
+                    deltas.append(sent)
+                for key, value in summarize(samples).items():
+                    results[name + "_" + key.replace("_us", "_ms")] = value / 1000
+                results[name + "_deltas"] = sum(deltas) / len(deltas)
+        finally:
+            session.close()
+    return results
@@ -0,0 +1,113 @@
+"""Streaming model backend timings against the local stand-in server.
+
+The stand-in runs as its own process with no artificial delays, so the
+numbers are the backend's own overhead: time to first token and to the full
+answer over pooled connections, how many upstream calls a burst of
+identical questions costs, and how fast the rule-based fallback answers
+when the server is down.
+"""
+
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+from contextlib import contextmanager
+
+from study_tool.llm import ChatCompletionsBackend, StreamingTutor
+
+from .bench_engine import summarize
+from .bench_live import _free_port
+from .bench_reruns import APP_PATH
+from .corpus import build_corpus
+
+
+@contextmanager
+def running_stand_in(token_delay=0.0, first_token_delay=0.0, startup_timeout=30):
+    """Serve the stand-in model on a local port; yields its base URL"""
+    port = _free_port()
+    command = [sys.executable, "-m", "study_tool.llm", "serve", "--port", str(port),
+               "--token-delay", str(token_delay), "--first-token-delay", str(first_token_delay)]
+    server = subprocess.Popen(command, cwd=os.path.dirname(APP_PATH),
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    base = "http://127.0.0.1:{}".format(port)
+    try:
+        deadline = time.monotonic() + startup_timeout
+        while True:
+            try:
+                urllib.request.urlopen(base + "/stats", timeout=0.5).close()
+                break
+            except OSError:
+                if server.poll() is not None or time.monotonic() > deadline:
+                    raise RuntimeError("stand-in model server did not start on port {}".format(port))
+                time.sleep(0.1)
+        yield base
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def _served(base):
+    with urllib.request.urlopen(base + "/stats") as response:
+        return json.load(response)["requests"]
+
+
+def _time_stream(tutor, question, context):
+    """Return (first token ns, total ns, source) for one streamed answer"""
+    start = time.perf_counter_ns()
+    stream = tutor.stream_answer(question, context)
+    first = None
+    for _ in stream:
+        if first is None:
+            first = time.perf_counter_ns() - start
+    return first, time.perf_counter_ns() - start, stream.source
+
+
+def run(question_count=200, burst=32):
+    """Time sequential answers, a burst of identical questions and the fallback"""
+    results = {}
+    with running_stand_in() as base:
+        tutor = StreamingTutor(ChatCompletionsBackend(base + "/v1/chat/completions"))
+        try:
+            firsts, totals = [], []
+            for question in build_corpus(question_count):
+                first, total, _ = _time_stream(tutor, question, "context")
+                firsts.append(first)
+                totals.append(total)
+            results.update({"llm_first_token_" + key.replace("_us", "_ms"): value / 1000
+                            for key, value in summarize(firsts).items()})
+            results.update({"llm_answer_" + key.replace("_us", "_ms"): value / 1000
+                            for key, value in summarize(totals).items()})
+            results["llm_connections_opened"] = float(tutor.backend.pool.opened)
+
+            # Sessions asking the same question at once share one upstream call
+            before = _served(base)
+            barrier = threading.Barrier(burst)
+            sources = []
+
+            def ask():
+                barrier.wait()
+                sources.append(_time_stream(tutor, "What is market equilibrium?", "context")[2])
+
+            threads = [threading.Thread(target=ask) for _ in range(burst)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            results["llm_burst_sessions"] = float(burst)
+            results["llm_burst_upstream_calls"] = float(_served(base) - before)
+            results["llm_burst_answered_by_model"] = float(sources.count("llm"))
+        finally:
+            tutor.close()
+
+    # Nothing listens on a fresh port: every answer comes from the rules
+    down = StreamingTutor(ChatCompletionsBackend("http://127.0.0.1:{}/v1/chat/completions".format(_free_port())))
+    try:
+        samples = [_time_stream(down, question, "context")[1] for question in build_corpus(50)]
+    finally:
+        down.close()
+    results.update({"llm_fallback_" + key.replace("_us", "_ms"): value / 1000
+                    for key, value in summarize(samples).items()})
+    return results
@@ -0,0 +1,65 @@
+"""Headless rerun timings for each tab of app.py using Streamlit's AppTest"""
+
+import time
+from pathlib import Path
+
+from .bench_engine import summarize
+
+APP_PATH = str(Path(__file__).resolve().parent.parent / "app.py")
+
+
+def _press(at, label):
+    """Click the first button with the given label"""
+    for button in at.button:
+        if button.label == label:
+            button.click()
+            return
+    raise LookupError("No button labelled {!r}".format(label))
+
+
+def _overview(at):
+    """Plain rerun, as when a student opens the Overview tab"""
+
+
+def _ask_question(at):
+    """Ask a question on the Q&A tab"""
+    at.text_input[0].input("What is the law of demand?")
+    _press(at, "Ask Question")
+
+
+def _play_dialogue(at):
+    """Start the dialogue playback on the Audio Dialogue tab"""
+    _press(at, "▶️ Play Dialogue Simulation")
+
+
+def _video_resources(at):
+    """Plain rerun, as when a student reads the Video Resources tab"""
+
+
+TAB_SCENARIOS = {
+    "overview": _overview,
+    "qa": _ask_question,
+    "dialogue": _play_dialogue,
+    "video": _video_resources,
+}
+
+
+def run(iterations=5):
+    """Time one interaction-triggered rerun per tab, several times each"""
+    from streamlit.testing.v1 import AppTest
+
+    results = {}
+    for name, interact in TAB_SCENARIOS.items():
+        at = AppTest.from_file(APP_PATH, default_timeout=60)
+        at.run()
+        samples = []
+        for _ in range(iterations):
+            interact(at)
+            start = time.perf_counter_ns()
+            at.run()
+            samples.append(time.perf_counter_ns() - start)
+            if at.exception:
+                raise RuntimeError("app.py raised during the {} rerun: {}".format(name, at.exception))
+        for key, value in summarize(samples).items():
+            results[name + "_" + key.replace("_us", "_ms")] = value / 1000
+    return results
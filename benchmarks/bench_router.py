@@ -0,0 +1,84 @@
+"""Intent routing: the Aho-Corasick router against the original keyword cascade"""
+
+import random
+import time
+
+from study_tool.knowledge_base import ECONOMICS_KNOWLEDGE_BASE
+from study_tool.router import GREETING, IntentRouter
+from study_tool.search import build_knowledge_index
+
+from .bench_engine import summarize
+from .corpus import build_corpus
+
+# The routing decisions of the original get_ai_response, in their order:
+# substring tests on the lowercased question, first match wins
+LEGACY_CASCADE = (
+    ("greeting", ("hello", "hi", "hey")),
+    ("demand", ("demand",)),
+    ("supply", ("supply",)),
+    ("equilibrium", ("equilibrium", "market clearing")),
+    ("elasticity", ("elasticity", "elastic")),
+    ("consumer_behavior", ("utility", "consumer", "satisfaction")),
+    ("production", ("production",)),
+    ("costs", ("cost",)),
+    ("market_structures", ("market", "competition", "monopoly", "oligopoly")),
+    ("exam_tips", ("exam", "tip", "prepare")),
+    ("comparison", ("difference",)),
+)
+
+
+def legacy_route(question):
+    """The topic the original cascade picked, or "fallback\""""
+    question_lower = question.lower()
+    for intent, keywords in LEGACY_CASCADE:
+        if any(word in question_lower for word in keywords):
+            return intent
+    return "fallback"
+
+
+def long_questions(count, words, rng):
+    """Questions of about ``words`` words, several corpus questions run together"""
+    pool = [question for question in build_corpus(2000) if legacy_route(question) != "greeting"]
+    questions = []
+    for _ in range(count):
+        parts = []
+        while sum(len(part.split()) for part in parts) < words:
+            parts.append(rng.choice(pool))
+        questions.append(" ".join(parts))
+    return questions
+
+
+def time_each(func, questions, repeat=3):
+    samples = []
+    for _ in range(repeat):
+        for question in questions:
+            started = time.perf_counter_ns()
+            func(question)
+            samples.append(time.perf_counter_ns() - started)
+    return summarize(samples)
+
+
+def run(seed=23):
+    """Time routing short and long questions, and count false greetings"""
+    rng = random.Random(seed)
+    started = time.perf_counter()
+    router = IntentRouter.from_knowledge_base(ECONOMICS_KNOWLEDGE_BASE)
+    results = {"router_compile_ms": (time.perf_counter() - started) * 1000,
+               "router_phrases": float(router.phrase_count),
+               "router_states": float(router.state_count)}
+    index = build_knowledge_index(ECONOMICS_KNOWLEDGE_BASE)
+
+    short = build_corpus(2000)
+    for label, questions in (("short", short),
+                             ("long100", long_questions(300, 100, rng)),
+                             ("long1000", long_questions(50, 1000, rng))):
+        for name, func in (("router", router.scan), ("cascade", legacy_route),
+                           ("bm25", lambda question: index.search(question, top_k=2))):
+            results.update({"router_{}_{}_{}".format(label, name, key): value
+                            for key, value in time_each(func, questions).items()})
+
+    # Questions with no greeting word that the cascade greets anyway ("which", "this")
+    questions = short + ["Which costs are fixed?", "Is this market a monopoly?", "Think about the shift in demand"]
+    results["router_false_greetings_cascade"] = float(sum(
+        1 for question in questions if legacy_route(question) == "greeting" and GREETING not in router.intents(question)))
+    return results
@@ -0,0 +1,46 @@
+"""Semantic search latency over a large synthetic passage collection"""
+
+import random
+import time
+
+from study_tool.knowledge_base import ECONOMICS_KNOWLEDGE_BASE
+from study_tool.search import iter_text
+from study_tool.semantic import SemanticIndex
+
+from .bench_engine import summarize
+from .corpus import build_corpus
+
+
+def build_passages(count, seed=99):
+    """Shuffle knowledge base words into ``count`` synthetic passages"""
+    rng = random.Random(seed)
+    words = " ".join(iter_text(ECONOMICS_KNOWLEDGE_BASE)).split()
+    return ["passage{} ".format(i) + " ".join(rng.choices(words, k=30)) for i in range(count)]
+
+
+def run(passage_count=20000, query_count=1000, batch_size=100):
+    """Time single and batched top-k queries against passage_count passages"""
+    passages = build_passages(passage_count)
+    index = SemanticIndex()
+    start = time.perf_counter()
+    index.add(list(range(len(passages))), passages)
+    results = {"semantic_index_build_ms": (time.perf_counter() - start) * 1000,
+               "semantic_passages": float(passage_count)}
+
+    questions = build_corpus(query_count)
+    samples = []
+    for question in questions:
+        start = time.perf_counter_ns()
+        index.search(question, top_k=5)
+        samples.append(time.perf_counter_ns() - start)
+    results.update({"semantic_single_" + key: value for key, value in summarize(samples).items()})
+
+    samples = []
+    for offset in range(0, len(questions), batch_size):
+        batch = questions[offset:offset + batch_size]
+        start = time.perf_counter_ns()
+        index.search_batch(batch, top_k=5)
+        # Recorded per question so it compares directly with single queries
+        samples.append((time.perf_counter_ns() - start) / len(batch))
+    results.update({"semantic_batch_" + key: value for key, value in summarize(samples).items()})
+    return results
@@ -0,0 +1,31 @@
+"""Cold-start cost of the answer engine: snapshot load versus rebuild"""
+
+import os
+import tempfile
+
+from study_tool.engine import AnswerEngine
+from study_tool.knowledge_base import ECONOMICS_KNOWLEDGE_BASE
+from study_tool.snapshot import load_engine, write_snapshot
+
+from .bench_engine import summarize
+
+
+def run(iterations=30):
+    """Time to first answer when loading from a snapshot and when rebuilding"""
+    directory = tempfile.mkdtemp()
+    path = os.path.join(directory, "engine_snapshot.bin")
+    try:
+        write_snapshot(AnswerEngine(ECONOMICS_KNOWLEDGE_BASE), path)
+        results = {"startup_snapshot_bytes": float(os.path.getsize(path))}
+        for name, snapshot_path in (("snapshot", path), ("rebuild", None)):
+            samples = []
+            for _ in range(iterations):
+                engine = load_engine(ECONOMICS_KNOWLEDGE_BASE, path=snapshot_path)
+                samples.append(engine.startup["first_answer_ms"] * 1e6)
+            results.update({"startup_{}_first_answer_{}".format(name, key.replace("_us", "_ms")): value / 1000
+                            for key, value in summarize(samples).items()})
+    finally:
+        if os.path.exists(path):
+            os.remove(path)
+        os.rmdir(directory)
+    return results
@@ -0,0 +1,70 @@
+"""Transcript index timings on a synthetic collection of lecture transcripts"""
+
+import os
+import random
+import tempfile
+import time
+
+from study_tool import ECONOMICS_KNOWLEDGE_BASE
+from study_tool.search import iter_text
+from study_tool.transcripts import TranscriptIndex, format_timestamp
+
+from .bench_engine import summarize
+
+PHRASES = ["law of demand", "marginal cost", "price elasticity of demand", "perfect competition",
+           "consumer equilibrium", "factors of production"]
+
+
+def write_collection(directory, videos, cues_per_video, rng):
+    """Write SRT files whose cues are runs of knowledge base text"""
+    words = [word for text in iter_text(ECONOMICS_KNOWLEDGE_BASE) for word in text.split()]
+    for number in range(videos):
+        blocks = []
+        for cue in range(cues_per_video):
+            start = rng.randrange(len(words) - 12)
+            text = " ".join(words[start:start + rng.randint(6, 12)])
+            blocks.append("{}\n0:{},000 --> 0:{},500\n{}\n".format(
+                cue + 1, format_timestamp(cue * 3), format_timestamp(cue * 3 + 2), text))
+        with open(os.path.join(directory, "lecture{:04d}.srt".format(number)), "w", encoding="utf-8") as srt:
+            srt.write("\n".join(blocks))
+
+
+def run(videos=200, cues_per_video=1000, seed=22):
+    """Time a full index, an incremental refresh and phrase and near queries"""
+    rng = random.Random(seed)
+    with tempfile.TemporaryDirectory() as directory:
+        write_collection(directory, videos, cues_per_video, rng)
+        index = TranscriptIndex(directory)
+        started = time.perf_counter()
+        index.refresh(force=True)
+        results = {"transcripts_index_ms": (time.perf_counter() - started) * 1000,
+                   "transcripts_videos": float(len(index)),
+                   "transcripts_words": float(index.stats()["words"])}
+
+        # Nothing changed: only the directory is listed
+        started = time.perf_counter()
+        index.refresh(force=True)
+        results["transcripts_refresh_unchanged_ms"] = (time.perf_counter() - started) * 1000
+
+        # One changed file is re-parsed, the rest are left alone
+        with open(os.path.join(directory, "lecture0000.srt"), "a", encoding="utf-8") as srt:
+            srt.write("\n{}\n9:00:00,000 --> 9:00:02,000\nThe law of demand, once more.\n".format(cues_per_video + 1))
+        parsed = index.parsed_files
+        started = time.perf_counter()
+        index.refresh(force=True)
+        results["transcripts_refresh_one_changed_ms"] = (time.perf_counter() - started) * 1000
+        results["transcripts_refresh_parsed_files"] = float(index.parsed_files - parsed)
+
+        for name, queries in (("phrase", ['"{}"'.format(phrase) for phrase in PHRASES]),
+                              ("near", PHRASES)):
+            samples = []
+            for _ in range(20):
+                for query in queries:
+                    started = time.perf_counter_ns()
+                    index.search(query)
+                    samples.append(time.perf_counter_ns() - started)
+            results.update({"transcripts_{}_{}".format(name, key): value for key, value in summarize(samples).items()})
+
+        # Including the places where a cue boundary splits the phrase
+        results["transcripts_phrase_hits"] = float(len(index.search('"law of demand"', limit=10 ** 6)))
+    return results
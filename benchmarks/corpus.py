@@ -0,0 +1,55 @@
+"""Synthetic question corpus covering every topic, greetings and fallbacks"""
+
+import random
+
+from study_tool.knowledge_base import TOPIC_KEYWORDS
+
+QUESTION_TEMPLATES = [
+    "What is {}?",
+    "Explain {} to me",
+    "Can you tell me about {} in simple words?",
+    "What are the main factors behind {}?",
+    "How does {} work in a real market?",
+    "Give me an example of {}",
+    "Why is {} important for the exam?",
+    "Define {} and list its types",
+]
+
+GREETINGS = ["hi", "hello", "hey there", "Hello!", "hi, how are you?"]
+
+FALLBACKS = [
+    "What time is it?",
+    "Who won the football match?",
+    "Tell me a joke",
+    "How tall is Mount Everest?",
+    "random words with no meaning",
+]
+
+COMPARISONS = [
+    "What is the difference between demand and supply?",
+    "demand vs supply",
+    "Compare supply and demand",
+]
+
+
+def build_corpus(size=5000, seed=1234):
+    """Return a deterministic list of benchmark questions"""
+    rng = random.Random(seed)
+    topic_questions = [template.format(keyword)
+                       for keywords in TOPIC_KEYWORDS.values()
+                       for keyword in keywords
+                       for template in QUESTION_TEMPLATES]
+    pool = topic_questions + GREETINGS + FALLBACKS + COMPARISONS
+
+    # Every question appears at least once, the rest is sampled
+    corpus = list(pool)
+    while len(corpus) < size:
+        question = rng.choice(pool)
+        # Vary case and punctuation so normalization is exercised too
+        if rng.random() < 0.3:
+            question = question.upper()
+        if rng.random() < 0.3:
+            question = question.rstrip("?!") + " ??"
+        corpus.append(question)
+    rng.shuffle(corpus)
+    return corpus[:size]
@@ -0,0 +1,158 @@
+"""Concurrent-session load test for app.py.
+
+Starts app.py with ``streamlit run`` and connects N simulated students at
+once, each a browser-like websocket session (see bench_live.LiveSession)
+driven from its own thread. The server runs every session's script in its
+own thread, as it does in production, so runs really overlap. Each student
+issues a scripted mix of questions, "Clear Chat", skipping the dialogue and
+moving a market slider (a fragment rerun). For each concurrency level a
+fresh server is started, and the level reports throughput, rerun latency
+percentiles and the server's RSS.
+
+Usage:
+    python -m benchmarks.loadtest --sessions 1 2 4 8 --actions 20
+    python -m benchmarks.loadtest --sessions 16 --json loadtest.json
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+
+from .bench_engine import percentile
+from .bench_live import LiveSession, _clear_chat, _skip_dialogue, _slide_demand, running_app
+from .corpus import build_corpus
+
+# Relative weights of the scripted actions
+ACTION_WEIGHTS = {
+    "ask": 6,
+    "market_slider": 3,
+    "dialogue_skip": 1,
+    "clear_chat": 1,
+}
+
+
+def process_rss_bytes(pid):
+    """Resident set size of a Linux process, in bytes"""
+    with open("/proc/{}/statm".format(pid)) as statm:
+        return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+
+def _perform(session, action, rng, questions):
+    """Run one scripted action; returns (seconds, deltas) for the rerun it causes"""
+    if action == "ask":
+        session.type_text("Type your question here:", rng.choice(questions))
+        return session.click("Ask Question")
+    if action == "market_slider":
+        return _slide_demand(session)
+    if action == "dialogue_skip":
+        return _skip_dialogue(session)
+    return _clear_chat(session)
+
+
+def run_session(url, session_number, actions, questions, latencies, errors, start_barrier):
+    """One simulated student: open the page, then run the scripted actions"""
+    rng = random.Random(session_number)
+    names = list(ACTION_WEIGHTS)
+    weights = list(ACTION_WEIGHTS.values())
+    session = None
+    try:
+        session = LiveSession(url, student="loadtest-{}".format(session_number))
+        # The first load learns the widget ids
+        session.load()
+        start_barrier.wait()
+        for _ in range(actions):
+            seconds, _ = _perform(session, rng.choices(names, weights)[0], rng, questions)
+            latencies.append(seconds)
+        errors.extend(session.exceptions)
+    except Exception as error:
+        errors.append(repr(error))
+        # Do not leave the other sessions waiting at the barrier
+        start_barrier.abort()
+    finally:
+        if session is not None:
+            session.close()
+
+
+def run_level(sessions, actions, questions):
+    """Run ``sessions`` concurrent sessions against a fresh server and summarize them"""
+    latencies = []
+    errors = []
+    with running_app() as (url, pid):
+        # The first page load imports the app and fills the shared caches
+        warmup = LiveSession(url, student="loadtest-warmup")
+        try:
+            warmup.load()
+        finally:
+            warmup.close()
+        rss_before = process_rss_bytes(pid)
+        barrier = threading.Barrier(sessions + 1)
+        threads = [threading.Thread(target=run_session,
+                                    args=(url, i, actions, questions, latencies, errors, barrier))
+                   for i in range(sessions)]
+        for thread in threads:
+            thread.start()
+        try:
+            # Time only the scripted actions, not the first page loads
+            barrier.wait()
+        except threading.BrokenBarrierError:
+            pass
+        start = time.perf_counter()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+        rss_after = process_rss_bytes(pid)
+
+    result = {
+        "sessions": sessions,
+        "reruns": len(latencies),
+        "errors": len(errors),
+        "throughput_per_s": len(latencies) / elapsed if elapsed else 0.0,
+        "rss_total_mib": rss_after / 2 ** 20,
+        "rss_per_session_mib": max(0, rss_after - rss_before) / 2 ** 20 / sessions,
+    }
+    if latencies:
+        result.update({
+            "p50_ms": percentile(latencies, 0.50) * 1000,
+            "p95_ms": percentile(latencies, 0.95) * 1000,
+            "p99_ms": percentile(latencies, 0.99) * 1000,
+        })
+    if errors:
+        result["first_error"] = errors[0]
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 2, 4, 8],
+                        help="concurrency levels to run, in order (default: 1 2 4 8)")
+    parser.add_argument("--actions", type=int, default=20, help="scripted actions per session")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args(argv)
+
+    questions = build_corpus(500)
+    results = []
+    print("{:>8} {:>8} {:>7} {:>10} {:>9} {:>9} {:>9} {:>10} {:>12}".format(
+        "sessions", "reruns", "errors", "reruns/s", "p50 ms", "p95 ms", "p99 ms",
+        "RSS MiB", "MiB/session"))
+    for sessions in args.sessions:
+        result = run_level(sessions, args.actions, questions)
+        results.append(result)
+        print("{sessions:>8} {reruns:>8} {errors:>7} {throughput_per_s:>10.1f} {p50:>9.1f} "
+              "{p95:>9.1f} {p99:>9.1f} {rss_total_mib:>10.1f} {rss_per_session_mib:>12.2f}".format(
+                  p50=result.get("p50_ms", 0.0), p95=result.get("p95_ms", 0.0),
+                  p99=result.get("p99_ms", 0.0), **result))
+        if "first_error" in result:
+            print("  first error: " + result["first_error"])
+
+    if args.json:
+        with open(args.json, "w") as out:
+            json.dump(results, out, indent=2)
+    return 1 if any(result["errors"] for result in results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
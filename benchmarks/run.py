@@ -0,0 +1,185 @@
+"""Run the benchmarks and compare them against the stored JSON baselines.
+
+Usage:
+    python -m benchmarks.run                     # compare against baselines
+    python -m benchmarks.run --update-baseline   # record new baselines
+    python -m benchmarks.run --suite engine --threshold 0.5
+    python -m benchmarks.run --suite engine --against main
+
+The run fails (exit status 1) when a latency percentile or allocation
+metric is more than ``threshold`` above its baseline. With ``--against REF``
+the baseline is instead measured in the same run: REF is checked out into a
+temporary git worktree, this tree's benchmarks are copied over it, and the
+two trees are run alternately in fresh processes.
+"""
+
+import argparse
+import contextlib
+import importlib
+import json
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+BENCHMARK_DIR = Path(__file__).resolve().parent
+BASELINE_DIR = BENCHMARK_DIR / "baselines"
+REPO_ROOT = BENCHMARK_DIR.parent
+
+# Suite name -> module; imported on demand so --against works on older revisions
+SUITES = {
+    "comparisons": "bench_comparisons",
+    "dialogue": "bench_dialogue",
+    "engine": "bench_engine",
+    "flashcards": "bench_flashcards",
+    "live": "bench_live",
+    "llm": "bench_llm",
+    "reruns": "bench_reruns",
+    "router": "bench_router",
+    "semantic": "bench_semantic",
+    "startup": "bench_startup",
+    "transcripts": "bench_transcripts",
+}
+
+# Only these metrics gate a run; the rest are informational
+GATED_SUFFIXES = ("p50_us", "p99_us", "p50_ms", "p99_ms", "alloc_peak_bytes")
+
+
+def compare(results, baseline, threshold):
+    """Return a list of human readable regressions"""
+    regressions = []
+    for key, value in results.items():
+        if not key.endswith(GATED_SUFFIXES) or key not in baseline:
+            continue
+        limit = baseline[key] * (1 + threshold)
+        if value > limit:
+            regressions.append("{}: {:.2f} > {:.2f} (baseline {:.2f})".format(
+                key, value, limit, baseline[key]))
+    return regressions
+
+
+def load_suite(name):
+    """Return the run() function of a benchmark suite"""
+    return importlib.import_module("." + SUITES[name], __package__).run
+
+
+@contextlib.contextmanager
+def checkout(ref):
+    """Check out ``ref`` into a temporary worktree that runs this tree's benchmarks"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "ref"
+        subprocess.run(["git", "worktree", "add", "--detach", str(path), ref],
+                       cwd=REPO_ROOT, check=True, capture_output=True)
+        try:
+            # Same harness on both sides, so only the code under test differs
+            shutil.copytree(BENCHMARK_DIR, path / "benchmarks", dirs_exist_ok=True,
+                            ignore=shutil.ignore_patterns("__pycache__"))
+            yield path
+        finally:
+            subprocess.run(["git", "worktree", "remove", "--force", str(path)],
+                           cwd=REPO_ROOT, capture_output=True)
+
+
+def run_suite_in(tree, name):
+    """Run one suite in a fresh process from the given tree; None if it cannot run there"""
+    with tempfile.TemporaryDirectory() as tmp:
+        out = Path(tmp) / "results.json"
+        completed = subprocess.run(
+            [sys.executable, "-m", "benchmarks.run", "--suite", name, "--json", str(out)],
+            cwd=tree, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+        if completed.returncode:
+            print("  {} failed in {}:\n{}".format(name, tree, completed.stderr.strip()))
+            return None
+        return json.loads(out.read_text())[name]
+
+
+def median_results(runs):
+    """Per-metric median over several runs of a suite"""
+    return {key: statistics.median(run[key] for run in runs)
+            for key in runs[0] if all(key in run for run in runs)}
+
+
+def run_against(ref, suites, rounds, threshold):
+    """Measure ``suites`` on ``ref`` and on this tree in the same run and compare"""
+    failed = False
+    with checkout(ref) as ref_tree:
+        for name in suites:
+            ref_runs, runs = [], []
+            # Alternate the trees so drift on the machine hits both alike
+            for _ in range(rounds):
+                ref_runs.append(run_suite_in(ref_tree, name))
+                runs.append(run_suite_in(REPO_ROOT, name))
+            if None in ref_runs or None in runs:
+                # e.g. the suite benchmarks a feature that REF does not have yet
+                print("== {} skipped ==".format(name))
+                failed = failed or None in runs
+                continue
+            baseline, results = median_results(ref_runs), median_results(runs)
+            print("== {} (median of {}, {} -> this tree) ==".format(name, rounds, ref))
+            for key, value in sorted(results.items()):
+                print("  {:40s} {:12.3f} {:12.3f}".format(key, baseline.get(key, float("nan")), value))
+            regressions = compare(results, baseline, threshold)
+            for regression in regressions:
+                print("  REGRESSION " + regression)
+            failed = failed or bool(regressions)
+    return 1 if failed else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--suite", choices=sorted(SUITES) + ["all"], default="all")
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="allowed fractional slowdown before failing (default 0.25)")
+    parser.add_argument("--update-baseline", action="store_true",
+                        help="overwrite the stored baselines with this run")
+    parser.add_argument("--against", metavar="REF",
+                        help="measure the baseline from this git revision in the same run")
+    parser.add_argument("--rounds", type=int, default=3,
+                        help="alternating runs per tree with --against (default 3)")
+    parser.add_argument("--json", help="write the results to this file instead of comparing")
+    args = parser.parse_args(argv)
+
+    suites = sorted(SUITES) if args.suite == "all" else [args.suite]
+    if args.against:
+        return run_against(args.against, suites, args.rounds, args.threshold)
+
+    failed = False
+    all_results = {}
+    for name in suites:
+        results = load_suite(name)()
+        all_results[name] = results
+        print("== {} ==".format(name))
+        for key, value in sorted(results.items()):
+            print("  {:40s} {:12.3f}".format(key, value))
+
+        if args.json:
+            continue
+
+        baseline_path = BASELINE_DIR / (name + ".json")
+        if args.update_baseline:
+            BASELINE_DIR.mkdir(exist_ok=True)
+            payload = {"python": platform.python_version(), "results": results}
+            baseline_path.write_text(json.dumps(payload, indent=2, sort_keys=True) + "\n")
+            print("  baseline written to {}".format(baseline_path))
+            continue
+
+        if not baseline_path.exists():
+            print("  no baseline yet, run with --update-baseline")
+            continue
+
+        baseline = json.loads(baseline_path.read_text())["results"]
+        regressions = compare(results, baseline, args.threshold)
+        for regression in regressions:
+            print("  REGRESSION " + regression)
+        failed = failed or bool(regressions)
+
+    if args.json:
+        Path(args.json).write_text(json.dumps(all_results, indent=2, sort_keys=True) + "\n")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,28 @@
+"""Streamlit-free core of the Interactive Economics Study Tool.
+
+The knowledge base, answer engine and dialogue data live here so they can
+be imported by workers, scripts and tests without loading Streamlit.
+"""
+
+from .dialogue import simulate_dialogue
+from .engine import (
+    AnswerCache,
+    AnswerEngine,
+    get_ai_response,
+    get_ai_response_with_topic,
+    get_default_engine,
+)
+from .history import ChatHistory, ChatMessage
+from .knowledge_base import ECONOMICS_KNOWLEDGE_BASE
+
+__all__ = [
+    "ECONOMICS_KNOWLEDGE_BASE",
+    "AnswerCache",
+    "AnswerEngine",
+    "ChatHistory",
+    "ChatMessage",
+    "get_ai_response",
+    "get_ai_response_with_topic",
+    "get_default_engine",
+    "simulate_dialogue",
+]
@@ -0,0 +1,199 @@
+"""Answer a JSONL file of questions offline, across a process pool.
+
+Each input line is a JSON object with a "question" field (other fields,
+such as an "id", are copied to the output) or a bare JSON string. Lines are
+read lazily and sent to the workers in chunks, with only a few chunks in
+flight at a time, and results are written in input order as they come
+back, so memory stays bounded whatever the size of the input. A summary of
+throughput, the fallback rate and hits per topic is printed at the end.
+
+Answers come from the same knowledge base as the app: the compiled
+knowledge_base.ekb when there is one, with the engine loaded from its
+snapshot when the snapshot matches.
+
+    python -m study_tool.bulk questions.jsonl -o answers.jsonl
+    python -m study_tool.bulk questions.jsonl --no-answers --workers 4
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+from .engine import get_ai_response_with_topic
+from .kbfile import open_knowledge_store
+from .snapshot import load_engine
+
+# Questions sent to a worker at a time
+CHUNK_SIZE = 256
+# Chunks in flight per worker; bounds how much of the input is held in memory
+CHUNKS_PER_WORKER = 2
+
+_engine = None
+
+
+def read_questions(lines):
+    """Yield (line number, record, error) for each non-blank JSONL line"""
+    for number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as error:
+            yield number, None, "invalid JSON: {}".format(error)
+            continue
+        if isinstance(record, str):
+            record = {"question": record}
+        if not isinstance(record, dict) or not isinstance(record.get("question"), str):
+            yield number, None, "expected a string or an object with a \"question\" string"
+            continue
+        yield number, record, None
+
+
+def iter_chunks(items, size=CHUNK_SIZE):
+    """Group an iterable into lists of at most size items, lazily"""
+    items = iter(items)
+    while True:
+        chunk = list(islice(items, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def get_bulk_engine():
+    """This process's engine for the compiled knowledge base, as the app serves it"""
+    global _engine
+    if _engine is None:
+        knowledge_base, version = open_knowledge_store().snapshot()
+        _engine = load_engine(knowledge_base, version)
+    return _engine
+
+
+def answer_chunk(chunk, include_answers=True):
+    """Answer one chunk of read_questions() output; returns output records"""
+    engine = get_bulk_engine()
+    results = []
+    for number, record, error in chunk:
+        if error is not None:
+            results.append({"line": number, "error": error})
+            continue
+        response, topic = get_ai_response_with_topic(record["question"], engine=engine)
+        result = dict(record, line=number, topic=topic)
+        if include_answers:
+            result["answer"] = response
+        results.append(result)
+    return results
+
+
+def _start_worker():
+    # Build the engine once per worker rather than on its first chunk
+    get_bulk_engine()
+
+
+def answer_stream(lines, workers=None, chunk_size=CHUNK_SIZE, include_answers=True):
+    """Yield an output record per input line, in input order.
+
+    With more than one worker, chunks are answered in a process pool; at most
+    CHUNKS_PER_WORKER chunks per worker are read ahead of the output.
+    """
+    chunks = iter_chunks(read_questions(lines), chunk_size)
+    workers = workers or os.cpu_count() or 1
+    if workers <= 1:
+        for chunk in chunks:
+            yield from answer_chunk(chunk, include_answers)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_start_worker) as pool:
+        pending = deque()
+        for chunk in chunks:
+            pending.append(pool.submit(answer_chunk, chunk, include_answers))
+            if len(pending) >= workers * CHUNKS_PER_WORKER:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+
+class Summary:
+    """Running totals for a bulk run"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.questions = 0
+        self.errors = 0
+        self.topics = Counter()
+
+    def add(self, result):
+        if "error" in result:
+            self.errors += 1
+        else:
+            self.questions += 1
+            self.topics[result["topic"]] += 1
+
+    def as_dict(self):
+        seconds = time.perf_counter() - self.started
+        return {
+            "questions": self.questions,
+            "invalid_lines": self.errors,
+            "seconds": round(seconds, 3),
+            "questions_per_second": round(self.questions / seconds, 1) if seconds else 0.0,
+            "fallback_rate": round(self.topics["fallback"] / self.questions, 4) if self.questions else 0.0,
+            "topics": dict(self.topics.most_common()),
+        }
+
+    def format(self):
+        summary = self.as_dict()
+        lines = ["{questions} questions in {seconds:.2f}s ({questions_per_second:.1f}/s), "
+                 "{invalid_lines} invalid lines".format(**summary),
+                 "Fallback rate: {:.1%}".format(summary["fallback_rate"]),
+                 "Hits per topic:"]
+        lines.extend("  {:<24} {}".format(topic, count) for topic, count in summary["topics"].items())
+        return "\n".join(lines)
+
+
+def _open(path, mode):
+    if path == "-":
+        return sys.stdin if "r" in mode else sys.stdout
+    return open(path, mode, encoding="utf-8")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Answer a JSONL file of questions offline")
+    parser.add_argument("input", help="JSONL file of questions, or - for stdin")
+    parser.add_argument("-o", "--output", default="-", help="JSONL file for the answers (default: stdout)")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="worker processes (default: one per CPU; 1 answers in this process)")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="questions per worker task")
+    parser.add_argument("--no-answers", action="store_true",
+                        help="leave the answer text out and keep only the matched topic")
+    parser.add_argument("--summary-json", help="also write the summary to this JSON file")
+    args = parser.parse_args(argv)
+
+    summary = Summary()
+    source = _open(args.input, "r")
+    target = _open(args.output, "w")
+    try:
+        for result in answer_stream(source, args.workers, args.chunk_size, not args.no_answers):
+            summary.add(result)
+            target.write(json.dumps(result, ensure_ascii=False) + "\n")
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if target is not sys.stdout:
+            target.close()
+        else:
+            target.flush()
+
+    # The summary goes to stderr so stdout carries only JSONL
+    print(summary.format(), file=sys.stderr)
+    if args.summary_json:
+        with open(args.summary_json, "w", encoding="utf-8") as summary_file:
+            json.dump(summary.as_dict(), summary_file, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
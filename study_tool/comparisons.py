@@ -0,0 +1,274 @@
+"""Precomputed answers to "difference between X and Y" questions.
+
+Concepts are the entries a topic lists side by side: the market structures,
+the cost types, the elasticity categories, the terms of a "Term: meaning"
+list. Any two concepts listed under the same parent are comparable, and a
+comparison table is rendered for every such pair when the matrix is built.
+Where concept names share a head noun ("fixed costs", "variable costs"),
+the modifier alone also names its concept, so "fixed and variable costs"
+finds the pair.
+Whole topics are compared only where a hand-written comparison exists.
+
+Each group of n concepts keeps its n * (n - 1) / 2 tables in one flat tuple
+in triangular order, so looking up a pair is index arithmetic. A rebuild
+reuses the tables of every topic whose content has not changed since the
+previous build, so editing one topic only re-renders that topic's tables.
+
+Usage:
+    python -m study_tool.comparisons list
+    python -m study_tool.comparisons show "fixed costs" "variable costs"
+"""
+
+import argparse
+import re
+import sys
+import threading
+from collections import Counter
+
+from .knowledge_base import DEMAND_SUPPLY_DIFFERENCE, ECONOMICS_KNOWLEDGE_BASE, TOPIC_KEYWORDS, content_hash
+from .router import GENERIC_FIELDS, TOPIC_SYNONYMS, IntentRouter
+from .search import normalize_token
+
+# Hand-written comparisons between whole topics
+TOPIC_COMPARISONS = {("demand", "supply"): DEMAND_SUPPLY_DIFFERENCE}
+
+# Other names students use for a concept, by its field name
+CONCEPT_SYNONYMS = {
+    "perfect_competition": ["perfectly competitive", "competitive market"],
+    "monopoly": ["monopolist"],
+    "monopolistic_competition": ["monopolistically competitive"],
+    "oligopoly": ["oligopolist"],
+    "unitary": ["unit elastic", "unitary elastic"],
+    "short_run": ["short term"],
+    "long_run": ["long term"],
+    "average_cost": ["average total cost"],
+}
+
+# "Term (ACR): meaning"; unlike the router's, this also reads two-letter acronyms
+TERM_NAME = re.compile(r"^([^:()]{2,60}?)\s*(?:\(([A-Za-z]{2,6})\))?\s*:")
+
+# Row label for concepts described by a single sentence
+MEANING = "Meaning"
+MISSING = "—"
+
+
+def field_title(field):
+    return field.replace("_", " ").title()
+
+
+def _cell(text):
+    # A pipe would end the table cell early
+    return str(text).replace("|", "\\|").replace("\n", " ")
+
+
+def add_modifier_phrases(concepts):
+    """Let the first word of a two-word name ("fixed" in "fixed costs") name its
+    concept when other concepts in the group share the second word, unless
+    another concept in the group has that first word too
+    """
+    names = {(position, words[0], normalize_token(words[1]))
+             for position, concept in enumerate(concepts)
+             for words in (phrase.lower().split() for phrase in concept[1]) if len(words) == 2}
+    heads = Counter(head for _, head in {(position, head) for position, _, head in names})
+    modifiers = Counter(modifier for _, modifier in {(position, modifier) for position, modifier, _ in names})
+    taken = {phrase.lower() for concept in concepts for phrase in concept[1]}
+    for position, modifier, head in sorted(names):
+        if heads[head] > 1 and modifiers[modifier] == 1 and modifier not in taken:
+            concepts[position][1].append(modifier)
+            taken.add(modifier)
+
+
+def topic_concepts(topic_key, topic):
+    """Yield (label, concepts) for each group of comparable concepts in a topic.
+
+    A concept is (title, phrases, rows), where rows are (feature, text)
+    pairs. Groups of fewer than two concepts are left out.
+    """
+    stack = [(topic_key, topic)]
+    while stack:
+        label, value = stack.pop()
+        concepts = []
+        if isinstance(value, dict):
+            for field, item in value.items():
+                if isinstance(item, (dict, list, tuple)):
+                    stack.append((field, item))
+                if field in GENERIC_FIELDS:
+                    continue
+                phrases = [field.replace("_", " ")] + CONCEPT_SYNONYMS.get(field, [])
+                if isinstance(item, str):
+                    # "Law of Diminishing Marginal Utility: As ..." names itself
+                    term = TERM_NAME.match(item)
+                    if term:
+                        concepts.append((term.group(1), phrases + [term.group(1)],
+                                         [(MEANING, item[term.end():].strip())]))
+                    else:
+                        concepts.append((field_title(field), phrases, [(MEANING, item)]))
+                elif isinstance(item, dict) and all(isinstance(text, str) for text in item.values()):
+                    concepts.append((field_title(field), phrases,
+                                     [(field_title(feature), text) for feature, text in item.items()]))
+        elif isinstance(value, (list, tuple)):
+            for item in value:
+                term = TERM_NAME.match(str(item))
+                if term:
+                    name, acronym = term.groups()
+                    # Two-letter acronyms ("AP") collide with everyday words
+                    concepts.append((name, [name] + ([acronym] if acronym and len(acronym) > 2 else []),
+                                     [(MEANING, str(item)[term.end():].strip())]))
+            # "Income Elasticity" for "Income Elasticity of Demand", unless it names two terms
+            short = Counter(concept[0].split(" of ")[0] for concept in concepts)
+            for title, phrases, _ in concepts:
+                name = title.split(" of ")[0]
+                if name != title and short[name] == 1:
+                    phrases.append(name)
+        if len(concepts) >= 2:
+            add_modifier_phrases(concepts)
+            yield label, concepts
+
+
+def render_comparison(first, second):
+    """Markdown table comparing two concepts, feature by feature"""
+    first_rows, second_rows = dict(first[2]), dict(second[2])
+    features = dict.fromkeys(feature for feature, _ in first[2] + second[2])
+    lines = ["**Difference Between {} and {}:**".format(first[0], second[0]), "",
+             "| Feature | {} | {} |".format(_cell(first[0]), _cell(second[0])),
+             "|---------|---|---|"]
+    lines.extend("| {} | {} | {} |".format(_cell(feature), _cell(first_rows.get(feature, MISSING)),
+                                          _cell(second_rows.get(feature, MISSING)))
+                 for feature in features)
+    return "\n".join(lines)
+
+
+def pair_index(first, second):
+    """Position of the pair first < second in a group's triangular table"""
+    return second * (second - 1) // 2 + first
+
+
+class ConceptGroup:
+    """Concepts listed under one parent and the tables comparing each pair of them"""
+
+    __slots__ = ("topic", "label", "titles", "phrases", "tables")
+
+    def __init__(self, topic, label, titles, phrases, tables):
+        self.topic = topic
+        self.label = label
+        self.titles = titles
+        self.phrases = phrases
+        self.tables = tables
+
+    @classmethod
+    def render(cls, topic, label, concepts):
+        tables = tuple(render_comparison(concepts[first], concepts[second])
+                       for second in range(len(concepts)) for first in range(second))
+        return cls(topic, label, tuple(concept[0] for concept in concepts),
+                   tuple(tuple(concept[1]) for concept in concepts), tables)
+
+
+class ComparisonMatrix:
+    """Comparison tables for every pair of comparable concepts in a knowledge base.
+
+    Pass the matrix built for an earlier version of the knowledge base as
+    ``previous`` to reuse its tables for topics that have not changed;
+    ``rendered_topics`` and ``reused_topics`` count which were which.
+    """
+
+    def __init__(self, knowledge_base, previous=None):
+        earlier = previous._topics if previous is not None else {}
+        self._topics = {}  # topic key -> (content hash, groups)
+        self.rendered_topics = self.reused_topics = 0
+        groups = []
+        for topic_key, topic in knowledge_base.items():
+            digest = content_hash({topic_key: topic})
+            cached = earlier.get(topic_key)
+            if cached is not None and cached[0] == digest:
+                topic_groups = cached[1]
+                self.reused_topics += 1
+            else:
+                topic_groups = tuple(ConceptGroup.render(topic_key, label, concepts)
+                                     for label, concepts in topic_concepts(topic_key, topic))
+                self.rendered_topics += 1
+            self._topics[topic_key] = (digest, topic_groups)
+            groups.extend(topic_groups)
+
+        # Whole topics, with a table only for the hand-written pairs
+        topics = list(dict.fromkeys(key for pair in TOPIC_COMPARISONS for key in pair
+                                    if all(topic in knowledge_base for topic in pair)))
+        if topics:
+            tables = tuple(TOPIC_COMPARISONS.get((topics[first], topics[second]))
+                           for second in range(len(topics)) for first in range(second))
+            phrases = tuple(tuple([key.replace("_", " ")] + TOPIC_SYNONYMS.get(key, []) + TOPIC_KEYWORDS.get(key, []))
+                            for key in topics)
+            groups.append(ConceptGroup(None, "topics", tuple(field_title(key) for key in topics), phrases, tables))
+
+        self.groups = groups
+        # Concept id -> (group, position in the group)
+        self.concepts = [(group_id, position) for group_id, group in enumerate(groups)
+                         for position in range(len(group.titles))]
+        self._phrases = tuple(group.phrases for group in groups)
+        if previous is not None and previous._phrases == self._phrases:
+            # Same concepts under the same ids: only the tables changed
+            self.router = previous.router
+        else:
+            self.router = IntentRouter({concept: groups[group_id].phrases[position]
+                                        for concept, (group_id, position) in enumerate(self.concepts)})
+        self.pair_count = sum(table is not None for group in groups for table in group.tables)
+
+    def pair(self, first, second):
+        """Table comparing two concept ids, or None when they are not comparable"""
+        group_id, first = self.concepts[first]
+        other_id, second = self.concepts[second]
+        if group_id != other_id or first == second:
+            return None
+        if first > second:
+            first, second = second, first
+        return self.groups[group_id].tables[pair_index(first, second)]
+
+    def lookup(self, question):
+        """Table for the first comparable pair of concepts the question names, or None"""
+        # Ties count: "marginal" names both a cost and a product
+        named = list(dict.fromkeys(concept for concept, _, _, _ in self.router.route(question, ties=True)))
+        for position, second in enumerate(named):
+            for first in named[:position]:
+                table = self.pair(first, second)
+                if table is not None:
+                    return table
+        return None
+
+
+_latest = None
+_latest_lock = threading.Lock()
+
+
+def build_comparison_matrix(knowledge_base):
+    """Matrix for knowledge_base, reusing the last build's tables for unchanged topics"""
+    global _latest
+    with _latest_lock:
+        _latest = ComparisonMatrix(knowledge_base, _latest)
+        return _latest
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="List or show the precomputed concept comparisons")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("list", help="list the groups of comparable concepts")
+    show = commands.add_parser("show", help="print the table comparing two concepts")
+    show.add_argument("first")
+    show.add_argument("second")
+    args = parser.parse_args(argv)
+
+    matrix = ComparisonMatrix(ECONOMICS_KNOWLEDGE_BASE)
+    if args.command == "list":
+        for group in matrix.groups:
+            print("{} / {}: {}".format(group.topic or "-", group.label, ", ".join(group.titles)))
+        print("{} comparisons".format(matrix.pair_count))
+        return 0
+
+    table = matrix.lookup("{} vs {}".format(args.first, args.second))
+    if table is None:
+        print("No comparison between {!r} and {!r}".format(args.first, args.second))
+        return 1
+    print(table)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,186 @@
+"""Static page text for the study tool, pre-rendered one string per section.
+
+Streamlit cannot cache elements: every full page run sends each element of
+the static tabs again, so a section costs one element rather than one per
+heading, column and paragraph. Keeping the text here rather than in app.py
+also spares the script from compiling it on every run.
+"""
+
+# Styles, title and tagline, sent as one element at the top of the page
+PAGE_HEADER_HTML = """<style>
+    .main-header {
+        font-size: 2.5rem;
+        color: #1E88E5;
+        text-align: center;
+        margin-bottom: 2rem;
+    }
+    .feature-columns {
+        display: grid;
+        grid-template-columns: repeat(auto-fit, minmax(18rem, 1fr));
+        gap: 1rem;
+    }
+    .feature-box {
+        background-color: #f0f2f6;
+        padding: 20px;
+        border-radius: 10px;
+        margin: 10px 0;
+        color: #000000 !important;
+    }
+    .feature-box h3, .feature-box h4,
+    .feature-box p, .feature-box li {
+        color: #000000 !important;
+    }
+    .chat-message {
+        padding: 15px;
+        border-radius: 10px;
+        margin: 10px 0;
+        color: #000000 !important;
+    }
+    .user-message {
+        background-color: #E3F2FD;
+        border-left: 5px solid #1E88E5;
+    }
+    .bot-message {
+        background-color: #F1F8E9;
+        border-left: 5px solid #66BB6A;
+    }
+    .stButton>button {
+        width: 100%;
+        background-color: #1E88E5;
+        color: white;
+    }
+</style>
+<h1 class="main-header">📚 Interactive Economics Study Tool</h1>
+
+### Inspired by NotebookLM - Your AI-Powered Learning Companion"""
+
+PAGE_FOOTER_HTML = """---
+
+<div style='text-align: center; color: #666;'>
+    <p>📚 Interactive Study Tool | Built with Streamlit | Economics Learning Assistant</p>
+    <p>💡 Tip: Use all features together for maximum learning effectiveness!</p>
+</div>"""
+
+OVERVIEW_HTML = """## Welcome to Your Economics Study Tool
+
+<div class="feature-columns">
+<div class="feature-box">
+<h3>🎓 What You'll Learn</h3>
+<ul>
+    <li>Demand and Supply Analysis</li>
+    <li>Market Equilibrium</li>
+    <li>Price Elasticity</li>
+    <li>Consumer Behavior Theory</li>
+    <li>Production and Costs</li>
+    <li>Market Structures</li>
+</ul>
+</div>
+<div class="feature-box">
+<h3>✨ Features</h3>
+<ul>
+    <li>AI-powered Q&A chatbot</li>
+    <li>Teacher-Student dialogue simulations</li>
+    <li>Video summaries and concepts</li>
+    <li>Exam preparation tips</li>
+    <li>Interactive learning experience</li>
+</ul>
+</div>
+</div>
+
+---
+
+### 📖 Study Material Overview"""
+
+CHAPTER_TOPICS_MD = """**Chapter Topics Covered:**
+- Introduction to Microeconomics
+- Demand: Definition, Law, Determinants
+- Supply: Definition, Law, Determinants
+- Market Equilibrium and Price Determination
+- Elasticity of Demand and Supply
+- Consumer Behavior and Utility Analysis
+- Production Function and Costs
+- Market Structures (Perfect Competition, Monopoly, etc.)"""
+
+VIDEO_LECTURES_HTML = """## 📹 Video Resources & Summaries
+
+Visual explanations and exam tips for better understanding.
+
+### 🎥 Recommended Video Lectures
+
+<div class="feature-columns">
+<div>
+<div class="feature-box">
+<h4>📺 Video 1: Microeconomics Fundamentals</h4>
+<p><strong>Topics Covered:</strong></p>
+<ul>
+    <li>Introduction to Microeconomics</li>
+    <li>Demand and Supply Basics</li>
+    <li>Market Equilibrium</li>
+    <li>Real-world Applications</li>
+</ul>
+<p><strong>Duration:</strong> ~30 minutes</p>
+</div>
+<p>🔗 <a href="https://youtu.be/Ec19ljjvlCI" target="_blank">Watch Video 1</a></p>
+</div>
+<div>
+<div class="feature-box">
+<h4>📺 Video 2: Advanced Concepts</h4>
+<p><strong>Topics Covered:</strong></p>
+<ul>
+    <li>Elasticity of Demand</li>
+    <li>Consumer Behavior</li>
+    <li>Production Theory</li>
+    <li>Market Structures</li>
+</ul>
+<p><strong>Duration:</strong> ~25 minutes</p>
+</div>
+<p>🔗 <a href="https://www.youtube.com/watch?v=Z_S0VA4jKes" target="_blank">Watch Video 2</a></p>
+</div>
+</div>"""
+
+KEY_CONCEPTS_MD = """---
+
+### 📊 Key Concepts Visualization
+
+### Demand and Supply Curve
+
+The fundamental model of microeconomics shows:
+- **Demand Curve:** Slopes downward (inverse relationship between price and quantity)
+- **Supply Curve:** Slopes upward (direct relationship between price and quantity)
+- **Equilibrium Point:** Where the curves intersect
+
+### Elasticity Spectrum
+
+| Type | Elasticity Value | Consumer Response |
+|------|------------------|-------------------|
+| Perfectly Inelastic | 0 | No response to price changes |
+| Inelastic | < 1 | Weak response to price changes |
+| Unit Elastic | = 1 | Proportional response |
+| Elastic | > 1 | Strong response to price changes |
+| Perfectly Elastic | ∞ | Infinite response |
+
+### Market Structure Comparison
+
+| Feature | Perfect Competition | Monopoly | Oligopoly | Monopolistic Competition |
+|---------|-------------------|----------|-----------|--------------------------|
+| Number of Firms | Many | One | Few | Many |
+| Product Type | Homogeneous | Unique | Differentiated/Similar | Differentiated |
+| Entry Barriers | None | High | High | Low |
+| Price Control | None (Price Taker) | High (Price Maker) | Some | Some |"""
+
+EXAM_TIPS_HEADING_MD = """---
+
+### 🎯 Exam Tips Summary"""
+
+EXAM_TIPS_SUMMARY_MD = """**Top 10 Exam Success Tips:**
+
+1. **Master the Graphs:** Practice drawing supply-demand diagrams until you can do them perfectly
+2. **Memorize Key Formulas:** Especially elasticity calculations
+3. **Understand, Don't Memorize:** Focus on WHY things happen, not just WHAT happens
+4. **Use Real Examples:** Connect theories to real-world scenarios (gas prices, food markets, etc.)
+5. **Practice Numerical Problems:** Work through calculation questions multiple times
+6. **Create Summary Sheets:** One-page notes for each major topic
+7. **Explain to Others:** Teaching concepts helps solidify your understanding
+8. **Time Management:** Practice past papers under timed conditions
+9. **Review Mistakes:** Learn from errors in practice questions
+10. **Stay Current:** Follow economic news to see theories in action"""
@@ -0,0 +1,362 @@
+"""Teacher-student dialogues: the pre-recorded introduction and scripts
+generated for every knowledge base topic.
+
+Generated scripts walk a topic's fields in order: the student asks about
+each definition, law, list or nested section and the teacher answers from
+the knowledge base text. ``DialogueLibrary`` builds the scripts (and their
+audio) for every topic on a background thread pool as soon as a knowledge
+base version is seen, so switching topics only looks up a finished result.
+"""
+
+import logging
+import threading
+import time
+from bisect import bisect_right
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+log = logging.getLogger(__name__)
+
+# Built once at import and shared by every session; treat as read-only
+DIALOGUE = (
+    {
+        "speaker": "Teacher",
+        "text": "Welcome to today's lesson on Microeconomics! We'll be covering the fundamentals of demand and supply. Are you ready to begin?"
+    },
+    {
+        "speaker": "Student",
+        "text": "Yes, I'm ready! Can you explain what demand means in economics?"
+    },
+    {
+        "speaker": "Teacher",
+        "text": "Great question! Demand refers to the quantity of a good or service that consumers are willing and able to purchase at various prices during a given time period. The key words here are 'willing' and 'able' - both conditions must be met."
+    },
+    {
+        "speaker": "Student",
+        "text": "So if I want to buy something but can't afford it, that's not demand?"
+    },
+    {
+        "speaker": "Teacher",
+        "text": "Exactly! That would just be a desire, not economic demand. Now, there's an important principle called the Law of Demand. It states that as price increases, quantity demanded decreases, and vice versa, assuming all other factors remain constant."
+    },
+    {
+        "speaker": "Student",
+        "text": "That makes sense - when things get more expensive, people buy less. What about supply?"
+    },
+    {
+        "speaker": "Teacher",
+        "text": "Supply is the opposite side of the market. It's the quantity of a good that producers are willing and able to offer for sale at various prices. The Law of Supply states that as price increases, quantity supplied increases."
+    },
+    {
+        "speaker": "Student",
+        "text": "So sellers want to sell more when prices are higher because they can make more profit?"
+    },
+    {
+        "speaker": "Teacher",
+        "text": "Precisely! Higher prices incentivize producers to supply more. Now, when we bring demand and supply together, we get market equilibrium - the point where quantity demanded equals quantity supplied."
+    },
+    {
+        "speaker": "Student",
+        "text": "What happens if the market isn't at equilibrium?"
+    },
+    {
+        "speaker": "Teacher",
+        "text": "Excellent question! If price is above equilibrium, we get excess supply (surplus). If price is below equilibrium, we get excess demand (shortage). Market forces will push the price toward equilibrium."
+    },
+    {
+        "speaker": "Student",
+        "text": "This is really helpful! Can we talk about elasticity next time?"
+    },
+    {
+        "speaker": "Teacher",
+        "text": "Absolutely! Elasticity is crucial for understanding how responsive consumers and producers are to price changes. Keep studying, and you'll do great on your exam!"
+    }
+)
+
+
+# Topic key of the pre-recorded dialogue, listed before the knowledge base topics
+INTRODUCTION = "introduction"
+INTRODUCTION_TITLE = "Introduction: Demand and Supply"
+
+# Student questions for well-known field names; {topic} is the topic's name
+FIELD_QUESTIONS = {
+    "definition": "Can you explain what {topic} means in economics?",
+    "law": "Is there a rule that describes how {topic} behaves?",
+    "concept": "Why does that matter?",
+    "changes": "What happens when conditions in the market change?",
+    "factors": "What factors affect {topic}?",
+    "types": "Are there different types of {topic}?",
+    "formula": "How do we actually measure it?",
+    "categories": "How do we tell whether it is large or small?",
+    "concepts": "Which measures should I know?",
+}
+# Question for any other field; {subject} is the field's label
+FIELD_QUESTION = "Can you explain {subject}?"
+
+# Cycled through so consecutive lines do not all open the same way
+STUDENT_OPENERS = ("", "That makes sense. ", "Got it. ", "Interesting! ")
+TEACHER_OPENERS = ("Great question! ", "", "Exactly. ", "Good thinking. ")
+
+OPENING_LINE = "Welcome to today's lesson on {title}! Are you ready to begin?"
+READY_LINE = "Yes, I'm ready! "
+NEXT_TOPIC_LINE = "This is really helpful! Can we talk about {topic} next time?"
+NEXT_TOPIC_REPLY = "Absolutely! Next time we'll cover {title}, which builds on what we covered today. Keep studying, and you'll do great on your exam!"
+CLOSING_LINE = "This is really helpful! Thank you."
+CLOSING_REPLY = "You're welcome! Keep studying, and you'll do great on your exam!"
+
+
+def simulate_dialogue():
+    """Return the pre-recorded teacher-student dialogue"""
+    return DIALOGUE
+
+
+def topic_title(topic_key):
+    """Display name for a topic key"""
+    if topic_key == INTRODUCTION:
+        return INTRODUCTION_TITLE
+    return topic_key.replace("_", " ").title()
+
+
+def _sentence(text):
+    text = str(text).strip()
+    return text if text[-1:] in ".!?" else text + "."
+
+
+def _lower_first(text):
+    # Leave acronyms such as "PED" alone
+    if len(text) > 1 and text[1].isupper():
+        return text
+    return text[:1].lower() + text[1:]
+
+
+def _split_term(item):
+    """Split "Term: meaning" items; returns (term, meaning) or None"""
+    term, separator, meaning = str(item).partition(": ")
+    if separator and len(term) < 60 and meaning:
+        return term.strip(), meaning.strip()
+    return None
+
+
+def _join(items):
+    items = list(items)
+    if len(items) <= 2:
+        return " and ".join(items)
+    return "; ".join(items[:-1]) + "; and " + items[-1]
+
+
+def _list_answer(items):
+    """Teacher's answer for a list field"""
+    phrases = []
+    for item in items:
+        term = _split_term(item)
+        phrases.append("{} ({})".format(term[0], _lower_first(term[1].rstrip("."))) if term
+                       else _lower_first(str(item).rstrip(".")))
+    return "There are {} to know: {}.".format(len(phrases), _join(phrases))
+
+
+def _section_answer(section):
+    """Teacher's answer for a dict of fields, one sentence per field"""
+    sentences = []
+    for field, value in section.items():
+        label = field.replace("_", " ").capitalize()
+        if isinstance(value, dict):
+            sentences.append(_section_answer(value))
+        elif isinstance(value, (list, tuple)):
+            sentences.append("{}: {}.".format(label, _join(_lower_first(str(item).rstrip(".")) for item in value)))
+        else:
+            sentences.append("{}: {}".format(label, _sentence(_lower_first(str(value)))))
+    return " ".join(sentences)
+
+
+def _exchanges(name, topic):
+    """Yield (question, answer) pairs for a topic's fields, in order"""
+    for field, value in topic.items():
+        subject = field.replace("_", " ")
+        if field in FIELD_QUESTIONS:
+            question = FIELD_QUESTIONS[field].format(topic=name)
+        else:
+            term = _split_term(value) if isinstance(value, str) else None
+            if term:
+                # The text names itself, e.g. "Law of Diminishing Marginal Utility: ..."
+                subject = term[0]
+            question = FIELD_QUESTION.format(subject=subject)
+
+        if isinstance(value, dict):
+            answer = _section_answer(value)
+        elif isinstance(value, (list, tuple)):
+            answer = _list_answer(value)
+        elif field in FIELD_QUESTIONS or subject.lower() in str(value).lower():
+            answer = _sentence(value)
+        else:
+            # Name the field when the text does not, e.g. "Fixed costs: costs that..."
+            answer = "{}: {}".format(subject.capitalize(), _sentence(_lower_first(str(value))))
+        yield question, answer
+
+
+def generate_dialogue(topic_key, topic, next_topic=None):
+    """Teacher-student script for one knowledge base topic.
+
+    The student asks about each of the topic's fields in turn and the
+    teacher answers from its text; when ``next_topic`` is given the lesson
+    ends by setting it up for next time.
+    """
+    name = topic_key.replace("_", " ")
+    lines = [{"speaker": "Teacher", "text": OPENING_LINE.format(title=topic_title(topic_key))}]
+    for index, (question, answer) in enumerate(_exchanges(name, topic)):
+        opener = READY_LINE if index == 0 else STUDENT_OPENERS[index % len(STUDENT_OPENERS)]
+        lines.append({"speaker": "Student", "text": opener + question})
+        lines.append({"speaker": "Teacher", "text": TEACHER_OPENERS[index % len(TEACHER_OPENERS)] + answer})
+
+    if next_topic is not None:
+        lines.append({"speaker": "Student", "text": NEXT_TOPIC_LINE.format(topic=next_topic.replace("_", " "))})
+        lines.append({"speaker": "Teacher", "text": NEXT_TOPIC_REPLY.format(title=topic_title(next_topic))})
+    else:
+        lines.append({"speaker": "Student", "text": CLOSING_LINE})
+        lines.append({"speaker": "Teacher", "text": CLOSING_REPLY})
+    return tuple(lines)
+
+
+def format_transcript(dialogues):
+    """Format a dialogue as a numbered markdown transcript"""
+    return "\n\n".join("**{}. {}:** {}".format(i, dialogue['speaker'], dialogue['text'])
+                       for i, dialogue in enumerate(dialogues, 1))
+
+
+class DialoguePlayback:
+    """Time-based playback position for a dialogue.
+
+    The number of visible lines is derived from the elapsed playing time, so
+    the UI can poll it on a timer instead of sleeping between lines. Each line
+    stays on its own for its entry in ``durations`` (its clip's length) before
+    the next appears; lines without one get ``interval``.
+    """
+
+    def __init__(self, line_count, interval=0.5, durations=None):
+        self.line_count = line_count
+        self.interval = interval
+        # Seconds into playback at which each line appears, and when the last one ends
+        self.starts = []
+        start = 0.0
+        for position in range(line_count):
+            self.starts.append(start)
+            duration = durations[position] if durations else None
+            start += duration if duration else interval
+        self.length = start
+        self.playing = False
+        self.started = False
+        self._elapsed = 0.0
+        self._resumed_at = None
+
+    def elapsed(self, now=None):
+        """Seconds of playback so far, excluding paused time"""
+        if not self.playing:
+            return self._elapsed
+        now = time.monotonic() if now is None else now
+        return self._elapsed + now - self._resumed_at
+
+    def play(self):
+        """Start playing from the first line"""
+        self.started = True
+        self.playing = True
+        self._elapsed = 0.0
+        self._resumed_at = time.monotonic()
+
+    def pause(self):
+        if self.playing:
+            self._elapsed = self.elapsed()
+            self.playing = False
+
+    def resume(self):
+        if self.started and not self.playing and not self.finished():
+            self.playing = True
+            self._resumed_at = time.monotonic()
+
+    def skip(self):
+        """Jump to the end and show every line"""
+        self.started = True
+        self.playing = False
+        self._elapsed = self.length
+
+    def visible_lines(self, now=None):
+        """Number of lines that should be on screen"""
+        if not self.started:
+            return 0
+        return bisect_right(self.starts, self.elapsed(now))
+
+    def finished(self):
+        """Whether the last line has been shown for its whole duration"""
+        return self.started and self.elapsed() >= self.length
+
+
+class TopicDialogue:
+    """A finished script with its transcript and audio report"""
+
+    __slots__ = ("key", "title", "lines", "transcript", "audio")
+
+    def __init__(self, key, title, lines, transcript, audio=None):
+        self.key = key
+        self.title = title
+        self.lines = lines
+        self.transcript = transcript
+        self.audio = audio
+
+
+class DialogueLibrary:
+    """Dialogues for every topic, generated ahead of time on a thread pool.
+
+    Results are cached by (knowledge base version, topic key); only the
+    newest ``max_versions`` versions are kept. ``synthesize`` is called with
+    each script's lines and its report stored as ``audio`` (None when it
+    raises); pass ``tts.synthesize_dialogue`` to voice the scripts too.
+    """
+
+    def __init__(self, synthesize=None, max_workers=2, max_versions=2):
+        self._synthesize = synthesize
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="dialogue")
+        self._versions = OrderedDict()  # version -> {topic key: Future}
+        self._lock = threading.Lock()
+        self.max_versions = max_versions
+
+    def prefetch(self, knowledge_base, version):
+        """Queue every topic of this version for generation, once; returns {topic key: Future}"""
+        with self._lock:
+            futures = self._versions.get(version)
+            if futures is not None:
+                self._versions.move_to_end(version)
+                return futures
+
+            keys = list(knowledge_base)
+            # The introduction first: it is what the tab opens on
+            futures = {INTRODUCTION: self._pool.submit(self._build, INTRODUCTION, None, None)}
+            for position, key in enumerate(keys):
+                next_topic = keys[position + 1] if position + 1 < len(keys) else None
+                futures[key] = self._pool.submit(self._build, key, knowledge_base[key], next_topic)
+            self._versions[version] = futures
+            while len(self._versions) > self.max_versions:
+                _, stale = self._versions.popitem(last=False)
+                for future in stale.values():
+                    future.cancel()
+            return futures
+
+    def topics(self, knowledge_base, version):
+        """Topic keys in display order"""
+        return list(self.prefetch(knowledge_base, version))
+
+    def ready(self, knowledge_base, version, topic_key):
+        """Whether the topic's dialogue is finished"""
+        return self.prefetch(knowledge_base, version)[topic_key].done()
+
+    def get(self, knowledge_base, version, topic_key):
+        """The topic's TopicDialogue, waiting for its worker if it is still running"""
+        return self.prefetch(knowledge_base, version)[topic_key].result()
+
+    def _build(self, key, topic, next_topic):
+        lines = DIALOGUE if key == INTRODUCTION else generate_dialogue(key, topic, next_topic)
+        audio = None
+        if self._synthesize:
+            try:
+                audio = self._synthesize(lines)
+            except Exception as error:
+                # A failing speech engine costs the topic its audio, not its script
+                log.error("No audio for the %s dialogue: %s", key, error)
+        return TopicDialogue(key, topic_title(key), lines, format_transcript(lines), audio)
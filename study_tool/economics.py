@@ -0,0 +1,267 @@
+"""Vectorized solvers for demand, supply, elasticity and cost curves.
+
+Every parameter may be a NumPy array, and all functions broadcast, so a
+whole grid of scenarios (say, 500 demand intercepts) is solved in one call
+instead of a Python loop. Curves are either linear, Q = intercept + slope * P,
+or constant-elasticity, Q = scale * P ** exponent.
+"""
+
+import numpy as np
+
+LINEAR = "linear"
+POWER = "power"
+
+# Bisection halves the bracket this many times: far below plotting precision
+BISECTION_STEPS = 60
+# Doublings allowed while searching for a price where supply exceeds demand
+BRACKET_STEPS = 60
+
+
+class Curve:
+    """A demand or supply curve whose parameters may be arrays"""
+
+    def __init__(self, kind, coefficient, exponent_or_slope):
+        if kind not in (LINEAR, POWER):
+            raise ValueError("Unknown curve kind {!r}, choose linear or power".format(kind))
+        self.kind = kind
+        self.coefficient = np.asarray(coefficient, dtype=float)
+        self.shape = np.asarray(exponent_or_slope, dtype=float)
+
+    @classmethod
+    def linear(cls, intercept, slope):
+        """Q = intercept + slope * P; demand slopes are negative"""
+        return cls(LINEAR, intercept, slope)
+
+    @classmethod
+    def power(cls, scale, exponent):
+        """Q = scale * P ** exponent; demand exponents are negative"""
+        return cls(POWER, scale, exponent)
+
+    def quantity(self, price):
+        price = np.asarray(price, dtype=float)
+        if self.kind == LINEAR:
+            return np.maximum(self.coefficient + self.shape * price, 0.0)
+        return self.coefficient * price ** self.shape
+
+    def derivative(self, price):
+        """dQ/dP at price"""
+        price = np.asarray(price, dtype=float)
+        if self.kind == LINEAR:
+            return np.broadcast_to(self.shape, np.broadcast(self.shape, price).shape)
+        return self.coefficient * self.shape * price ** (self.shape - 1)
+
+
+def solve_equilibrium(demand, supply):
+    """Return (price, quantity) arrays where demand meets supply.
+
+    Linear/linear and power/power pairs have closed forms; mixed pairs are
+    solved by bisection on excess demand, all grid points at once. Prices
+    with no positive equilibrium come back as NaN.
+    """
+    with np.errstate(divide="ignore", invalid="ignore"):
+        if demand.kind == supply.kind == LINEAR:
+            price = (demand.coefficient - supply.coefficient) / (supply.shape - demand.shape)
+        elif demand.kind == supply.kind == POWER:
+            price = (demand.coefficient / supply.coefficient) ** (1.0 / (supply.shape - demand.shape))
+        else:
+            price = _bisect_equilibrium(demand, supply)
+        price = np.where(np.isfinite(price) & (price > 0), price, np.nan)
+        quantity = demand.quantity(price)
+        # A linear curve cut off at zero quantity has no interior equilibrium
+        price = np.where(quantity > 0, price, np.nan)
+        return price, np.where(quantity > 0, quantity, np.nan)
+
+
+def _bisect_equilibrium(demand, supply):
+    shape = np.broadcast(demand.coefficient, demand.shape, supply.coefficient, supply.shape).shape
+    low = np.full(shape, 1e-9)
+    high = np.ones(shape)
+
+    def excess(price):
+        return demand.quantity(price) - supply.quantity(price)
+
+    # Grow the upper bound until supply exceeds demand everywhere it can
+    for _ in range(BRACKET_STEPS):
+        short = excess(high) > 0
+        if not short.any():
+            break
+        high = np.where(short, high * 2.0, high)
+
+    solvable = (excess(low) > 0) & (excess(high) <= 0)
+    for _ in range(BISECTION_STEPS):
+        middle = (low + high) * 0.5
+        above = excess(middle) > 0
+        low = np.where(above, middle, low)
+        high = np.where(above, high, middle)
+    return np.where(solvable, (low + high) * 0.5, np.nan)
+
+
+def point_elasticity(curve, price):
+    """(dQ/dP) * (P / Q) at price; NaN where quantity is zero"""
+    price = np.asarray(price, dtype=float)
+    quantity = curve.quantity(price)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(quantity > 0, curve.derivative(price) * price / quantity, np.nan)
+
+
+def arc_elasticity(price_1, quantity_1, price_2, quantity_2):
+    """Midpoint (arc) elasticity between two points on a curve"""
+    price_1, quantity_1, price_2, quantity_2 = (np.asarray(value, dtype=float)
+                                                for value in (price_1, quantity_1, price_2, quantity_2))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        quantity_change = (quantity_2 - quantity_1) / ((quantity_1 + quantity_2) / 2)
+        price_change = (price_2 - price_1) / ((price_1 + price_2) / 2)
+        return quantity_change / price_change
+
+
+def classify_elasticity(elasticity):
+    """Name the category of an elasticity value, as in the knowledge base"""
+    magnitude = abs(float(elasticity))
+    if np.isnan(magnitude):
+        return "undefined"
+    if magnitude == 0:
+        return "perfectly inelastic"
+    if np.isclose(magnitude, 1.0, atol=1e-3):
+        return "unit elastic"
+    return "elastic" if magnitude > 1 else "inelastic"
+
+
+def production_curves(labor, productivity, labor_share):
+    """Short-run product curves for Q = productivity * L ** labor_share.
+
+    Returns total, marginal and average product of labour. A labour share
+    below 1 gives diminishing marginal returns.
+    """
+    labor = np.asarray(labor, dtype=float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        total = productivity * labor ** labor_share
+        marginal = productivity * labor_share * labor ** (labor_share - 1)
+        average = productivity * labor ** (labor_share - 1)
+    return {"total": total, "marginal": marginal, "average": average}
+
+
+def cost_curves(quantity, fixed_cost, wage, productivity, labor_share):
+    """Short-run cost curves implied by the production function.
+
+    Producing Q takes L = (Q / productivity) ** (1 / labor_share) workers,
+    so variable cost is wage * L. Returns TC, VC, FC, ATC, AVC, AFC and MC.
+    """
+    quantity = np.asarray(quantity, dtype=float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        labor = (quantity / productivity) ** (1.0 / labor_share)
+        variable = wage * labor
+        total = fixed_cost + variable
+        marginal = wage * labor / (labor_share * quantity)
+        return {
+            "total": total,
+            "variable": variable,
+            "fixed": np.broadcast_to(np.asarray(fixed_cost, dtype=float), total.shape),
+            "average_total": total / quantity,
+            "average_variable": variable / quantity,
+            "average_fixed": fixed_cost / quantity,
+            "marginal": marginal,
+        }
+
+
+def efficient_scale(fixed_cost, wage, productivity, labor_share):
+    """Output where average total cost is lowest (where MC crosses ATC)"""
+    exponent = 1.0 / np.asarray(labor_share, dtype=float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return (fixed_cost * productivity ** exponent / ((exponent - 1) * wage)) ** (1.0 / exponent)
+
+
+def downsample(series, max_points):
+    """Keep at most max_points evenly spaced rows of equally long arrays.
+
+    The first and last points are always kept, so curve ends stay put.
+    """
+    length = len(next(iter(series.values())))
+    if length <= max_points:
+        return series
+    keep = np.unique(np.linspace(0, length - 1, max_points).round().astype(np.intp))
+    return {name: np.asarray(values)[keep] for name, values in series.items()}
+
+
+# Points computed per curve, and the most that are sent to a chart
+CURVE_POINTS = 2001
+CHART_POINTS = 200
+# Demand shifts, as fractions of the base demand, for the comparative statics
+DEMAND_SHIFTS = np.linspace(0.5, 1.5, 201)
+
+
+def market_chart_data(demand, supply, max_points=CHART_POINTS):
+    """Curves, equilibrium and elasticities for one demand/supply pair.
+
+    ``curves`` is long-format (Price, Quantity, Curve) plot data and
+    ``shifts`` traces the equilibrium as demand scales from 50% to 150%,
+    solved for every shift at once.
+    """
+    price, quantity = solve_equilibrium(demand, supply)
+    price, quantity = float(price), float(quantity)
+    top = 2 * price if np.isfinite(price) else 100.0
+    prices = np.linspace(top / CURVE_POINTS, top, CURVE_POINTS)
+
+    columns = {"Price": [], "Quantity": [], "Curve": []}
+    for label, curve in (("Demand", demand), ("Supply", supply)):
+        quantities = np.broadcast_to(curve.quantity(prices), prices.shape)
+        # Points on the axis would draw a spurious vertical line
+        visible = quantities > 0
+        series = downsample({"Price": prices[visible], "Quantity": quantities[visible]}, max_points)
+        columns["Price"].extend(series["Price"].tolist())
+        columns["Quantity"].extend(series["Quantity"].tolist())
+        columns["Curve"].extend([label] * len(series["Price"]))
+
+    shifted = Curve(demand.kind, demand.coefficient * DEMAND_SHIFTS, demand.shape)
+    shift_prices, shift_quantities = solve_equilibrium(shifted, supply)
+    shifts = downsample({"Demand shift (%)": DEMAND_SHIFTS * 100 - 100,
+                         "Equilibrium price": shift_prices,
+                         "Equilibrium quantity": shift_quantities}, max_points)
+
+    result = {
+        "price": price,
+        "quantity": quantity,
+        "demand_elasticity": float("nan"),
+        "supply_elasticity": float("nan"),
+        "arc_elasticity": float("nan"),
+        "curves": columns,
+        "shifts": {name: values.tolist() for name, values in shifts.items()},
+    }
+    if np.isfinite(price):
+        # Arc elasticity of demand for a 10% price rise from equilibrium
+        raised = price * 1.1
+        result.update({
+            "demand_elasticity": float(point_elasticity(demand, price)),
+            "supply_elasticity": float(point_elasticity(supply, price)),
+            "arc_elasticity": float(arc_elasticity(price, quantity, raised, demand.quantity(raised))),
+        })
+    return result
+
+
+def cost_chart_data(fixed_cost, wage, productivity, labor_share, max_points=CHART_POINTS):
+    """Per-unit and total cost curves around the efficient scale"""
+    scale = float(efficient_scale(fixed_cost, wage, productivity, labor_share))
+    minimum = float(cost_curves(scale, fixed_cost, wage, productivity, labor_share)["average_total"])
+    if not np.isfinite(scale) or scale <= 0:
+        # Without fixed costs average cost rises from the first unit: no interior minimum
+        scale = minimum = float("nan")
+        centre = float(productivity) * 10
+    else:
+        centre = scale
+    quantities = np.linspace(centre / 4, centre * 3, CURVE_POINTS)
+    curves = cost_curves(quantities, fixed_cost, wage, productivity, labor_share)
+
+    per_unit = downsample({"Quantity": quantities,
+                           "ATC": curves["average_total"],
+                           "AVC": curves["average_variable"],
+                           "AFC": curves["average_fixed"],
+                           "MC": curves["marginal"]}, max_points)
+    totals = downsample({"Quantity": quantities,
+                         "TC": curves["total"],
+                         "VC": curves["variable"],
+                         "FC": curves["fixed"]}, max_points)
+    return {
+        "efficient_scale": scale,
+        "minimum_average_cost": minimum,
+        "per_unit": {name: values.tolist() for name, values in per_unit.items()},
+        "totals": {name: values.tolist() for name, values in totals.items()},
+    }
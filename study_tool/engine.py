@@ -0,0 +1,480 @@
+"""Answer engine: ranks topics for a question and serves pre-rendered answers"""
+
+import os
+import re
+import threading
+from collections import OrderedDict
+
+from .knowledge_base import (
+    ECONOMICS_KNOWLEDGE_BASE,
+    EXAM_TIPS,
+    FALLBACK_RESPONSE,
+    GREETING_RESPONSE,
+    TOPIC_KEYWORDS,
+    TOPIC_PARAPHRASES,
+    content_hash,
+)
+from .ingest import format_note_matches
+from .metrics import get_metrics
+from .router import COMPARISON, GREETING, IntentRouter
+from .search import STOP_WORDS, WORD, build_knowledge_index, normalize_token
+from .spelling import MIN_WORD_LENGTH, SpellingIndex
+
+GREETING_WORDS = {"hello", "hi", "hey"}
+COMPARISON_WORDS = {"difference", "differ", "compare", "comparison", "vs", "versus"}
+LETTERS = re.compile(r"[A-Za-z]+")
+# Words long enough for the spelling index to correct, in lowercased text
+CORRECTABLE_WORDS = re.compile(r"[a-z]{%d,}" % MIN_WORD_LENGTH)
+
+
+def format_topic_answer(topic_key, topic):
+    """Format the markdown answer for one knowledge base topic"""
+    parts = []
+
+    if topic_key == "demand":
+        parts.append("**Understanding Demand:**\n\n")
+        parts.append(topic['definition'] + "\n\n")
+        parts.append("**" + topic['law'] + "**\n\n")
+        parts.append("**Factors affecting demand:**\n")
+        parts.extend("- " + factor + "\n" for factor in topic['factors'])
+        parts.append("\n**Types:** " + topic['types'])
+
+    elif topic_key == "supply":
+        parts.append("**Understanding Supply:**\n\n")
+        parts.append(topic['definition'] + "\n\n")
+        parts.append("**" + topic['law'] + "**\n\n")
+        parts.append("**Factors affecting supply:**\n")
+        parts.extend("- " + factor + "\n" for factor in topic['factors'])
+
+    elif topic_key == "equilibrium":
+        parts.append("**Market Equilibrium:**\n\n")
+        parts.append(topic['definition'] + "\n\n")
+        parts.append(topic['concept'] + "\n\n")
+        parts.append("**Important:** " + topic['changes'])
+
+    elif topic_key == "elasticity":
+        parts.append("**Elasticity:**\n\n")
+        parts.append(topic['definition'] + "\n\n")
+        parts.append("**Formula:** " + topic['formula'] + "\n\n")
+        parts.append("**Types of Elasticity:**\n")
+        parts.extend("- " + elas_type + "\n" for elas_type in topic['types'])
+        parts.append("\n**Categories:**\n")
+        for category, description in topic['categories'].items():
+            parts.append("- **" + category.title() + ":** " + description + "\n")
+
+    elif topic_key == "consumer_behavior":
+        parts.append("**Consumer Behavior:**\n\n")
+        parts.append("**Utility:** " + topic['utility'] + "\n\n")
+        parts.append("**Marginal Utility:** " + topic['marginal_utility'] + "\n\n")
+        parts.append("**" + topic['law_diminishing'] + "**\n\n")
+        parts.append("**Consumer Equilibrium:** " + topic['consumer_equilibrium'])
+
+    elif topic_key == "production":
+        parts.append("**Production:**\n\n")
+        parts.append(topic['definition'] + "\n\n")
+        parts.append("**Factors of Production:**\n")
+        parts.extend("- " + factor + "\n" for factor in topic['factors'])
+        parts.append("\n**Short Run:** " + topic['short_run'] + "\n")
+        parts.append("**Long Run:** " + topic['long_run'] + "\n\n")
+        parts.append("**Key Concepts:**\n")
+        parts.extend("- " + concept + "\n" for concept in topic['concepts'])
+
+    elif topic_key == "costs":
+        parts.append("**Cost Concepts:**\n\n")
+        parts.append("**Fixed Costs:** " + topic['fixed_costs'] + "\n\n")
+        parts.append("**Variable Costs:** " + topic['variable_costs'] + "\n\n")
+        parts.append("**Total Cost:** " + topic['total_cost'] + "\n\n")
+        parts.append("**Marginal Cost:** " + topic['marginal_cost'] + "\n\n")
+        parts.append("**Average Cost:** " + topic['average_cost'])
+
+    elif topic_key == "market_structures":
+        parts.append("**Market Structures:**\n\n")
+        for market_type, details in topic.items():
+            parts.append("**" + market_type.replace('_', ' ').title() + ":**\n")
+            parts.append("- Characteristics: " + details['characteristics'] + "\n")
+            parts.append("- Pricing: " + details['pricing'] + "\n\n")
+
+    else:
+        # Topics added through a compiled knowledge base file
+        parts.append("**" + topic_key.replace('_', ' ').title() + ":**\n\n")
+        format_fields(topic, parts)
+
+    return "".join(parts)
+
+
+def format_fields(value, parts, depth=0):
+    """Append generic markdown for a topic without a dedicated layout"""
+    if isinstance(value, str):
+        parts.append(value + "\n\n")
+    elif isinstance(value, (list, tuple)):
+        parts.extend("  " * depth + "- " + str(item) + "\n" for item in value)
+        parts.append("\n")
+    elif isinstance(value, dict):
+        for key, item in value.items():
+            label = key.replace('_', ' ').title()
+            if isinstance(item, str):
+                parts.append("**" + label + ":** " + item + "\n\n")
+            else:
+                parts.append("**" + label + ":**\n")
+                format_fields(item, parts, depth + 1)
+
+
+def render_answers(knowledge_base):
+    """Render every topic's markdown answer once, keyed by topic"""
+    answers = {topic_key: format_topic_answer(topic_key, topic)
+               for topic_key, topic in knowledge_base.items()}
+    answers["exam_tips"] = EXAM_TIPS
+    return answers
+
+
+def known_spellings(spelling):
+    """Lowercase words that need no spelling correction: known terms as typed or
+    in plural, and the words the engine reads itself
+    """
+    words = set(spelling.known_terms) | STOP_WORDS | GREETING_WORDS | COMPARISON_WORDS
+    for term in spelling.known_terms:
+        words.update(plural for plural in (term + "s", term[:-1] + "ies") if normalize_token(plural) == term)
+    return words
+
+
+def normalize_question(question):
+    """Normalize question text so trivially different wordings share a cache entry"""
+    return " ".join(re.findall(r"[a-z0-9]+", question.lower()))
+
+
+class AnswerCache:
+    """Bounded LRU cache of answers keyed by normalized question"""
+
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return the cached answer for key, or None"""
+        with self._lock:
+            answer = self._entries.get(key)
+            if answer is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return answer
+
+    def put(self, key, answer):
+        """Store an answer, evicting the least recently used entry when full"""
+        with self._lock:
+            self._entries[key] = answer
+            self._entries.move_to_end(key)
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """Drop all entries and reset the counters"""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        """Return hit/miss counters and current size"""
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._entries)}
+
+
+# Secondary matches must score at least this fraction of the best match
+RELATIVE_SCORE_CUTOFF = 0.6
+
+
+# Semantic matches below this cosine similarity are ignored
+SEMANTIC_MIN_SCORE = 0.3
+# A paraphrase match this close overrides a topic that only a broad keyword hinted at...
+SEMANTIC_CONFIDENT_SCORE = 0.5
+# ...and is only looked for when the question shares this many words with another topic's paraphrases
+PARAPHRASE_OVERLAP = 2
+# The index holds under a hundred passages, so it can afford fewer hash collisions
+SEMANTIC_DIMENSIONS = 256
+# Every keyword-field match scores above this; lower BM25 scores come from body text only
+WEAK_KEYWORD_SCORE = 5.0
+# Topics matched only in body text need this score, so "What time is it?" is not a question about supply
+MIN_BODY_SCORE = 3.0
+# Passages fetched from the semantic index before grouping them by topic
+SEMANTIC_PASSAGES = 10
+
+SEARCH_MODES = ("keyword", "semantic", "hybrid")
+
+
+def paraphrase_topics(knowledge_base):
+    """Map each content word of TOPIC_PARAPHRASES to the topics whose paraphrases use it.
+
+    Keyword words are left out: the router has already read those.
+    """
+    keyword_words = {word for keywords in TOPIC_KEYWORDS.values() for keyword in keywords
+                     for word in WORD.findall(keyword)}
+    topics = {}
+    for topic_key in knowledge_base:
+        for phrase in TOPIC_PARAPHRASES.get(topic_key, []):
+            for word in WORD.findall(phrase):
+                if word not in STOP_WORDS and word not in keyword_words:
+                    topics.setdefault(word, set()).add(topic_key)
+    return topics
+
+
+def resolve_search_mode(search_mode=None):
+    """Return search_mode, or $STUDY_TOOL_SEARCH (default: hybrid), checked"""
+    search_mode = search_mode or os.environ.get("STUDY_TOOL_SEARCH", "hybrid")
+    if search_mode not in SEARCH_MODES:
+        raise ValueError("Unknown search mode {!r}, choose one of {}".format(
+            search_mode, ", ".join(SEARCH_MODES)))
+    return search_mode
+
+
+class AnswerEngine:
+    """Search index, pre-rendered answers and answer cache for one knowledge base.
+
+    ``search_mode`` picks how topics are ranked: "keyword" uses the BM25
+    index only, "semantic" uses hashed n-gram embeddings only, and "hybrid"
+    (the default) falls back to embeddings when keyword matches are weak or rest
+    on a broad keyword that a paraphrase contradicts. Semantic search needs NumPy;
+    without it "hybrid" behaves like "keyword".
+    """
+
+    def __init__(self, knowledge_base, cache_size=1024, version=None, search_mode=None):
+        search_mode = resolve_search_mode(search_mode)
+        self.knowledge_base = knowledge_base
+        self.version = version or content_hash(knowledge_base)
+        self.index = build_knowledge_index(knowledge_base)
+        self.answers = render_answers(knowledge_base)
+        self.cache = AnswerCache(cache_size)
+        # Built from this engine's index, so it follows knowledge base reloads
+        self.spelling = SpellingIndex.from_index(self.index)
+        self.known_spellings = known_spellings(self.spelling)
+        self.router = IntentRouter.from_knowledge_base(knowledge_base)
+        self.comparisons = self._build_comparisons(knowledge_base)
+        self.paraphrase_topics = paraphrase_topics(knowledge_base)
+        self.search_mode = search_mode
+        self.semantic = None
+        if search_mode != "keyword":
+            self.semantic = self._build_semantic_index(knowledge_base, search_mode)
+            if self.semantic is None:
+                self.search_mode = "keyword"
+        # How the engine was loaded; filled in by study_tool.snapshot.load_engine
+        self.startup = {}
+
+    @classmethod
+    def from_parts(cls, knowledge_base, version, search_mode, index, answers, spelling, semantic=None,
+                   cache_size=1024, router=None):
+        """Assemble an engine from prebuilt structures, such as a snapshot's"""
+        engine = cls.__new__(cls)
+        engine.knowledge_base = knowledge_base
+        engine.version = version
+        engine.index = index
+        engine.answers = answers
+        engine.cache = AnswerCache(cache_size)
+        engine.spelling = spelling
+        engine.known_spellings = known_spellings(spelling)
+        engine.router = router or IntentRouter.from_knowledge_base(knowledge_base)
+        # Built in about 0.1 ms, so not part of snapshots
+        engine.comparisons = cls._build_comparisons(knowledge_base)
+        engine.paraphrase_topics = paraphrase_topics(knowledge_base)
+        engine.search_mode = search_mode
+        engine.semantic = semantic
+        engine.startup = {}
+        return engine
+
+    @staticmethod
+    def _build_comparisons(knowledge_base):
+        # Imported here so "python -m study_tool.comparisons" runs a fresh module
+        from .comparisons import build_comparison_matrix
+
+        return build_comparison_matrix(knowledge_base)
+
+    @staticmethod
+    def _build_semantic_index(knowledge_base, search_mode):
+        try:
+            from .semantic import HashedNgramEmbedder, build_semantic_index
+        except ImportError:
+            if search_mode == "semantic":
+                raise
+            return None
+        phrases = {topic_key: TOPIC_KEYWORDS.get(topic_key, []) + TOPIC_PARAPHRASES.get(topic_key, [])
+                   for topic_key in knowledge_base}
+        return build_semantic_index(knowledge_base, phrases, HashedNgramEmbedder(SEMANTIC_DIMENSIONS))
+
+    def answer(self, question, top_k=2):
+        """Answer a question, serving repeated questions from the cache"""
+        return self.answer_with_topic(question, top_k)[0]
+
+    def answer_with_topic(self, question, top_k=2):
+        """Return (answer, topic), where topic is the best matching topic key,
+        "comparison", "greeting" or "fallback"
+        """
+        key = (normalize_question(question), top_k)
+        entry = self.cache.get(key)
+        if entry is None:
+            entry = self._compose_answer(question, top_k)
+            self.cache.put(key, entry)
+        return entry
+
+    def semantic_search(self, question, top_k=2, words=None, min_score=SEMANTIC_MIN_SCORE):
+        """Rank topics by embedding similarity, dropping matches below min_score"""
+        if words is None:
+            words = WORD.findall(question.lower())
+        return self.semantic.search_topics(words, top_k, SEMANTIC_PASSAGES, min_score)
+
+    def _echoes_paraphrases(self, words, topic_key):
+        """Whether the words share PARAPHRASE_OVERLAP paraphrase words with a topic other than topic_key"""
+        common = self.paraphrase_topics.keys() & words
+        # Most questions share fewer words than that with all paraphrases together
+        if len(common) < PARAPHRASE_OVERLAP:
+            return False
+        shared = [other for word in common for other in self.paraphrase_topics[word] if other != topic_key]
+        return len(shared) >= PARAPHRASE_OVERLAP and max(map(shared.count, shared)) >= PARAPHRASE_OVERLAP
+
+    def correct_spelling(self, question):
+        """Return (search text, corrections) with misspelled terms fixed.
+
+        Corrections are (word as typed, term) pairs. Corrected terms are
+        appended to the question rather than replacing the original words,
+        so nothing the student typed is lost.
+        """
+        # Correctly spelled questions, the common case, cost one set check
+        words = CORRECTABLE_WORDS.findall(question.lower())
+        known = self.known_spellings
+        if known.issuperset(words):
+            return question, []
+
+        # Normalized word -> the word it came from, in the order typed
+        unknown = {}
+        for word in words:
+            if word not in known:
+                unknown.setdefault(normalize_token(word), word)
+        corrections = self.spelling.correct(unknown)
+        if not corrections:
+            return question, []
+        # The correction note shows each word as typed, first spelling first
+        typed = {word.lower(): word for word in reversed(LETTERS.findall(question))}
+        corrections = [(typed[unknown[word]], term) for word, term in corrections]
+        return question + " " + " ".join(term for _, term in corrections), corrections
+
+    def compose_answer(self, question, top_k=2):
+        """Rank topics for a question and join their pre-rendered answers"""
+        return self._compose_answer(question, top_k)[0]
+
+    def _compose_answer(self, question, top_k):
+        question, corrections = self.correct_spelling(question)
+        # Split once, after spelling correction so "elastisity" still names elasticity;
+        # the router and BM25 both read these words
+        words = WORD.findall(question.lower())
+        response, topic = self._compose(question, words, top_k)
+        if corrections and response is not FALLBACK_RESPONSE:
+            note = ", ".join("*{}* → **{}**".format(typo, term) for typo, term in corrections)
+            response = "🔤 Corrected spelling: " + note + "\n\n" + response
+        return response, topic
+
+    def _compose(self, question, words, top_k):
+        # The router decides first; search only runs when it finds nothing decisive
+        routes = self.router.route_words(words)
+        if routes:
+            intents = {intent for intent, _, _, _ in routes}
+            if COMPARISON in intents:
+                # Precomputed, so a comparison needs no search at all
+                table = self.comparisons.lookup(question)
+                if table is not None:
+                    return table, "comparison"
+
+            # Topics the question names outright are all answered, in the order named
+            named = list(dict.fromkeys(intent for intent, _, _, broad in routes
+                                       if not broad and intent in self.answers))
+            if named:
+                # Decisive: the question says what it is about, so there is nothing to search for
+                return "\n\n---\n\n".join(self.answers[topic_key] for topic_key in named), named[0]
+
+            if GREETING in intents and not any(intent in self.answers for intent in intents):
+                # Only greet when the question has no economics content
+                return GREETING_RESPONSE, "greeting"
+
+        if self.search_mode == "semantic":
+            matches = self.semantic_search(question, max(top_k, 2), words)
+        else:
+            matches = self.index.search_words(words, top_k=max(top_k, 2), min_body_score=MIN_BODY_SCORE)
+
+        if self.search_mode == "hybrid":
+            if not matches or matches[0][1] < WEAK_KEYWORD_SCORE:
+                # Body-text-only keyword hits are weak; prefer a confident paraphrase match
+                matches = self.semantic_search(question, max(top_k, 2), words) or matches
+            elif routes and self._echoes_paraphrases(words, matches[0][0]):
+                # Routes left here are broad hints, which score like keywords without naming
+                # the topic: "product" in "want more of a product when it is cheaper". Only a
+                # confident paraphrase match of another topic overrides them
+                paraphrased = self.semantic_search(question, max(top_k, 2), words, SEMANTIC_CONFIDENT_SCORE)
+                if paraphrased and paraphrased[0][0] != matches[0][0]:
+                    matches = paraphrased
+
+        if not matches:
+            return FALLBACK_RESPONSE, "fallback"
+
+        best_score = matches[0][1]
+        topics = [doc_id for doc_id, score in matches if score >= best_score * RELATIVE_SCORE_CUTOFF]
+        return "\n\n---\n\n".join(self.answers[topic_key] for topic_key in topics[:top_k]), topics[0]
+
+
+_default_engine = None
+_default_engine_lock = threading.Lock()
+
+
+def get_default_engine():
+    """Return the process-wide engine for the built-in knowledge base"""
+    global _default_engine
+    if _default_engine is None:
+        with _default_engine_lock:
+            if _default_engine is None:
+                # Imported here: the snapshot module builds on this one
+                from .snapshot import load_engine
+
+                _default_engine = load_engine(ECONOMICS_KNOWLEDGE_BASE)
+    return _default_engine
+
+
+# Uploaded passages shown alongside an answer
+NOTE_RESULTS = 2
+# Video transcript moments shown alongside an answer
+TRANSCRIPT_RESULTS = 2
+
+
+def get_ai_response(question, top_k=2, engine=None, notes=None, transcripts=None):
+    """Generate AI response based on question"""
+    return get_ai_response_with_topic(question, top_k, engine, notes, transcripts)[0]
+
+
+def get_ai_response_with_topic(question, top_k=2, engine=None, notes=None, transcripts=None):
+    """Like get_ai_response, but returns (response, topic)"""
+    if engine is None:
+        engine = get_default_engine()
+    metrics = get_metrics()
+    with metrics.span("engine.answer"):
+        response, topic = engine.answer_with_topic(question, top_k)
+
+    if notes is not None and len(notes):
+        # Uploaded notes change during a session, so they are never cached
+        with metrics.span("notes.search"):
+            matches = notes.search(question, top_k=NOTE_RESULTS)
+        if matches and response in (FALLBACK_RESPONSE, GREETING_RESPONSE):
+            response, topic = format_note_matches(matches), "notes"
+        elif matches:
+            response += "\n\n---\n\n" + format_note_matches(matches)
+
+    if transcripts is not None and len(transcripts):
+        # Imported here so "python -m study_tool.transcripts" runs a fresh module
+        from .transcripts import format_transcript_matches
+
+        with metrics.span("transcripts.search"):
+            hits = transcripts.search(question, TRANSCRIPT_RESULTS)
+        if hits and response in (FALLBACK_RESPONSE, GREETING_RESPONSE):
+            response, topic = format_transcript_matches(hits), "transcripts"
+        elif hits:
+            response += "\n\n---\n\n" + format_transcript_matches(hits)
+
+    metrics.count("questions_total", topic=topic)
+    return response, topic
@@ -0,0 +1,281 @@
+"""Flashcards and quiz items generated from the knowledge base, with
+spaced-repetition scheduling.
+
+Every definition, law, factor list and "Term: meaning" item becomes a card.
+Review state lives in parallel ``array`` columns (20 bytes per card) rather
+than per-card dicts, and the next due card comes from a binary heap of
+integers that pack the due time and card id together, so picking a card
+costs O(log n) even for decks of 100k+ cards. Quiz distractors come from a
+pool built once per deck.
+"""
+
+import heapq
+import random
+import time
+from array import array
+
+# Card ids take the low bits of a heap key, the due time in ms the rest
+ID_BITS = 22
+ID_MASK = (1 << ID_BITS) - 1
+MAX_CARDS = 1 << ID_BITS
+
+# Review grades, as in SM-2 (0-5)
+AGAIN = 0
+HARD = 3
+GOOD = 4
+EASY = 5
+
+DAY_MS = 24 * 60 * 60 * 1000
+# A forgotten card comes back within the same study session
+RELEARN_DELAY_MS = 60 * 1000
+INITIAL_EASE = 2.5
+MINIMUM_EASE = 1.3
+
+QUIZ_OPTIONS = 4
+
+
+class Card:
+    """One question/answer pair; ``key`` is its path in the knowledge base"""
+
+    __slots__ = ("key", "topic", "front", "back", "kind", "items")
+
+    def __init__(self, key, topic, front, back, kind, items=()):
+        self.key = key
+        self.topic = topic
+        self.front = front
+        self.back = back
+        self.kind = kind
+        self.items = tuple(items)
+
+
+def _label(name):
+    return name.replace("_", " ").title()
+
+
+def _split_term(item):
+    """Split "Term: meaning" list items; returns (term, meaning) or None"""
+    term, separator, meaning = item.partition(": ")
+    if separator and len(term) < 60 and meaning:
+        return term.strip(), meaning.strip()
+    return None
+
+
+def generate_cards(knowledge_base):
+    """Build a card for every text field, list and "Term: meaning" item"""
+    cards = []
+
+    def walk(topic_key, value, path):
+        title = " › ".join(_label(part) for part in path)
+        key = "/".join(path)
+        if isinstance(value, str):
+            cards.append(Card(key, topic_key, title, value, "fact"))
+        elif isinstance(value, (list, tuple)):
+            items = [str(item) for item in value]
+            cards.append(Card(key, topic_key, "List: " + title,
+                              "\n".join("- " + item for item in items), "list", items))
+            for item in items:
+                term = _split_term(item)
+                if term:
+                    cards.append(Card(key + "/" + term[0], topic_key, term[0], term[1], "term"))
+        elif isinstance(value, dict):
+            for field, item in value.items():
+                walk(topic_key, item, path + (field,))
+
+    for topic_key, topic in knowledge_base.items():
+        walk(topic_key, topic, (topic_key,))
+    if len(cards) > MAX_CARDS:
+        raise ValueError("Decks are limited to {} cards".format(MAX_CARDS))
+    return cards
+
+
+class DistractorPool:
+    """Candidate wrong answers for quiz items, gathered once per deck.
+
+    Distractors are drawn from cards of the same kind, so definitions are
+    mixed with definitions and list items with other lists' items.
+    """
+
+    def __init__(self, cards):
+        self.list_items = sorted({item for card in cards if card.kind == "list" for item in card.items})
+        self.answers = sorted({card.back for card in cards if card.kind != "list"})
+
+    def draw(self, card, count, rng):
+        """Up to count distractors for a card, in random order"""
+        if card.kind == "list":
+            candidates, exclude = self.list_items, set(card.items)
+        else:
+            candidates, exclude = self.answers, {card.back}
+        # Only a card's own values are excluded, so oversampling by their number is enough
+        picked = rng.sample(candidates, min(len(candidates), count + len(exclude)))
+        return [value for value in picked if value not in exclude][:count]
+
+
+def quiz_item(cards, card_id, rng=None, distractors=None):
+    """Multiple-choice question for one card: (prompt, options, answer index).
+
+    Pass the deck's DistractorPool when asking more than one question.
+    """
+    rng = rng or random.Random()
+    distractors = distractors or DistractorPool(cards)
+    card = cards[card_id]
+    if card.kind == "list":
+        correct = rng.choice(card.items)
+        prompt = "Which of these belongs to: " + card.front[len("List: "):] + "?"
+    else:
+        correct = card.back
+        prompt = "Which of these matches: " + card.front + "?"
+    options = distractors.draw(card, QUIZ_OPTIONS - 1, rng) + [correct]
+    rng.shuffle(options)
+    return prompt, options, options.index(correct)
+
+
+class ReviewState:
+    """SM-2 review state for a deck, one array element per card"""
+
+    # (attribute, array typecode, value for a new card)
+    COLUMNS = (
+        ("due", "q", 0),           # ms since the epoch; 0 means new
+        ("interval", "f", 0.0),    # days
+        ("ease", "f", INITIAL_EASE),
+        ("reps", "H", 0),          # successful reviews in a row
+        ("lapses", "H", 0),
+    )
+
+    def __init__(self, card_count):
+        self.card_count = card_count
+        for name, typecode, initial in self.COLUMNS:
+            setattr(self, name, array(typecode, [initial]) * card_count)
+
+    @classmethod
+    def bytes_per_card(cls):
+        return sum(array(typecode).itemsize for _, typecode, _ in cls.COLUMNS)
+
+    def to_bytes(self):
+        return b"".join(getattr(self, name).tobytes() for name, _, _ in self.COLUMNS)
+
+    @classmethod
+    def from_bytes(cls, card_count, data):
+        """Restore state saved by ``to_bytes`` for a deck of card_count cards"""
+        if len(data) != card_count * cls.bytes_per_card():
+            raise ValueError("Saved review state does not match a deck of {} cards".format(card_count))
+        state = cls.__new__(cls)
+        state.card_count = card_count
+        offset = 0
+        for name, typecode, _ in cls.COLUMNS:
+            column = array(typecode)
+            size = column.itemsize * card_count
+            column.frombytes(data[offset:offset + size])
+            setattr(state, name, column)
+            offset += size
+        return state
+
+
+class Scheduler:
+    """Picks the next card and applies SM-2 reviews.
+
+    Reviewed cards wait in a heap ordered by due time; cards due now come
+    first, then new cards in deck order. Reviewing a card pushes a new heap
+    entry instead of searching for the old one: stale entries are recognised
+    by their due time and skipped, and the heap is rebuilt once they
+    outnumber the live ones.
+    """
+
+    def __init__(self, card_count, state=None):
+        self.state = state or ReviewState(card_count)
+        self.card_count = card_count
+        self._rebuild()
+        self.new_count = sum(1 for due in self.state.due if not due)
+        self._next_new = 0
+
+    def _rebuild(self):
+        due = self.state.due
+        self._heap = [(due[card_id] << ID_BITS) | card_id
+                      for card_id in range(self.card_count) if due[card_id]]
+        heapq.heapify(self._heap)
+
+    def _peek(self):
+        """Earliest live heap key, dropping stale entries on the way"""
+        heap = self._heap
+        due = self.state.due
+        while heap:
+            key = heap[0]
+            if key >> ID_BITS == due[key & ID_MASK]:
+                return key
+            heapq.heappop(heap)
+        return None
+
+    def _peek_new(self):
+        """First card that was never reviewed, or None"""
+        due = self.state.due
+        while self._next_new < self.card_count and due[self._next_new]:
+            self._next_new += 1
+        return self._next_new if self._next_new < self.card_count else None
+
+    def next_card(self, now=None):
+        """Id of the most overdue card, else the next new card, else None"""
+        key = self._peek()
+        if key is not None and key >> ID_BITS <= _now_ms(now):
+            return key & ID_MASK
+        return self._peek_new()
+
+    def next_due(self):
+        """When the next reviewed card falls due, in seconds since the epoch"""
+        key = self._peek()
+        return None if key is None else (key >> ID_BITS) / 1000
+
+    def due_count(self, now=None):
+        """Reviewed cards due now.
+
+        Walks only the part of the heap that is due: a heap entry is never due
+        before its parent, so subtrees past ``now`` are skipped.
+        """
+        heap = self._heap
+        due = self.state.due
+        limit = (_now_ms(now) + 1) << ID_BITS
+        counted = set()
+        stack = [0] if heap else []
+        while stack:
+            index = stack.pop()
+            key = heap[index]
+            if key >= limit:
+                continue
+            if key >> ID_BITS == due[key & ID_MASK]:
+                counted.add(key & ID_MASK)
+            stack.extend(child for child in (2 * index + 1, 2 * index + 2) if child < len(heap))
+        return len(counted)
+
+    def review(self, card_id, grade, now=None):
+        """Record a review with an SM-2 grade (AGAIN, HARD, GOOD or EASY)"""
+        state = self.state
+        now_ms = _now_ms(now)
+        if not state.due[card_id]:
+            self.new_count -= 1
+        if grade < HARD:
+            state.reps[card_id] = 0
+            state.lapses[card_id] = min(state.lapses[card_id] + 1, 0xFFFF)
+            state.interval[card_id] = 0.0
+            due = now_ms + RELEARN_DELAY_MS
+        else:
+            reps = state.reps[card_id]
+            if reps == 0:
+                interval = 1.0
+            elif reps == 1:
+                interval = 6.0
+            else:
+                interval = state.interval[card_id] * state.ease[card_id]
+            if grade == HARD:
+                interval = max(1.0, interval * 0.6)
+            state.reps[card_id] = min(reps + 1, 0xFFFF)
+            state.interval[card_id] = interval
+            due = now_ms + int(interval * DAY_MS)
+        state.ease[card_id] = max(MINIMUM_EASE,
+                                  state.ease[card_id] + 0.1 - (5 - grade) * (0.08 + (5 - grade) * 0.02))
+
+        state.due[card_id] = due
+        heapq.heappush(self._heap, (due << ID_BITS) | card_id)
+        if len(self._heap) > 2 * (self.card_count - self.new_count) + 64:
+            self._rebuild()
+
+
+def _now_ms(now):
+    return int((time.time() if now is None else now) * 1000)
@@ -0,0 +1,139 @@
+"""Compact, bounded chat history with older turns spilled to disk"""
+
+import json
+import os
+import tempfile
+import threading
+import time
+import uuid
+from array import array
+from collections import deque
+from datetime import datetime
+
+SPILL_DIR = os.path.join(tempfile.gettempdir(), "study_tool_history")
+
+
+class ChatMessage:
+    """One chat turn; timestamps are integer seconds since the epoch"""
+
+    __slots__ = ("role", "content", "timestamp")
+
+    def __init__(self, role, content, timestamp=None):
+        self.role = role
+        self.content = content
+        self.timestamp = int(time.time()) if timestamp is None else int(timestamp)
+
+    def time_label(self):
+        """Format the timestamp the way the chat view shows it"""
+        return datetime.fromtimestamp(self.timestamp).strftime("%H:%M:%S")
+
+    def to_json(self):
+        return json.dumps([self.role, self.content, self.timestamp])
+
+    @classmethod
+    def from_json(cls, line):
+        role, content, timestamp = json.loads(line)
+        return cls(role, content, timestamp)
+
+
+class ChatHistory:
+    """Chat history that keeps the newest turns in memory and spills the rest.
+
+    At most ``max_messages`` messages are held in memory. Without a store,
+    older messages are appended to a per-session JSONL file. With a
+    SessionStore every message is also persisted for ``student_id``, older
+    pages are read back from the database on demand, and the history
+    survives restarts. Either way memory use does not grow with the
+    session length.
+    """
+
+    def __init__(self, max_messages=100, spill_dir=SPILL_DIR, store=None, student_id=None):
+        self.max_messages = max_messages
+        self.store = store
+        self.student_id = student_id
+        self.spill_path = os.path.join(spill_dir, uuid.uuid4().hex + ".jsonl")
+        self._recent = deque()
+        # Messages not held in memory; earlier sessions' history counts too
+        self._spilled = store.count_messages(student_id) if store else 0
+        # Byte offset of every message in the spill file, 8 bytes each
+        self._spill_offsets = array("q")
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return self._spilled + len(self._recent)
+
+    def __bool__(self):
+        return len(self) > 0
+
+    def append(self, role, content, timestamp=None):
+        """Add a message, spilling the oldest ones once the cap is exceeded"""
+        with self._lock:
+            message = ChatMessage(role, content, timestamp)
+            self._recent.append(message)
+            if self.store:
+                self.store.add_message(self.student_id, role, content, message.timestamp)
+            if len(self._recent) > self.max_messages:
+                self._spill(len(self._recent) - self.max_messages // 2)
+
+    def _spill(self, count):
+        """Move the oldest ``count`` in-memory messages out of memory"""
+        self._spilled += count
+        if self.store:
+            # Already queued for the database; just let them go
+            for _ in range(count):
+                self._recent.popleft()
+            return
+
+        os.makedirs(os.path.dirname(self.spill_path), exist_ok=True)
+        with open(self.spill_path, "ab") as spill_file:
+            offset = spill_file.tell()
+            for _ in range(count):
+                line = (self._recent.popleft().to_json() + "\n").encode("utf-8")
+                spill_file.write(line)
+                self._spill_offsets.append(offset)
+                offset += len(line)
+
+    def _read_spilled(self, start, stop):
+        """Read spilled messages [start, stop) back from disk"""
+        if start >= stop:
+            return []
+        if self.store:
+            # Only this student's queued writes need to land before the read
+            self.store.flush(self.student_id)
+            rows = self.store.load_messages(self.student_id, start, stop)
+            return [ChatMessage(role, content, timestamp) for role, content, timestamp in rows]
+        with open(self.spill_path, "rb") as spill_file:
+            spill_file.seek(self._spill_offsets[start])
+            return [ChatMessage.from_json(spill_file.readline()) for _ in range(stop - start)]
+
+    def page_count(self, page_size):
+        """Number of pages of ``page_size`` messages"""
+        return max(1, -(-len(self) // page_size))
+
+    def window(self, page=0, page_size=20):
+        """Return one page of messages in chronological order.
+
+        Page 0 holds the newest messages, page 1 the ones before it, and so on.
+        """
+        with self._lock:
+            total = len(self)
+            stop = max(0, total - page * page_size)
+            start = max(0, stop - page_size)
+            spilled = self._spilled
+
+            messages = self._read_spilled(start, min(stop, spilled))
+            recent_start = max(start - spilled, 0)
+            recent_stop = max(stop - spilled, 0)
+            messages.extend(self._recent[i] for i in range(recent_start, recent_stop))
+            return messages
+
+    def clear(self):
+        """Forget every message and delete the spill file or stored history"""
+        with self._lock:
+            self._recent.clear()
+            self._spilled = 0
+            self._spill_offsets = array("q")
+            if self.store:
+                self.store.clear_messages(self.student_id)
+            if os.path.exists(self.spill_path):
+                os.remove(self.spill_path)
@@ -0,0 +1,205 @@
+"""Streaming ingestion of students' own text and markdown notes.
+
+Files are read in fixed-size chunks, decoded incrementally, normalized and
+split into passages that are added to a searchable index in small batches
+on a background thread pool, so large files never sit in memory whole.
+"""
+
+import codecs
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from .search import KnowledgeIndex
+
+CHUNK_SIZE = 64 * 1024
+# Passages are split at paragraph breaks and kept under this many characters
+MAX_PASSAGE_CHARS = 800
+# Passages are added to the index in batches of this size
+INDEX_BATCH_SIZE = 32
+
+MARKDOWN_NOISE = re.compile(r"^\s{0,3}(#{1,6}|>|[-*+]|\d+[.)])\s+|[*_`~]+", re.MULTILINE)
+MARKDOWN_LINK = re.compile(r"!?\[([^\]]*)\]\([^)]*\)")
+SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+
+def iter_chunks(fileobj, chunk_size=CHUNK_SIZE):
+    """Yield decoded text from a binary or text file object, chunk by chunk"""
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    while True:
+        chunk = fileobj.read(chunk_size)
+        if not chunk:
+            break
+        yield decoder.decode(chunk) if isinstance(chunk, bytes) else chunk
+    tail = decoder.decode(b"", final=True)
+    if tail:
+        yield tail
+
+
+def normalize_text(text):
+    """Strip markdown markup and collapse whitespace"""
+    text = MARKDOWN_LINK.sub(r"\1", text)
+    text = MARKDOWN_NOISE.sub("", text)
+    return " ".join(text.split())
+
+
+def split_paragraph(paragraph, max_chars=MAX_PASSAGE_CHARS):
+    """Split one normalized paragraph into passages of at most max_chars"""
+    if len(paragraph) <= max_chars:
+        return [paragraph]
+    passages = []
+    current = ""
+    for sentence in SENTENCE_END.split(paragraph):
+        while len(sentence) > max_chars:
+            # A single very long sentence is cut at the limit
+            passages.append(sentence[:max_chars])
+            sentence = sentence[max_chars:]
+        if current and len(current) + len(sentence) + 1 > max_chars:
+            passages.append(current)
+            current = sentence
+        else:
+            current = current + " " + sentence if current else sentence
+    if current:
+        passages.append(current)
+    return passages
+
+
+def iter_passages(chunks, max_chars=MAX_PASSAGE_CHARS):
+    """Turn a stream of text chunks into normalized passages"""
+    buffer = ""
+    for chunk in chunks:
+        buffer += chunk.replace("\r\n", "\n")
+        # Everything before the last blank line is made of complete paragraphs
+        *paragraphs, buffer = re.split(r"\n\s*\n", buffer)
+        for paragraph in paragraphs:
+            text = normalize_text(paragraph)
+            if text:
+                yield from split_paragraph(text, max_chars)
+        if len(buffer) > 4 * max_chars:
+            # No paragraph break for a long stretch; flush what we have
+            text = normalize_text(buffer)
+            buffer = ""
+            if text:
+                yield from split_paragraph(text, max_chars)
+    text = normalize_text(buffer)
+    if text:
+        yield from split_paragraph(text, max_chars)
+
+
+class PassageIndex:
+    """Thread-safe, incrementally built search index over uploaded passages"""
+
+    def __init__(self, store=None, student_id=None):
+        self.index = KnowledgeIndex()
+        self.passages = []
+        self.store = store
+        self.student_id = student_id
+        self._lock = threading.Lock()
+        if store:
+            for source, text in store.load_notes(student_id):
+                self._add(source, text)
+
+    def __len__(self):
+        return len(self.passages)
+
+    def _add(self, source, text):
+        doc_id = len(self.passages)
+        self.passages.append((source, text))
+        self.index.add_document(doc_id, [source], [text])
+
+    def add_passages(self, source, passages):
+        """Index a batch of passages from one source file"""
+        with self._lock:
+            for text in passages:
+                self._add(source, text)
+        if self.store:
+            self.store.add_notes(self.student_id, source, passages)
+
+    def search(self, question, top_k=3):
+        """Return up to top_k (source, text, score) matches"""
+        with self._lock:
+            matches = self.index.search(question, top_k)
+            return [self.passages[doc_id] + (score,) for doc_id, score in matches]
+
+
+class IngestionJob:
+    """Progress of one file being ingested"""
+
+    def __init__(self, name, total_bytes=None):
+        self.name = name
+        self.total_bytes = total_bytes
+        self.bytes_read = 0
+        self.passages = 0
+        self.done = False
+        self.error = None
+        self.future = None
+
+    def progress(self):
+        """Fraction complete between 0 and 1, when the size is known"""
+        if self.done:
+            return 1.0
+        if not self.total_bytes:
+            return 0.0
+        return min(1.0, self.bytes_read / self.total_bytes)
+
+
+class _CountingReader:
+    """Wraps a file object and records how many bytes were read"""
+
+    def __init__(self, fileobj, job):
+        self.fileobj = fileobj
+        self.job = job
+
+    def read(self, size):
+        data = self.fileobj.read(size)
+        self.job.bytes_read += len(data)
+        return data
+
+
+class Ingestor:
+    """Runs ingestion jobs on a shared background thread pool"""
+
+    def __init__(self, max_workers=2):
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ingest")
+
+    def submit(self, passage_index, name, fileobj, total_bytes=None):
+        """Start ingesting fileobj into passage_index and return its job"""
+        job = IngestionJob(name, total_bytes)
+        job.future = self._pool.submit(self._run, passage_index, job, fileobj)
+        return job
+
+    def submit_path(self, passage_index, path):
+        """Start ingesting a file on disk, streaming it from the file system"""
+        fileobj = open(path, "rb")
+        job = self.submit(passage_index, os.path.basename(path), fileobj, os.path.getsize(path))
+        job.future.add_done_callback(lambda _: fileobj.close())
+        return job
+
+    @staticmethod
+    def _run(passage_index, job, fileobj):
+        try:
+            batch = []
+            for passage in iter_passages(iter_chunks(_CountingReader(fileobj, job))):
+                batch.append(passage)
+                if len(batch) >= INDEX_BATCH_SIZE:
+                    passage_index.add_passages(job.name, batch)
+                    job.passages += len(batch)
+                    batch = []
+            if batch:
+                passage_index.add_passages(job.name, batch)
+                job.passages += len(batch)
+        except Exception as error:
+            job.error = error
+        finally:
+            job.done = True
+        return job
+
+
+def format_note_matches(matches, max_chars=400):
+    """Format passage matches as a markdown section"""
+    parts = ["**📝 From your notes:**\n\n"]
+    for source, text, _ in matches:
+        snippet = text if len(text) <= max_chars else text[:max_chars].rsplit(" ", 1)[0] + "…"
+        parts.append("> " + snippet + "\n>\n> — *" + source + "*\n\n")
+    return "".join(parts)
@@ -0,0 +1,224 @@
+"""Compiled knowledge base file that server processes memory-map read-only.
+
+Every process maps the same file, so the operating system shares its pages
+instead of each process holding its own copy of the knowledge base. The
+file is replaced atomically when it is rebuilt and readers pick up the new
+version on their next check, without a restart.
+
+File layout (all integers little-endian):
+
+    header   magic b"EKB1", format version (u16), topic count (u32),
+             sha256 content hash (32 bytes)
+    table    one (key offset, key length, value offset, value length)
+             u32 quadruple per topic, offsets relative to the data section
+    data     UTF-8 topic keys and JSON-encoded topic values
+
+Usage:
+    python -m study_tool.kbfile build [--source topics.json] [--output path]
+    python -m study_tool.kbfile show [path]
+"""
+
+import argparse
+import json
+import logging
+import mmap
+import os
+import struct
+import sys
+import tempfile
+import threading
+import time
+from collections.abc import Mapping
+
+from .knowledge_base import ECONOMICS_KNOWLEDGE_BASE, content_hash
+
+MAGIC = b"EKB1"
+FORMAT_VERSION = 1
+HEADER = struct.Struct("<4sHI32s")
+TABLE_ENTRY = struct.Struct("<IIII")
+
+log = logging.getLogger(__name__)
+
+DEFAULT_KB_PATH = os.environ.get(
+    "STUDY_TOOL_KB_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "knowledge_base.ekb"))
+
+
+class KnowledgeBaseFormatError(ValueError):
+    """Raised when a file is not a compiled knowledge base"""
+
+
+def compile_knowledge_base(knowledge_base, path=DEFAULT_KB_PATH):
+    """Write knowledge_base to path in the compiled format, atomically"""
+    table = []
+    data = bytearray()
+    for key, value in knowledge_base.items():
+        key_bytes = key.encode("utf-8")
+        value_bytes = json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        table.append((len(data), len(key_bytes), len(data) + len(key_bytes), len(value_bytes)))
+        data += key_bytes + value_bytes
+
+    digest = bytes.fromhex(content_hash(knowledge_base))
+    directory = os.path.dirname(os.path.abspath(path))
+    handle, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(handle, "wb") as out:
+            out.write(HEADER.pack(MAGIC, FORMAT_VERSION, len(table), digest))
+            for entry in table:
+                out.write(TABLE_ENTRY.pack(*entry))
+            out.write(data)
+        # Readers holding the old file keep their mapping; new opens see the new one
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return path
+
+
+class MappedKnowledgeBase(Mapping):
+    """Read-only mapping over a compiled knowledge base file.
+
+    Only the small key table is parsed on open. Topic values are decoded
+    from the mapping on every access and not kept: the file's pages are
+    shared between processes, decoded values would not be. The engine,
+    router and other indexes read each topic once per version and keep
+    what they derive from it.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as source:
+            stat = os.fstat(source.fileno())
+            self.signature = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+            # Checked before mapping: an empty file cannot be mapped at all
+            if stat.st_size < HEADER.size:
+                raise KnowledgeBaseFormatError("{} is too small to be a knowledge base".format(path))
+            self._map = mmap.mmap(source.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, count, digest = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise KnowledgeBaseFormatError("{} is not a version {} knowledge base file".format(
+                path, FORMAT_VERSION))
+        self.version = digest.hex()
+
+        size = self._map.size()
+        data_start = HEADER.size + count * TABLE_ENTRY.size
+        if data_start > size:
+            raise KnowledgeBaseFormatError("{} is truncated".format(path))
+        self._entries = {}
+        for i in range(count):
+            key_offset, key_length, value_offset, value_length = TABLE_ENTRY.unpack_from(
+                self._map, HEADER.size + i * TABLE_ENTRY.size)
+            start = data_start + key_offset
+            if max(start + key_length, data_start + value_offset + value_length) > size:
+                raise KnowledgeBaseFormatError("{} is truncated".format(path))
+            key = self._map[start:start + key_length].decode("utf-8")
+            self._entries[key] = (data_start + value_offset, value_length)
+
+    def __getitem__(self, key):
+        offset, length = self._entries[key]
+        return json.loads(self._map[offset:offset + length])
+
+    def __iter__(self):
+        return iter(self._entries)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class StaticKnowledgeStore:
+    """Store for the built-in knowledge base, which never changes"""
+
+    def __init__(self, knowledge_base=ECONOMICS_KNOWLEDGE_BASE):
+        self._snapshot = (knowledge_base, content_hash(knowledge_base))
+
+    def snapshot(self):
+        """Return (knowledge_base, version)"""
+        return self._snapshot
+
+
+class KnowledgeBaseStore:
+    """Serves the current compiled knowledge base and reloads it on change.
+
+    The file's inode and mtime are checked at most once every
+    ``check_interval`` seconds. A changed file is mapped in full before it
+    replaces the current snapshot, so callers always see a complete version.
+    A replacement that cannot be read is logged once and skipped, and the
+    last good version is served until the file changes again.
+    """
+
+    def __init__(self, path=DEFAULT_KB_PATH, check_interval=1.0):
+        self.path = path
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._current = MappedKnowledgeBase(path)
+        self._rejected = None
+        self._checked_at = time.monotonic()
+
+    def snapshot(self):
+        """Return (knowledge_base, version), reloading first if the file changed"""
+        if time.monotonic() - self._checked_at >= self.check_interval:
+            self._reload_if_changed()
+        current = self._current
+        return current, current.version
+
+    def _reload_if_changed(self):
+        with self._lock:
+            self._checked_at = time.monotonic()
+            try:
+                stat = os.stat(self.path)
+            except FileNotFoundError:
+                # Keep serving the last good version
+                return
+            signature = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+            if signature == self._current.signature or signature == self._rejected:
+                return
+            try:
+                replacement = MappedKnowledgeBase(self.path)
+            except (KnowledgeBaseFormatError, ValueError, OSError) as error:
+                # A bad file must not break every page; keep the last good version
+                self._rejected = signature
+                log.error("Keeping knowledge base version %s, cannot load %s: %s",
+                          self._current.version[:12], self.path, error)
+                return
+            # Sessions still holding the old mapping keep it until they let go
+            self._current = replacement
+
+
+def open_knowledge_store(path=DEFAULT_KB_PATH, check_interval=1.0):
+    """Use the compiled file at path when it exists, else the built-in knowledge base"""
+    if os.path.exists(path):
+        return KnowledgeBaseStore(path, check_interval)
+    return StaticKnowledgeStore()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build or inspect a compiled knowledge base file")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    build = commands.add_parser("build", help="compile a knowledge base file")
+    build.add_argument("--source", help="JSON file of topics (default: the built-in knowledge base)")
+    build.add_argument("--output", default=DEFAULT_KB_PATH)
+
+    show = commands.add_parser("show", help="list the topics in a compiled file")
+    show.add_argument("path", nargs="?", default=DEFAULT_KB_PATH)
+
+    args = parser.parse_args(argv)
+    if args.command == "build":
+        knowledge_base = ECONOMICS_KNOWLEDGE_BASE
+        if args.source:
+            with open(args.source, encoding="utf-8") as source:
+                knowledge_base = json.load(source)
+        path = compile_knowledge_base(knowledge_base, args.output)
+        print("Compiled {} topics to {}".format(len(knowledge_base), path))
+    else:
+        knowledge_base = MappedKnowledgeBase(args.path)
+        print("{} (version {})".format(args.path, knowledge_base.version[:12]))
+        for key in knowledge_base:
+            print("  " + key)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,206 @@
+"""Economics knowledge base and fixed tutor responses"""
+
+import hashlib
+import json
+
+# Economics content based on typical microeconomics chapters
+ECONOMICS_KNOWLEDGE_BASE = {
+    "demand": {
+        "definition": "Demand refers to the quantity of a good or service that consumers are willing and able to purchase at various prices during a given period of time.",
+        "law": "The Law of Demand states that, other things being equal (ceteris paribus), as the price of a good increases, the quantity demanded decreases, and vice versa.",
+        "factors": [
+            "Price of the commodity",
+            "Income of the consumer",
+            "Prices of related goods (substitutes and complements)",
+            "Consumer preferences and tastes",
+            "Consumer expectations about future prices",
+            "Number of consumers in the market"
+        ],
+        "types": "Individual demand (single consumer) and Market demand (all consumers)"
+    },
+    "supply": {
+        "definition": "Supply refers to the quantity of a good or service that producers are willing and able to offer for sale at various prices during a given period of time.",
+        "law": "The Law of Supply states that, other things being equal, as the price of a good increases, the quantity supplied increases, and vice versa.",
+        "factors": [
+            "Price of the commodity",
+            "Prices of inputs/factors of production",
+            "Technology",
+            "Number of sellers",
+            "Government policies (taxes and subsidies)",
+            "Expectations about future prices"
+        ]
+    },
+    "equilibrium": {
+        "definition": "Market equilibrium occurs when the quantity demanded equals the quantity supplied at a particular price, called the equilibrium price.",
+        "concept": "At equilibrium, there is no tendency for the price to change as the market clears with no excess demand or supply.",
+        "changes": "Shifts in demand or supply curves will create new equilibrium points with different prices and quantities."
+    },
+    "elasticity": {
+        "definition": "Elasticity measures the responsiveness of quantity demanded or supplied to changes in price or other factors.",
+        "types": [
+            "Price Elasticity of Demand (PED): Responsiveness of quantity demanded to price changes",
+            "Income Elasticity of Demand: Responsiveness to income changes",
+            "Cross Elasticity of Demand: Responsiveness to changes in prices of related goods",
+            "Price Elasticity of Supply: Responsiveness of quantity supplied to price changes"
+        ],
+        "formula": "Elasticity = (% Change in Quantity) / (% Change in Price)",
+        "categories": {
+            "elastic": "When elasticity > 1 (highly responsive)",
+            "inelastic": "When elasticity < 1 (less responsive)",
+            "unitary": "When elasticity = 1 (proportionate change)"
+        }
+    },
+    "consumer_behavior": {
+        "utility": "Utility is the satisfaction or pleasure derived from consuming a good or service.",
+        "marginal_utility": "The additional satisfaction from consuming one more unit of a good.",
+        "law_diminishing": "Law of Diminishing Marginal Utility: As consumption increases, the additional satisfaction from each additional unit decreases.",
+        "consumer_equilibrium": "A consumer is in equilibrium when they maximize total utility given their budget constraint."
+    },
+    "production": {
+        "definition": "Production is the process of transforming inputs (factors of production) into outputs (goods and services).",
+        "factors": ["Land", "Labor", "Capital", "Entrepreneurship"],
+        "short_run": "Period where at least one factor of production is fixed.",
+        "long_run": "Period where all factors of production are variable.",
+        "concepts": [
+            "Total Product (TP): Total output produced",
+            "Marginal Product (MP): Additional output from one more unit of input",
+            "Average Product (AP): Output per unit of input"
+        ]
+    },
+    "costs": {
+        "fixed_costs": "Costs that do not vary with output level (e.g., rent, salaries)",
+        "variable_costs": "Costs that vary directly with output level (e.g., raw materials)",
+        "total_cost": "TC = Fixed Cost + Variable Cost",
+        "marginal_cost": "The additional cost of producing one more unit of output",
+        "average_cost": "Total cost divided by quantity of output"
+    },
+    "market_structures": {
+        "perfect_competition": {
+            "characteristics": "Many buyers and sellers, homogeneous products, free entry/exit, perfect information",
+            "pricing": "Price takers - firms accept market price"
+        },
+        "monopoly": {
+            "characteristics": "Single seller, unique product, barriers to entry, price maker",
+            "pricing": "Firm has market power to set prices"
+        },
+        "monopolistic_competition": {
+            "characteristics": "Many sellers, differentiated products, relatively free entry/exit",
+            "pricing": "Some control over price due to product differentiation"
+        },
+        "oligopoly": {
+            "characteristics": "Few large firms, interdependent decision-making, barriers to entry",
+            "pricing": "Strategic pricing decisions considering rivals' reactions"
+        }
+    }
+}
+
+# Extra keywords and synonyms that route a question to a topic
+TOPIC_KEYWORDS = {
+    "demand": ["demand", "law of demand"],
+    "supply": ["supply", "law of supply"],
+    "equilibrium": ["equilibrium", "market clearing"],
+    "elasticity": ["elasticity", "elastic", "inelastic"],
+    "consumer_behavior": ["utility", "consumer", "satisfaction"],
+    "production": ["production", "product"],
+    "costs": ["cost"],
+    "market_structures": ["market", "competition", "monopoly", "oligopoly"],
+    "exam_tips": ["exam", "tip", "prepare", "preparation", "revision"],
+}
+
+# Everyday phrasings of each topic, used by semantic search to catch
+# questions that never name the concept
+TOPIC_PARAPHRASES = {
+    "demand": [
+        "how much of something buyers want at each price",
+        "customers want fewer items as prices rise",
+        "people purchase more of a product once it becomes cheaper",
+        "how much shoppers are willing and able to pay for",
+        "people buy less of something when its price goes up",
+        "consumers buy less as goods get more expensive",
+    ],
+    "supply": [
+        "sellers offer more for sale when prices are higher",
+        "how much producers are willing to sell",
+        "businesses produce more when they can charge a higher price",
+        "farmers and factories bring more to market as the price climbs",
+    ],
+    "equilibrium": [
+        "where the amount bought equals the amount sold",
+        "the price at which there is no shortage or surplus",
+        "prices move until everything offered gets bought",
+    ],
+    "elasticity": [
+        "how sensitive buyers are to a price change",
+        "how much sales drop when the price rises",
+        "how strongly purchases react when something gets more expensive",
+        "necessities like fuel or medicine that people buy whatever the cost",
+    ],
+    "consumer_behavior": [
+        "how happy or satisfied a person is from eating or using something",
+        "each extra slice gives less enjoyment than the last",
+        "getting the most satisfaction from a limited budget",
+        "how shoppers choose what to spend their money on",
+    ],
+    "production": [
+        "turning workers machines and raw materials into goods",
+        "how much output an extra worker adds",
+        "hiring more staff in a factory with the same equipment",
+    ],
+    "costs": [
+        "how much it costs to make one more unit",
+        "expenses like rent that stay the same however much is made",
+        "spending on wages materials and electricity that rises with output",
+        "what a business pays to run",
+    ],
+    "market_structures": [
+        "a single company controls the whole market",
+        "a few big firms watch each other's prices",
+        "lots of small sellers selling the same thing",
+        "how much competition an industry has",
+    ],
+}
+
+EXAM_TIPS = """**Exam Preparation Tips:**
+
+1. **Understand Core Concepts:** Focus on laws of demand and supply, elasticity, and market equilibrium
+2. **Practice Diagrams:** Be able to draw and explain supply-demand curves, shifts, and equilibrium changes
+3. **Learn Formulas:** Memorize elasticity formulas and understand how to apply them
+4. **Real-World Examples:** Connect concepts to current economic events
+5. **Solve Numerical Problems:** Practice calculating elasticity, costs, and equilibrium prices
+6. **Key Terms:** Create flashcards for important definitions
+7. **Past Papers:** Review previous exam questions to understand patterns"""
+
+DEMAND_SUPPLY_DIFFERENCE = """**Difference Between Demand and Supply:**
+
+**Demand:**
+- Consumer perspective
+- Inverse relationship with price (Law of Demand)
+- Shows buyer's willingness to purchase
+- Affected by income, preferences, prices of related goods
+
+**Supply:**
+- Producer perspective  
+- Direct relationship with price (Law of Supply)
+- Shows seller's willingness to sell
+- Affected by production costs, technology, number of sellers"""
+
+GREETING_RESPONSE = "Hello! I'm your AI Economics tutor. I'm here to help you understand economics concepts. Ask me anything about demand, supply, elasticity, consumer behavior, production, costs, or market structures!"
+
+FALLBACK_RESPONSE = """I'd be happy to help you with economics! I can explain concepts about:
+
+- **Demand and Supply:** Laws, factors, curves
+- **Market Equilibrium:** Price determination
+- **Elasticity:** Price, income, and cross elasticity
+- **Consumer Behavior:** Utility theory
+- **Production:** Factors, short run vs long run
+- **Costs:** Fixed, variable, marginal costs
+- **Market Structures:** Perfect competition, monopoly, oligopoly, monopolistic competition
+
+Please ask a specific question about any of these topics!"""
+
+
+def content_hash(knowledge_base):
+    """Stable sha256 of a knowledge base's content, used as its version"""
+    canonical = json.dumps(dict(knowledge_base), sort_keys=True, ensure_ascii=False,
+                           separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
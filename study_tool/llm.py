@@ -0,0 +1,524 @@
+"""Streaming answers from a language model server, with the rule-based engine
+as the fallback.
+
+The model is reached over an OpenAI-style ``/v1/chat/completions`` endpoint
+that streams server-sent events. All network work runs on one asyncio event
+loop in a background thread, so the Streamlit script thread only waits on a
+queue of tokens. The loop reuses keep-alive connections, gives every
+upstream request a deadline, caps how many run at once, and coalesces
+identical in-flight requests from different sessions into one upstream call
+whose tokens are fanned out to every waiting session.
+
+If the first token does not arrive within FIRST_TOKEN_TIMEOUT, or the
+server fails, the caller gets the rule-based answer instead.
+
+``python -m study_tool.llm serve`` starts a local stand-in server that
+speaks the same protocol and streams the rule-based answers word by word.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import queue
+import re
+import sys
+import threading
+import time
+from urllib.parse import urlsplit
+
+from .engine import get_default_engine
+from .metrics import get_metrics
+
+LLM_URL = os.environ.get("STUDY_TOOL_LLM_URL", "")
+LLM_MODEL = os.environ.get("STUDY_TOOL_LLM_MODEL", "tutor")
+LLM_API_KEY = os.environ.get("STUDY_TOOL_LLM_API_KEY", "")
+# Seconds allowed for one whole upstream request
+LLM_TIMEOUT = float(os.environ.get("STUDY_TOOL_LLM_TIMEOUT", "30"))
+# Upstream requests in flight at once, across all sessions
+LLM_CONCURRENCY = int(os.environ.get("STUDY_TOOL_LLM_CONCURRENCY", "8"))
+
+# Seconds a session waits for the first token before answering from the rules
+FIRST_TOKEN_TIMEOUT = 3.0
+CONNECT_TIMEOUT = 5.0
+# Idle keep-alive connections kept per server
+POOL_SIZE = 8
+
+SYSTEM_PROMPT = ("You are a friendly economics tutor for a first-year microeconomics course. "
+                 "Answer the student's question clearly and concisely, in markdown. "
+                 "Base your answer on this study guide excerpt:\n\n{}")
+
+STAND_IN_PORT = 8765
+COMPLETIONS_PATH = "/v1/chat/completions"
+
+# Marks the end of a stream in a session's token queue
+_DONE = object()
+
+
+class BackendError(Exception):
+    """The model server could not produce an answer"""
+
+
+def build_messages(question, context):
+    """Chat messages asking the model to answer question from the study guide context"""
+    return [{"role": "system", "content": SYSTEM_PROMPT.format(context)},
+            {"role": "user", "content": " ".join(question.split())}]
+
+
+# HTTP/1.1 plumbing, on the event loop
+
+def _parse_head(data):
+    """Split an HTTP message head into its first line and lower-cased headers"""
+    first_line, *lines = data.decode("latin-1").split("\r\n")
+    headers = {}
+    for line in lines:
+        name, _, value = line.partition(":")
+        if name:
+            headers[name.strip().lower()] = value.strip()
+    return first_line, headers
+
+
+async def _read(awaitable, deadline):
+    return await asyncio.wait_for(awaitable, max(0.0, deadline - asyncio.get_running_loop().time()))
+
+
+async def _iter_body(reader, headers, deadline):
+    """Yield the raw body of a response as it arrives"""
+    if headers.get("transfer-encoding", "").lower() == "chunked":
+        while True:
+            size_line = await _read(reader.readline(), deadline)
+            if not size_line:
+                raise BackendError("The model server closed the connection mid-response")
+            size = int(size_line.split(b";")[0], 16)
+            if size == 0:
+                # Skip any trailers up to the blank line that ends the body
+                while (await _read(reader.readline(), deadline)).strip():
+                    pass
+                return
+            chunk = await _read(reader.readexactly(size + 2), deadline)
+            yield chunk[:-2]
+    elif "content-length" in headers:
+        remaining = int(headers["content-length"])
+        while remaining:
+            chunk = await _read(reader.read(min(remaining, 65536)), deadline)
+            if not chunk:
+                raise BackendError("The model server closed the connection mid-response")
+            remaining -= len(chunk)
+            yield chunk
+    else:
+        while True:
+            chunk = await _read(reader.read(65536), deadline)
+            if not chunk:
+                return
+            yield chunk
+
+
+async def _iter_events(chunks):
+    """Yield the data of each server-sent event in a stream of body chunks"""
+    buffer = b""
+    async for chunk in chunks:
+        buffer = (buffer + chunk).replace(b"\r\n", b"\n")
+        *events, buffer = buffer.split(b"\n\n")
+        for event in events:
+            data = [line[5:].lstrip() for line in event.split(b"\n") if line.startswith(b"data:")]
+            if data:
+                yield b"\n".join(data).decode("utf-8")
+
+
+class ConnectionPool:
+    """Keep-alive connections to one server, reused across requests.
+
+    Only used from the event loop thread, so it needs no lock.
+    """
+
+    def __init__(self, host, port, use_ssl=False, size=POOL_SIZE):
+        self.host = host
+        self.port = port
+        self.use_ssl = use_ssl
+        self.size = size
+        self.opened = 0
+        self._idle = []
+
+    async def acquire(self, timeout=CONNECT_TIMEOUT):
+        """Return (reader, writer, reused), opening a connection if none is idle"""
+        while self._idle:
+            reader, writer = self._idle.pop()
+            if not writer.is_closing() and not reader.at_eof():
+                return reader, writer, True
+            writer.close()
+        reader, writer = await asyncio.wait_for(
+            asyncio.open_connection(self.host, self.port, ssl=self.use_ssl or None), timeout)
+        self.opened += 1
+        return reader, writer, False
+
+    def release(self, reader, writer, reusable):
+        if reusable and len(self._idle) < self.size and not writer.is_closing():
+            self._idle.append((reader, writer))
+        else:
+            writer.close()
+
+    def close(self):
+        for _, writer in self._idle:
+            writer.close()
+        self._idle.clear()
+
+
+class Backend:
+    """Streams answer tokens for chat messages; subclasses implement stream()"""
+
+    name = "base"
+
+    def stream(self, messages, deadline):
+        """Async iterator of text tokens; ``deadline`` is an event loop time"""
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class ChatCompletionsBackend(Backend):
+    """Any server with an OpenAI-style streaming chat completions endpoint"""
+
+    name = "chat-completions"
+
+    def __init__(self, url, model=LLM_MODEL, api_key=LLM_API_KEY, pool_size=POOL_SIZE):
+        parts = urlsplit(url)
+        if parts.scheme not in ("http", "https") or not parts.hostname:
+            raise ValueError("Model server URL must be http(s)://host[:port]/path, not {!r}".format(url))
+        self.url = url
+        self.model = model
+        self.api_key = api_key
+        self.host = parts.hostname
+        self.path = (parts.path or COMPLETIONS_PATH) + ("?" + parts.query if parts.query else "")
+        self.pool = ConnectionPool(parts.hostname, parts.port or (443 if parts.scheme == "https" else 80),
+                                   parts.scheme == "https", pool_size)
+
+    def _request(self, messages):
+        body = json.dumps({"model": self.model, "messages": messages, "stream": True}).encode("utf-8")
+        head = ["POST {} HTTP/1.1".format(self.path),
+                "Host: {}".format(self.host),
+                "Content-Type: application/json",
+                "Accept: text/event-stream",
+                "Content-Length: {}".format(len(body))]
+        if self.api_key:
+            head.append("Authorization: Bearer {}".format(self.api_key))
+        return ("\r\n".join(head) + "\r\n\r\n").encode("latin-1") + body
+
+    async def _send(self, request, deadline):
+        """Send the request; returns (reader, writer, status, headers)"""
+        loop = asyncio.get_running_loop()
+        for attempt in range(2):
+            reader, writer, reused = await self.pool.acquire(min(CONNECT_TIMEOUT, deadline - loop.time()))
+            try:
+                writer.write(request)
+                await writer.drain()
+                status_line, headers = _parse_head(await _read(reader.readuntil(b"\r\n\r\n"), deadline))
+                return reader, writer, int(status_line.split()[1]), headers
+            except (ConnectionError, asyncio.IncompleteReadError) as error:
+                writer.close()
+                if not (reused and attempt == 0):
+                    raise BackendError("Lost the connection to the model server: {}".format(error)) from error
+                # The server dropped an idle connection; retry once on a fresh one
+            except BaseException:
+                writer.close()
+                raise
+
+    async def stream(self, messages, deadline):
+        reader, writer, status, headers = await self._send(self._request(messages), deadline)
+        reusable = False
+        try:
+            if status != 200:
+                detail = b"".join([chunk async for chunk in _iter_body(reader, headers, deadline)])
+                raise BackendError("Model server answered {}: {}".format(
+                    status, detail[:200].decode("utf-8", "replace")))
+            async for event in _iter_events(_iter_body(reader, headers, deadline)):
+                if event == "[DONE]":
+                    # Keep reading to the end of the body so the connection can be reused
+                    continue
+                payload = json.loads(event)
+                if "error" in payload:
+                    raise BackendError("Model server error: {}".format(payload["error"]))
+                for choice in payload.get("choices") or ():
+                    token = (choice.get("delta") or {}).get("content")
+                    if token:
+                        yield token
+            reusable = headers.get("connection", "").lower() != "close" and (
+                "content-length" in headers or "transfer-encoding" in headers)
+        finally:
+            self.pool.release(reader, writer, reusable)
+
+    def close(self):
+        self.pool.close()
+
+
+class _Flight:
+    """One upstream request and the session queues waiting on its tokens"""
+
+    __slots__ = ("tokens", "subscribers", "task")
+
+    def __init__(self):
+        self.tokens = []
+        self.subscribers = []
+        self.task = None
+
+
+class AnswerStream:
+    """Iterator over one answer's tokens, ready for ``st.write_stream``.
+
+    Once iteration ends, ``text`` holds the whole answer and ``source`` says
+    where it came from: "llm", or "fallback" when the rules answered. A
+    stream that fails halfway stops early and its ``text`` is the rule-based
+    answer, so callers should display ``text`` rather than what was streamed.
+    """
+
+    def __init__(self, fallback, first_token_timeout, timeout, unsubscribe):
+        self.queue = queue.Queue()
+        self.fallback = fallback
+        self.first_token_timeout = first_token_timeout
+        self.timeout = timeout
+        self.text = ""
+        self.source = None
+        self.error = None
+        self._unsubscribe = unsubscribe
+
+    def __iter__(self):
+        metrics = get_metrics()
+        started = time.monotonic()
+        deadline = started + self.first_token_timeout
+        parts = []
+        finished = False
+        try:
+            while True:
+                try:
+                    item = self.queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    self.error = BackendError("No answer from the model server within {:.1f}s".format(
+                        deadline - started))
+                    break
+                if item is _DONE:
+                    finished = True
+                    break
+                if isinstance(item, Exception):
+                    self.error = item
+                    break
+                if not parts:
+                    metrics.observe("llm.first_token", time.monotonic() - started)
+                    # From the first token on, only the whole-request timeout applies
+                    deadline = started + self.timeout
+                parts.append(item)
+                yield item
+        finally:
+            if not finished:
+                # Stop fanning tokens out to a session that no longer listens
+                self._unsubscribe(self.queue)
+
+        if finished and parts:
+            self.source, self.text = "llm", "".join(parts)
+        else:
+            self.source, self.text = "fallback", self.fallback
+            if not parts:
+                yield self.fallback
+        metrics.count("llm_answers_total", source=self.source)
+
+
+class StreamingTutor:
+    """Streams model answers to script threads from one background event loop"""
+
+    def __init__(self, backend, concurrency=LLM_CONCURRENCY, timeout=LLM_TIMEOUT,
+                 first_token_timeout=FIRST_TOKEN_TIMEOUT):
+        self.backend = backend
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.first_token_timeout = first_token_timeout
+        # Updated on the loop thread only
+        self.upstream_calls = 0
+        self.coalesced = 0
+        self._flights = {}
+        self._semaphore = None
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="llm-backend", daemon=True)
+        self._thread.start()
+
+    def stream_answer(self, question, fallback, context=None):
+        """Start answering question and return its AnswerStream.
+
+        ``fallback`` is the rule-based answer, used when the model is slow or
+        down; it is also the study guide context unless ``context`` is given.
+        """
+        messages = build_messages(question, fallback if context is None else context)
+        key = json.dumps(messages, sort_keys=True)
+        stream = AnswerStream(fallback, self.first_token_timeout, self.timeout,
+                              lambda tokens: self._loop.call_soon_threadsafe(self._unsubscribe, key, tokens))
+        self._loop.call_soon_threadsafe(self._subscribe, key, messages, stream.queue)
+        return stream
+
+    def close(self):
+        """Stop the event loop and close pooled connections"""
+        self._loop.call_soon_threadsafe(self.backend.close)
+        # Finish closing streams that were abandoned halfway before the loop stops
+        asyncio.run_coroutine_threadsafe(self._loop.shutdown_asyncgens(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+
+    # On the event loop thread
+
+    def _subscribe(self, key, messages, tokens):
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = self._flights[key] = _Flight()
+            flight.task = self._loop.create_task(self._produce(key, flight, messages))
+        else:
+            # Same question and context already in flight: share its tokens
+            self.coalesced += 1
+            get_metrics().count("llm_requests_total", outcome="coalesced")
+            for token in flight.tokens:
+                tokens.put(token)
+        flight.subscribers.append(tokens)
+
+    def _unsubscribe(self, key, tokens):
+        flight = self._flights.get(key)
+        if flight is None or tokens not in flight.subscribers:
+            return
+        flight.subscribers.remove(tokens)
+        if not flight.subscribers:
+            # Nobody is waiting any more; later askers start a fresh request
+            del self._flights[key]
+            flight.task.cancel()
+
+    async def _produce(self, key, flight, messages):
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        end = _DONE
+        try:
+            async with self._semaphore:
+                self.upstream_calls += 1
+                metrics = get_metrics()
+                metrics.count("llm_requests_total", outcome="upstream")
+                # Flights interleave on this thread, so they are timed without a span
+                started = self._loop.time()
+                deadline = started + self.timeout
+                async for token in self.backend.stream(messages, deadline):
+                    flight.tokens.append(token)
+                    for subscriber in flight.subscribers:
+                        subscriber.put(token)
+                metrics.observe("llm.upstream", self._loop.time() - started)
+        except asyncio.CancelledError:
+            raise
+        except Exception as error:
+            # Whatever went wrong, the waiting sessions fall back to the rules
+            end = error if isinstance(error, BackendError) else BackendError(
+                "{}: {}".format(type(error).__name__, error))
+        finally:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+            for subscriber in flight.subscribers:
+                subscriber.put(end)
+
+
+def get_tutor(url=LLM_URL):
+    """StreamingTutor for the model server at url, or None when none is configured"""
+    if not url:
+        return None
+    return StreamingTutor(ChatCompletionsBackend(url))
+
+
+# Local stand-in server
+
+def _chunk(data):
+    return b"%x\r\n%s\r\n" % (len(data), data)
+
+
+class StandInServer:
+    """Chat completions server that streams the rule-based answers word by word.
+
+    Stands in for a real model server in development and benchmarks. ``GET
+    /stats`` reports how many completions it has served.
+    """
+
+    def __init__(self, host="127.0.0.1", port=STAND_IN_PORT, token_delay=0.02, first_token_delay=0.2):
+        self.host = host
+        self.port = port
+        self.token_delay = token_delay
+        self.first_token_delay = first_token_delay
+        self.requests = 0
+        self._server = None
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def serve_forever(self):
+        await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def _handle(self, reader, writer):
+        try:
+            while True:
+                try:
+                    request_line, headers = _parse_head(await reader.readuntil(b"\r\n\r\n"))
+                    body = await reader.readexactly(int(headers.get("content-length", 0)))
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    return
+                method, path = request_line.split()[:2]
+                if method == "POST" and path == COMPLETIONS_PATH:
+                    await self._complete(writer, json.loads(body or b"{}"))
+                elif method == "GET" and path == "/stats":
+                    self._respond(writer, 200, json.dumps({"requests": self.requests}))
+                else:
+                    self._respond(writer, 404, json.dumps({"error": "not found"}))
+                await writer.drain()
+                if headers.get("connection", "").lower() == "close":
+                    return
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    def _respond(writer, status, text):
+        body = text.encode("utf-8")
+        writer.write("HTTP/1.1 {} {}\r\nContent-Type: application/json\r\nContent-Length: {}\r\n\r\n".format(
+            status, "OK" if status == 200 else "Not Found", len(body)).encode("latin-1") + body)
+
+    async def _complete(self, writer, request):
+        self.requests += 1
+        messages = request.get("messages") or [{"content": ""}]
+        answer = get_default_engine().answer(messages[-1]["content"])
+        writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\n"
+                     b"Cache-Control: no-cache\r\nTransfer-Encoding: chunked\r\n\r\n")
+        await writer.drain()
+        await asyncio.sleep(self.first_token_delay)
+        for token in re.findall(r"\S+\s*|\s+", answer):
+            event = {"choices": [{"index": 0, "delta": {"content": token}}]}
+            writer.write(_chunk(b"data: " + json.dumps(event).encode("utf-8") + b"\n\n"))
+            await writer.drain()
+            if self.token_delay:
+                await asyncio.sleep(self.token_delay)
+        writer.write(_chunk(b"data: [DONE]\n\n") + b"0\r\n\r\n")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Local stand-in for a streaming model server")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    serve = commands.add_parser("serve", help="serve rule-based answers over the chat completions API")
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=STAND_IN_PORT)
+    serve.add_argument("--token-delay", type=float, default=0.02, help="seconds between tokens")
+    serve.add_argument("--first-token-delay", type=float, default=0.2,
+                       help="seconds before the first token, as a model's prompt processing")
+
+    args = parser.parse_args(argv)
+    server = StandInServer(args.host, args.port, args.token_delay, args.first_token_delay)
+    print("Stand-in model server on http://{}:{}{}".format(args.host, args.port, COMPLETIONS_PATH))
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,276 @@
+"""Lightweight timing spans, counters and their export.
+
+Spans time the hot paths (each tab, the answer engine, history rendering)
+into fixed-bucket histograms and keep the most recent samples for live
+percentiles. Counters track questions per topic. With STUDY_TOOL_METRICS_DIR
+set, a background thread periodically writes the metrics in Prometheus text
+format to ``metrics.prom`` and appends every finished span to
+``traces.jsonl`` in that directory.
+
+When metrics are disabled, ``span`` returns a shared no-op context manager
+and ``timed`` returns the function unchanged, so the instrumentation costs
+next to nothing.
+"""
+
+import atexit
+import json
+import os
+import threading
+import time
+from collections import deque
+from functools import wraps
+
+METRICS_DIR = os.environ.get("STUDY_TOOL_METRICS_DIR", "")
+METRICS_ENABLED = bool(METRICS_DIR) or os.environ.get("STUDY_TOOL_METRICS", "").lower() in ("1", "true", "yes")
+
+# Histogram bucket upper bounds, in seconds
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+# Samples kept per span for live percentiles
+RECENT_SAMPLES = 1024
+# Seconds between writes of the export files
+EXPORT_INTERVAL = 10.0
+
+PREFIX = "study_tool_"
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+class Histogram:
+    """Cumulative bucket counts plus a window of recent samples"""
+
+    __slots__ = ("counts", "total", "count", "recent")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.total = 0.0
+        self.count = 0
+        self.recent = deque(maxlen=RECENT_SAMPLES)
+
+    def observe(self, seconds):
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                break
+        else:
+            i = len(BUCKETS)
+        self.counts[i] += 1
+        self.total += seconds
+        self.count += 1
+        self.recent.append(seconds)
+
+
+class _NullSpan:
+    """Stands in for a span when metrics are disabled"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ("registry", "name", "attrs", "start", "wall_start", "parent")
+
+    def __init__(self, registry, name, attrs):
+        self.registry = registry
+        self.name = name
+        self.attrs = attrs
+
+    def __enter__(self):
+        stack = self.registry._stack()
+        self.parent = stack[-1] if stack else None
+        stack.append(self.name)
+        self.wall_start = time.time()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        seconds = time.perf_counter() - self.start
+        self.registry._stack().pop()
+        self.registry._finish(self, seconds, exc_type)
+        return False
+
+
+class MetricsRegistry:
+    """Span histograms and labelled counters, optionally exported to files"""
+
+    def __init__(self, enabled=METRICS_ENABLED, export_dir=METRICS_DIR, export_interval=EXPORT_INTERVAL):
+        self.enabled = enabled
+        self.export_dir = export_dir
+        self.histograms = {}
+        self.counters = {}
+        self._pending_traces = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._exporter = None
+        if enabled and export_dir:
+            os.makedirs(export_dir, exist_ok=True)
+            self._exporter = threading.Thread(target=self._export_loop, args=(export_interval,),
+                                              name="metrics-export", daemon=True)
+            self._exporter.start()
+            atexit.register(self.export)
+
+    def _stack(self):
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    # Recording
+
+    def span(self, name, **attrs):
+        """Context manager that times a block under ``name``"""
+        if not self.enabled:
+            return NULL_SPAN
+        return _Span(self, name, attrs)
+
+    def timed(self, name):
+        """Decorator form of ``span``; a no-op when metrics are disabled"""
+        def decorate(func):
+            if not self.enabled:
+                return func
+
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                with _Span(self, name, {}):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorate
+
+    def count(self, name, amount=1, **labels):
+        """Add to the counter ``name`` with the given labels"""
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def observe(self, name, seconds):
+        """Record one duration for ``name`` without a span"""
+        if not self.enabled:
+            return
+        with self._lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = Histogram()
+            histogram.observe(seconds)
+
+    def _finish(self, span, seconds, exc_type):
+        self.observe(span.name, seconds)
+        if not self.export_dir:
+            return
+        record = {"ts": round(span.wall_start, 6), "span": span.name, "ms": round(seconds * 1000, 3)}
+        if span.parent:
+            record["parent"] = span.parent
+        if exc_type is not None:
+            record["error"] = exc_type.__name__
+        record.update(span.attrs)
+        line = json.dumps(record, default=str)
+        with self._lock:
+            self._pending_traces.append(line)
+
+    # Reading
+
+    def span_summary(self):
+        """Return {span: {"count", "p50_ms", "p95_ms", "p99_ms"}} from recent samples"""
+        with self._lock:
+            samples = {name: (histogram.count, sorted(histogram.recent))
+                       for name, histogram in self.histograms.items()}
+        return {name: {"count": count,
+                       "p50_ms": percentile(recent, 0.50) * 1000,
+                       "p95_ms": percentile(recent, 0.95) * 1000,
+                       "p99_ms": percentile(recent, 0.99) * 1000}
+                for name, (count, recent) in sorted(samples.items())}
+
+    def counter_values(self, name):
+        """Return {labels tuple: value} for one counter"""
+        with self._lock:
+            return {labels: value for (counter, labels), value in self.counters.items() if counter == name}
+
+    def render_prometheus(self):
+        """Render every metric in the Prometheus text exposition format"""
+        with self._lock:
+            counters = sorted(self.counters.items())
+            histograms = sorted((name, list(h.counts), h.total, h.count)
+                                for name, h in self.histograms.items())
+
+        lines = []
+        declared = set()
+        for (name, labels), value in counters:
+            metric = PREFIX + name.replace(".", "_")
+            if metric not in declared:
+                declared.add(metric)
+                lines.append("# TYPE {} counter".format(metric))
+            lines.append("{}{} {}".format(metric, _format_labels(labels), value))
+
+        if histograms:
+            metric = PREFIX + "span_seconds"
+            lines.append("# TYPE {} histogram".format(metric))
+            for name, counts, total, count in histograms:
+                cumulative = 0
+                for bound, bucket_count in zip(BUCKETS + ("+Inf",), counts):
+                    cumulative += bucket_count
+                    labels = (("le", str(bound)), ("span", name))
+                    lines.append("{}_bucket{} {}".format(metric, _format_labels(labels), cumulative))
+                labels = _format_labels((("span", name),))
+                lines.append("{}_sum{} {:.6f}".format(metric, labels, total))
+                lines.append("{}_count{} {}".format(metric, labels, count))
+        return "\n".join(lines) + "\n"
+
+    # Export
+
+    def export(self):
+        """Write metrics.prom and append pending traces to traces.jsonl"""
+        if not self.export_dir:
+            return
+        with self._lock:
+            traces, self._pending_traces = self._pending_traces, []
+        if traces:
+            with open(os.path.join(self.export_dir, "traces.jsonl"), "a", encoding="utf-8") as trace_file:
+                trace_file.write("\n".join(traces) + "\n")
+
+        path = os.path.join(self.export_dir, "metrics.prom")
+        temporary = path + ".tmp"
+        with open(temporary, "w", encoding="utf-8") as metrics_file:
+            metrics_file.write(self.render_prometheus())
+        # Scrapers never see a half-written file
+        os.replace(temporary, path)
+
+    def _export_loop(self, interval):
+        while True:
+            time.sleep(interval)
+            try:
+                self.export()
+            except OSError:
+                # A full or missing disk must not take the app down; retry next time
+                pass
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join('{}="{}"'.format(key, str(value).replace("\\", "\\\\").replace('"', '\\"'))
+                          for key, value in labels) + "}"
+
+
+_metrics = None
+_metrics_lock = threading.Lock()
+
+
+def get_metrics():
+    """Return the process-wide registry, configured from the environment"""
+    global _metrics
+    if _metrics is None:
+        with _metrics_lock:
+            if _metrics is None:
+                _metrics = MetricsRegistry()
+    return _metrics
@@ -0,0 +1,241 @@
+"""Single-pass intent routing with an Aho-Corasick automaton.
+
+Every keyword phrase for every intent (the knowledge base topics, greetings
+and comparisons) is compiled into one automaton whose alphabet is words
+rather than characters: the question is split into words once and each
+word is one transition, so matches always start and end on word
+boundaries ("hi" never matches inside "which") and plurals share the
+singular's transitions. One pass reports every phrase found, with its
+position, so a question can be routed to several topics at once.
+
+Phrases come from the topic names, the names of a topic's sections (such
+as "fixed costs" or "perfect competition"), the terms of its "Term:
+meaning" lists and TOPIC_SYNONYMS, which all name a topic specifically,
+and from TOPIC_KEYWORDS, whose remaining entries ("market", "exam") are
+broad: they hint at a topic without naming it.
+"""
+
+import re
+from itertools import accumulate
+
+from .knowledge_base import TOPIC_KEYWORDS
+from .search import normalize_token
+
+GREETING = "greeting"
+COMPARISON = "comparison"
+
+INTENT_PHRASES = {
+    GREETING: ["hello", "hi", "hey", "good morning", "good afternoon", "good evening"],
+    COMPARISON: ["difference", "differ", "compare", "comparison", "vs", "versus",
+                 "distinguish", "contrast", "compared to", "compared with"],
+}
+
+# Other names students use for a topic
+TOPIC_SYNONYMS = {
+    "demand": ["quantity demanded", "demand curve", "buyers"],
+    "supply": ["quantity supplied", "supply curve", "sellers"],
+    "equilibrium": ["equilibrium price", "shortage", "surplus"],
+    "elasticity": ["responsiveness", "price sensitivity", "price sensitive"],
+    "consumer_behavior": ["diminishing marginal utility", "budget constraint"],
+    "production": ["factors of production", "production function"],
+    "costs": ["expenses", "average total cost", "economies of scale"],
+    "market_structures": ["monopolist", "perfectly competitive", "cartel", "market power"],
+}
+
+# Section names too generic to say anything about the topic
+GENERIC_FIELDS = {"definition", "law", "factors", "types", "concept", "changes", "formula",
+                  "categories", "concepts", "characteristics", "pricing"}
+
+WORD = re.compile(r"[a-z0-9]+")
+# Splits text into alternating separators and words
+WORD_SPLIT = re.compile(r"([a-z0-9]+)")
+# Acronyms of two letters ("AP", "MP") collide with everyday words, so only longer ones count
+TERM_NAME = re.compile(r"^([^:()]{2,60}?)\s*(?:\(([A-Za-z]{3,6})\))?\s*:")
+
+
+def phrase_words(phrase):
+    """Normalized words of a phrase, as the automaton sees them"""
+    return tuple(normalize_token(word) for word in WORD.findall(phrase.lower()))
+
+
+def knowledge_base_phrases(knowledge_base):
+    """{intent: [phrase, ...]} naming each topic, derived from its content"""
+    phrases = {}
+    for topic_key, topic in knowledge_base.items():
+        found = [topic_key.replace("_", " ")] + TOPIC_SYNONYMS.get(topic_key, [])
+        stack = [topic]
+        while stack:
+            value = stack.pop()
+            if isinstance(value, dict):
+                for field, item in value.items():
+                    if field not in GENERIC_FIELDS:
+                        found.append(field.replace("_", " "))
+                    stack.append(item)
+            elif isinstance(value, (list, tuple)):
+                for item in value:
+                    # "Price Elasticity of Demand (PED): ..." names a term and its acronym
+                    term = TERM_NAME.match(str(item))
+                    if term:
+                        found.extend(name for name in term.groups() if name)
+        phrases[topic_key] = found
+    return phrases
+
+
+def choose_matches(matches, ties=False):
+    """Leftmost-longest, non-overlapping matches, keeping same-span ties if asked"""
+    if len(matches) < 2:
+        return matches
+    chosen = []
+    start = end = -1
+    # Longest first at each start; specific before broad for the same words
+    for match in sorted(matches, key=lambda match: (match[1], -match[2], match[3])):
+        if match[1] >= end:
+            chosen.append(match)
+            start, end = match[1], match[2]
+        elif ties and match[1] == start and match[2] == end:
+            chosen.append(match)
+    return chosen
+
+
+class IntentRouter:
+    """Aho-Corasick automaton over words, mapping phrases to intents.
+
+    Failure links are folded into the transition table: ``delta[state]``
+    maps a word to the next state, and a word missing from it continues
+    from the root's transitions, so routing never walks a failure chain at
+    question time. The root's transitions are the bulk of the table and are
+    kept once rather than copied into every state.
+    """
+
+    def __init__(self, phrases, broad_phrases=None):
+        # Trie of phrases; state 0 is the root
+        goto = [{}]
+        outputs = [[]]
+        self.phrase_count = 0
+        # Specific phrases first, so a phrase listed as both stays specific
+        for broad, intent_phrases in ((False, phrases), (True, broad_phrases or {})):
+            for intent, texts in intent_phrases.items():
+                for phrase in texts:
+                    words = phrase_words(phrase)
+                    if not words:
+                        continue
+                    state = 0
+                    for word in words:
+                        following = goto[state].get(word)
+                        if following is None:
+                            following = goto[state][word] = len(goto)
+                            goto.append({})
+                            outputs.append([])
+                        state = following
+                    if not any(output[0] == intent for output in outputs[state]):
+                        outputs[state].append((intent, len(words), broad))
+                        self.phrase_count += 1
+
+        # Every spelling that normalizes to a word ("costs" for "cost") gets its
+        # transitions, so question words are looked up without normalizing them
+        spellings = {}
+        for transitions in goto:
+            for word in transitions:
+                if word not in spellings:
+                    spellings[word] = [word] + [spelling for spelling in (word + "s", word[:-1] + "ies")
+                                                if normalize_token(spelling) == word]
+
+        def transitions_of(state):
+            return {spelling: following for word, following in goto[state].items()
+                    for spelling in spellings[word]}
+
+        # Breadth-first failure links, folded straight into the transition table
+        root = transitions_of(0)
+        fail = [0] * len(goto)
+        delta = [root] + [None] * (len(goto) - 1)
+        queue = list(goto[0].values())
+        for state in queue:
+            # Every state first inherits its failure state's transitions, except the root's
+            delta[state] = dict(delta[fail[state]]) if fail[state] else {}
+            for word, following in goto[state].items():
+                fail[following] = delta[fail[state]].get(word) or root.get(word, 0)
+                queue.append(following)
+            delta[state].update(transitions_of(state))
+            # A match here also completes every phrase that ends at the failure state
+            outputs[state] = outputs[state] + outputs[fail[state]]
+        self.delta = delta
+        self.outputs = [tuple(output) for output in outputs]
+        self.state_count = len(goto)
+
+    @classmethod
+    def from_knowledge_base(cls, knowledge_base):
+        phrases = knowledge_base_phrases(knowledge_base)
+        phrases.update(INTENT_PHRASES)
+        return cls(phrases, TOPIC_KEYWORDS)
+
+    def to_state(self):
+        """JSON-ready data that from_state turns back into an equal router"""
+        return {"delta": self.delta, "outputs": self.outputs, "phrase_count": self.phrase_count}
+
+    @classmethod
+    def from_state(cls, state):
+        # The folded transition table is restored as is rather than recompiled
+        router = cls.__new__(cls)
+        router.delta = state["delta"]
+        router.outputs = [tuple(tuple(output) for output in outputs) for outputs in state["outputs"]]
+        router.phrase_count = state["phrase_count"]
+        router.state_count = len(router.delta)
+        return router
+
+    def _phrase_ends(self, words):
+        """(position, state) for every word that ends at least one phrase"""
+        delta = self.delta
+        root = delta[0].get
+        outputs = self.outputs
+        state = 0
+        found = []
+        for position, word in enumerate(words):
+            state = delta[state].get(word) or root(word, 0)
+            if outputs[state]:
+                found.append((position, state))
+        return found
+
+    def scan_words(self, words):
+        """Every phrase match in a list of lowercase words, as (intent, start,
+        end, broad) with start and end as word positions
+        """
+        outputs = self.outputs
+        return [(intent, position - length + 1, position + 1, broad)
+                for position, state in self._phrase_ends(words) for intent, length, broad in outputs[state]]
+
+    def scan(self, question):
+        """Every phrase match as (intent, start, end, broad), in one pass.
+
+        start and end are character offsets. Matches may overlap: "consumer
+        equilibrium" reports both the consumer behavior and the equilibrium
+        phrases it contains.
+        """
+        parts = WORD_SPLIT.split(question.lower())
+        found = self._phrase_ends(parts[1::2])
+        if not found:
+            return []
+        # Word n starts where part 2n ends and ends where part 2n + 1 ends;
+        # offsets are summed only for questions that matched something
+        outputs = self.outputs
+        ends = list(accumulate(map(len, parts)))
+        return [(intent, ends[2 * (position - length + 1)], ends[2 * position + 1], broad)
+                for position, state in found for intent, length, broad in outputs[state]]
+
+    def route(self, question, ties=False):
+        """Leftmost-longest, non-overlapping matches as (intent, start, end, broad);
+        ties=True also keeps other intents matched on exactly the same words
+        """
+        return choose_matches(self.scan(question), ties)
+
+    def route_words(self, words, ties=False):
+        """route() for a question already split into lowercase words; start and
+        end are word positions
+        """
+        return choose_matches(self.scan_words(words), ties)
+
+    def intents(self, question, broad=True):
+        """Intents in the question, in order of first mention; broad=False
+        leaves out those only hinted at by broad keywords
+        """
+        return list(dict.fromkeys(intent for intent, _, _, is_broad in self.route(question)
+                                  if broad or not is_broad))
@@ -0,0 +1,173 @@
+"""Tokenizer and BM25 inverted index over the knowledge base"""
+
+import math
+import re
+
+from .knowledge_base import TOPIC_KEYWORDS
+
+STOP_WORDS = {
+    "a", "an", "and", "are", "about", "can", "do", "does", "explain", "for",
+    "give", "how", "i", "in", "is", "it", "me", "of", "on", "or", "please",
+    "tell", "the", "this", "to", "what", "when", "which", "why", "with", "you",
+}
+
+# Matches on a topic's keywords count more than matches in its body text
+FIELD_WEIGHTS = {"keywords": 3.0, "body": 1.0}
+
+# BM25 term frequency saturation and document length normalization
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# A word as every index reads it, after lowercasing
+WORD = re.compile(r"[a-z0-9]+")
+
+
+def normalize_token(word):
+    """Reduce simple plurals so 'costs' and 'cost' share an index entry"""
+    if len(word) > 4 and word.endswith("ies"):
+        return word[:-3] + "y"
+    if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+        return word[:-1]
+    return word
+
+
+def tokenize(text):
+    """Split text into lowercase, normalized index terms"""
+    words = WORD.findall(text.lower())
+    return [normalize_token(word) for word in words if word not in STOP_WORDS]
+
+
+def iter_text(value):
+    """Yield every string stored in a (possibly nested) knowledge base entry"""
+    if isinstance(value, str):
+        yield value
+    elif isinstance(value, dict):
+        for key, item in value.items():
+            yield key.replace("_", " ")
+            yield from iter_text(item)
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            yield from iter_text(item)
+
+
+class KnowledgeIndex:
+    """Inverted index over the knowledge base ranked with per-field BM25"""
+
+    def __init__(self, k1=BM25_K1, b=BM25_B):
+        self.k1 = k1
+        self.b = b
+        self.postings = {field: {} for field in FIELD_WEIGHTS}
+        self.field_lengths = {field: {} for field in FIELD_WEIGHTS}
+        self.total_lengths = {field: 0 for field in FIELD_WEIGHTS}
+        self.doc_ids = set()
+        # Spelling -> (term, scores, keyword doc ids), built on the first search
+        self._scored = None
+
+    def add_document(self, doc_id, keywords, body):
+        """Index one document from its keyword phrases and body text"""
+        self.doc_ids.add(doc_id)
+        self._scored = None
+        for field, texts in (("keywords", keywords), ("body", body)):
+            counts = {}
+            for text in texts:
+                for term in tokenize(text):
+                    counts[term] = counts.get(term, 0) + 1
+
+            self.field_lengths[field][doc_id] = sum(counts.values())
+            self.total_lengths[field] += sum(counts.values())
+            postings = self.postings[field]
+            for term, count in counts.items():
+                postings.setdefault(term, []).append((doc_id, count))
+
+    def to_state(self):
+        """JSON-ready data that from_state turns back into an equal index"""
+        return {"k1": self.k1, "b": self.b, "postings": self.postings,
+                "field_lengths": self.field_lengths, "total_lengths": self.total_lengths,
+                "doc_ids": sorted(self.doc_ids)}
+
+    @classmethod
+    def from_state(cls, state):
+        index = cls(state["k1"], state["b"])
+        # Postings come back as [doc_id, count] lists, which search unpacks alike
+        index.postings = state["postings"]
+        index.field_lengths = state["field_lengths"]
+        index.total_lengths = state["total_lengths"]
+        index.doc_ids = set(state["doc_ids"])
+        return index
+
+    def _score_terms(self):
+        """Each term's BM25 score per document, summed over the fields.
+
+        Nothing in a score depends on the question, so it is computed once.
+        The table is keyed by every spelling that tokenize() reduces to the
+        term ("costs" and "cost"), so questions are looked up word by word
+        without normalizing them.
+        """
+        doc_count = len(self.doc_ids)
+        if not doc_count:
+            return {}
+        scored = {}
+        for field, weight in FIELD_WEIGHTS.items():
+            lengths = self.field_lengths[field]
+            avg_length = self.total_lengths[field] / doc_count or 1.0
+            for term, postings in self.postings[field].items():
+                scores, keyword_docs = scored.setdefault(term, ({}, set()))
+                if field == "keywords":
+                    keyword_docs.update(doc_id for doc_id, _ in postings)
+                idf = math.log(1 + (doc_count - len(postings) + 0.5) / (len(postings) + 0.5))
+                for doc_id, tf in postings:
+                    norm = self.k1 * (1 - self.b + self.b * lengths[doc_id] / avg_length)
+                    scores[doc_id] = scores.get(doc_id, 0.0) + weight * idf * tf * (self.k1 + 1) / (tf + norm)
+
+        table = {}
+        for term, (scores, keyword_docs) in scored.items():
+            entry = (term, tuple(scores.items()), frozenset(keyword_docs))
+            for spelling in (term, term + "s", term[:-1] + "ies"):
+                if spelling not in STOP_WORDS and normalize_token(spelling) == term:
+                    table[spelling] = entry
+        return table
+
+    def search(self, question, top_k=3, min_body_score=0.0):
+        """Return up to top_k (doc_id, score) pairs, best match first.
+
+        Documents that match only in their body text are left out when they
+        score below ``min_body_score``.
+        """
+        return self.search_words(WORD.findall(question.lower()), top_k, min_body_score)
+
+    def search_words(self, words, top_k=3, min_body_score=0.0):
+        """search() for a question already split into lowercase words"""
+        scored = self._scored
+        if scored is None:
+            scored = self._scored = self._score_terms()
+        # Term -> its entry; two spellings of one term count once
+        entries = {}
+        for word in words:
+            entry = scored.get(word)
+            if entry is not None:
+                entries[entry[0]] = entry
+        if not entries:
+            return []
+
+        scores = {}
+        keyword_hits = set()
+        for _, term_scores, keyword_docs in entries.values():
+            keyword_hits |= keyword_docs
+            for doc_id, score in term_scores:
+                scores[doc_id] = scores.get(doc_id, 0.0) + score
+
+        ranked = sorted(((doc_id, score) for doc_id, score in scores.items()
+                         if score >= min_body_score or doc_id in keyword_hits),
+                        key=lambda item: item[1], reverse=True)
+        return ranked[:top_k]
+
+
+def build_knowledge_index(knowledge_base):
+    """Build the search index once for every knowledge base topic"""
+    index = KnowledgeIndex()
+    for topic_key, topic in knowledge_base.items():
+        keywords = [topic_key.replace("_", " ")] + TOPIC_KEYWORDS.get(topic_key, [])
+        index.add_document(topic_key, keywords, list(iter_text(topic)))
+    # The tips mention every topic, so only their keywords are indexed
+    index.add_document("exam_tips", TOPIC_KEYWORDS["exam_tips"], [])
+    return index
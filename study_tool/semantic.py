@@ -0,0 +1,239 @@
+"""Offline semantic search with hashed character n-gram embeddings.
+
+Texts are embedded by hashing their character n-grams and words into a
+fixed number of dimensions, so no model download is needed and similar
+spellings ("price", "pricier") land close together. All passage vectors
+live in one contiguous float32 matrix and a query is scored against every
+passage with a single matrix-vector product.
+"""
+
+import functools
+import math
+import zlib
+
+import numpy as np
+
+from .search import STOP_WORDS, WORD, iter_text
+
+DEFAULT_DIMENSIONS = 128
+# Character n-grams hashed for every word, and the weight of the whole word
+NGRAM_SIZES = (3, 4, 5)
+WORD_WEIGHT = 2.0
+# Word vectors kept for reuse; students and passages repeat the same words
+WORD_CACHE_SIZE = 4096
+# Indexes up to this many passages cache each word's scores against all of them;
+# past it the cached rows cost too much memory and a question's new words one
+# matrix product each, so questions are embedded and scored in one product
+MAX_WORD_SCORE_PASSAGES = 256
+
+
+class HashedNgramEmbedder:
+    """Embeds text as L2-normalized hashed character n-gram counts"""
+
+    def __init__(self, dimensions=DEFAULT_DIMENSIONS, ngram_sizes=NGRAM_SIZES, word_weight=WORD_WEIGHT):
+        self.dimensions = dimensions
+        self.ngram_sizes = ngram_sizes
+        self.word_weight = word_weight
+        # A text's embedding is the sum of its words' vectors, so each word is hashed once
+        self.word_vector = functools.lru_cache(maxsize=WORD_CACHE_SIZE)(self._word_vector)
+
+    def _word_features(self, word):
+        yield word, self.word_weight
+        padded = " " + word + " "
+        for size in self.ngram_sizes:
+            for start in range(len(padded) - size + 1):
+                yield padded[start:start + size], 1.0
+
+    def _word_vector(self, word):
+        """Unnormalized embedding of one word; callers must not modify it"""
+        indices, weights = [], []
+        for feature, weight in self._word_features(word):
+            hashed = zlib.crc32(feature.encode("utf-8"))
+            indices.append(hashed % self.dimensions)
+            # The top bit picks a sign so unrelated collisions tend to cancel
+            weights.append(-weight if hashed & 0x80000000 else weight)
+        return np.bincount(indices, weights, minlength=self.dimensions).astype(np.float32)
+
+    def content_words(self, text):
+        """The words of text that contribute to its embedding"""
+        return [word for word in WORD.findall(text.lower()) if word not in STOP_WORDS]
+
+    def embed_into(self, text, out):
+        """Write the embedding of text into the 1-D float32 array out"""
+        out[:] = 0.0
+        for word in self.content_words(text):
+            out += self.word_vector(word)
+        norm = math.sqrt(out @ out)
+        if norm:
+            out /= norm
+        return out
+
+    def embed(self, text):
+        return self.embed_into(text, np.zeros(self.dimensions, dtype=np.float32))
+
+    def embed_batch(self, texts):
+        """Embed many texts into one (len(texts), dimensions) matrix"""
+        matrix = np.zeros((len(texts), self.dimensions), dtype=np.float32)
+        for row, text in zip(matrix, texts):
+            self.embed_into(text, row)
+        return matrix
+
+
+class SemanticIndex:
+    """Passage embeddings stored contiguously, scored with one matrix product"""
+
+    def __init__(self, embedder=None, capacity=1024):
+        self.embedder = embedder or HashedNgramEmbedder()
+        self.labels = []
+        self.texts = []
+        self._matrix = np.zeros((capacity, self.embedder.dimensions), dtype=np.float32)
+        # A question scores as the sum of its words' scores over its norm, so in
+        # small indexes each word is multiplied against the matrix only once
+        self.word_scores = functools.lru_cache(maxsize=WORD_CACHE_SIZE)(self._word_scores)
+
+    def __len__(self):
+        return len(self.labels)
+
+    @property
+    def matrix(self):
+        """View of the filled rows of the embedding matrix"""
+        return self._matrix[:len(self.labels)]
+
+    def add(self, labels, texts):
+        """Embed and append passages, each tagged with a label"""
+        count = len(self.labels)
+        needed = count + len(texts)
+        if needed > len(self._matrix):
+            # Grow geometrically so appends stay amortized O(1)
+            grown = np.zeros((max(needed, 2 * len(self._matrix)), self.embedder.dimensions),
+                             dtype=np.float32)
+            grown[:count] = self._matrix[:count]
+            self._matrix = grown
+        for row, text in zip(range(count, needed), texts):
+            self.embedder.embed_into(text, self._matrix[row])
+        self.labels.extend(labels)
+        self.texts.extend(texts)
+        self.word_scores.cache_clear()
+
+    def _word_scores(self, word):
+        """A word's vector followed by its unnormalized score against every passage"""
+        vector = self.embedder.word_vector(word)
+        return np.concatenate([vector, self.matrix @ vector])
+
+    def score_words(self, words):
+        """Return (unnormalized scores against every passage, question vector norm)
+        for a question already split into lowercase words
+        """
+        if len(self.labels) > MAX_WORD_SCORE_PASSAGES:
+            vector = np.zeros(self.embedder.dimensions, dtype=np.float32)
+            for word in words:
+                if word not in STOP_WORDS:
+                    vector += self.embedder.word_vector(word)
+            return self.matrix @ vector, math.sqrt(vector @ vector)
+
+        total = None
+        copied = False
+        for word in words:
+            if word in STOP_WORDS:
+                continue
+            word_scores = self.word_scores(word)
+            if total is None:
+                total = word_scores
+            elif copied:
+                total += word_scores
+            else:
+                # Copied once, on the first sum: cached word scores must not be modified
+                total = total + word_scores
+                copied = True
+        if total is None:
+            return np.zeros(len(self.labels), dtype=np.float32), 0.0
+        vector = total[:self.embedder.dimensions]
+        return total[self.embedder.dimensions:], math.sqrt(vector @ vector)
+
+    def to_state(self):
+        """Return (JSON-ready data, embedding matrix) for from_state"""
+        embedder = self.embedder
+        return {"dimensions": embedder.dimensions, "ngram_sizes": list(embedder.ngram_sizes),
+                "word_weight": embedder.word_weight, "labels": self.labels, "texts": self.texts}, self.matrix
+
+    @classmethod
+    def from_state(cls, state, matrix):
+        embedder = HashedNgramEmbedder(state["dimensions"], tuple(state["ngram_sizes"]), state["word_weight"])
+        index = cls(embedder, capacity=0)
+        index.labels = state["labels"]
+        index.texts = state["texts"]
+        index._matrix = np.ascontiguousarray(matrix, dtype=np.float32).reshape(
+            len(index.labels), embedder.dimensions)
+        return index
+
+    def _top_k(self, scores, top_k):
+        """Indices of the top_k scores along the last axis, best first"""
+        top_k = min(top_k, scores.shape[-1])
+        if top_k == scores.shape[-1]:
+            candidates = np.broadcast_to(np.arange(top_k), scores.shape)
+        else:
+            candidates = np.argpartition(-scores, top_k - 1, axis=-1)[..., :top_k]
+        order = np.argsort(-np.take_along_axis(scores, candidates, axis=-1), axis=-1)
+        return np.take_along_axis(candidates, order, axis=-1)
+
+    def search(self, question, top_k=5, min_score=None):
+        """Return up to top_k (label, text, score) passages for one question,
+        leaving out any scoring below min_score
+        """
+        return self.search_words(WORD.findall(question.lower()), top_k, min_score)
+
+    def search_words(self, words, top_k=5, min_score=None):
+        """search() for a question already split into lowercase words"""
+        if not self.labels:
+            return []
+        scores, norm = self.score_words(words)
+        if min_score is not None and not scores[scores.argmax()] >= min_score * norm:
+            # Most off-topic questions stop here, before any normalizing or ranking
+            return []
+        if norm:
+            scores = scores / np.float32(norm)
+        if min_score is not None:
+            top = np.flatnonzero(scores >= min_score)
+            if not len(top):
+                return []
+        else:
+            top = np.arange(len(scores))
+        if top_k < len(top):
+            top = top[np.argpartition(scores[top], len(top) - top_k)[len(top) - top_k:]]
+        # One query needs no batch bookkeeping, so this skips _top_k
+        top = top[np.argsort(-scores[top])]
+        return [(self.labels[i], self.texts[i], float(scores[i])) for i in top.tolist()]
+
+    def search_topics(self, words, top_k=2, passages=10, min_score=None):
+        """Topics of the best ``passages`` matches as (topic, best score) pairs,
+        for a question already split into lowercase words
+        """
+        return rank_topics(self.search_words(words, passages, min_score), top_k)
+
+    def search_batch(self, questions, top_k=5):
+        """Score many questions in one matrix-matrix product"""
+        if not self.labels:
+            return [[] for _ in questions]
+        scores = self.embedder.embed_batch(questions) @ self.matrix.T
+        top = self._top_k(scores, top_k)
+        return [[(self.labels[i], self.texts[i], float(row_scores[i])) for i in row_top]
+                for row_scores, row_top in zip(scores, top)]
+
+
+def build_semantic_index(knowledge_base, topic_keywords=None, embedder=None):
+    """Index every text field of every topic as a passage labelled by topic"""
+    index = SemanticIndex(embedder)
+    for topic_key, topic in knowledge_base.items():
+        texts = [text for text in iter_text(topic) if len(text.split()) > 2]
+        texts.extend((topic_keywords or {}).get(topic_key, []))
+        index.add([topic_key] * len(texts), texts)
+    return index
+
+
+def rank_topics(passages, top_k):
+    """Collapse passage matches into (topic, best score) pairs, best first"""
+    best = {}
+    for label, _, score in passages:
+        if score > best.get(label, float("-inf")):
+            best[label] = score
+    return sorted(best.items(), key=lambda item: item[1], reverse=True)[:top_k]
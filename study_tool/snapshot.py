@@ -0,0 +1,240 @@
+"""Snapshots of the answer engine's derived structures for fast cold starts.
+
+Building an engine means tokenizing and indexing every topic, generating
+the spelling deletion index and embedding every passage, which each new
+server process or replica would otherwise repeat before its first answer.
+``build`` writes all of it to one file, keyed by a hash of the knowledge
+base content and everything else the structures are derived from. At
+startup ``load_engine`` reads the file in one go and uses it when the key
+matches, and rebuilds in memory when it does not.
+
+File layout (all integers little-endian):
+
+    header   magic b"ESN1", format version (u16), sha256 content hash of the
+             knowledge base (32 bytes), sha256 build key (32 bytes),
+             state length (u32), embedding rows (u32), dimensions (u32)
+    state    UTF-8 JSON: search mode, rendered answers, BM25 index, spelling
+             index and intent router
+    matrix   float32 passage embeddings, rows * dimensions, if any
+
+The state is JSON rather than pickle, so loading a snapshot never runs code.
+
+Usage:
+    python -m study_tool.snapshot build [--output path]
+    python -m study_tool.snapshot check [path]
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import struct
+import sys
+import tempfile
+import time
+
+from . import search, spelling
+from .engine import AnswerEngine, resolve_search_mode
+from .kbfile import DEFAULT_KB_PATH, open_knowledge_store
+from .knowledge_base import EXAM_TIPS, TOPIC_KEYWORDS, TOPIC_PARAPHRASES, content_hash
+from .metrics import get_metrics
+from .router import GENERIC_FIELDS, INTENT_PHRASES, TOPIC_SYNONYMS, IntentRouter
+from .search import KnowledgeIndex
+from .spelling import SpellingIndex
+
+MAGIC = b"ESN1"
+# Bump whenever a derived structure or the way it is built changes
+FORMAT_VERSION = 5
+HEADER = struct.Struct("<4sH32s32sIII")
+
+DEFAULT_SNAPSHOT_PATH = os.environ.get(
+    "STUDY_TOOL_SNAPSHOT",
+    os.path.join(os.path.dirname(DEFAULT_KB_PATH), "engine_snapshot.bin"))
+
+# Answered once after loading to measure the time to a first answer
+WARMUP_QUESTION = "What is the law of demand?"
+
+
+class SnapshotFormatError(ValueError):
+    """Raised when a file is not an engine snapshot"""
+
+
+def _semantic_settings():
+    """Embedder settings, or None when semantic search is unavailable"""
+    from . import engine
+
+    try:
+        from . import semantic
+    except ImportError:
+        return None
+    return [engine.SEMANTIC_DIMENSIONS, semantic.NGRAM_SIZES, semantic.WORD_WEIGHT,
+            semantic.MAX_WORD_SCORE_PASSAGES]
+
+
+def build_key(version, search_mode):
+    """Hash of everything the derived structures depend on besides the code"""
+    inputs = json.dumps([FORMAT_VERSION, version, search_mode,
+                         TOPIC_KEYWORDS, TOPIC_PARAPHRASES, EXAM_TIPS,
+                         TOPIC_SYNONYMS, INTENT_PHRASES, sorted(GENERIC_FIELDS),
+                         # Tokenizer and BM25 index
+                         sorted(search.STOP_WORDS), search.FIELD_WEIGHTS, search.BM25_K1, search.BM25_B,
+                         # Spelling deletion index
+                         spelling.MIN_WORD_LENGTH, spelling.MIN_TWO_EDIT_LENGTH, spelling.MAX_DISTANCE,
+                         sorted(spelling.COMMON_WORDS),
+                         _semantic_settings()],
+                        sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(inputs.encode("utf-8")).digest()
+
+
+def write_snapshot(engine, path=DEFAULT_SNAPSHOT_PATH, search_mode=None):
+    """Write engine's derived structures to path, atomically.
+
+    ``search_mode`` is the mode the engine was asked for, which can differ
+    from ``engine.search_mode`` when NumPy is missing.
+    """
+    state = {"search_mode": engine.search_mode,
+             "answers": engine.answers,
+             "index": engine.index.to_state(),
+             "spelling": engine.spelling.to_state(),
+             "router": engine.router.to_state()}
+    rows = dimensions = 0
+    matrix = b""
+    if engine.semantic is not None:
+        state["semantic"], embeddings = engine.semantic.to_state()
+        rows, dimensions = embeddings.shape
+        matrix = embeddings.tobytes()
+
+    state_bytes = json.dumps(state, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    header = HEADER.pack(MAGIC, FORMAT_VERSION, bytes.fromhex(engine.version),
+                         build_key(engine.version, search_mode or engine.search_mode),
+                         len(state_bytes), rows, dimensions)
+    directory = os.path.dirname(os.path.abspath(path))
+    handle, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(handle, "wb") as snapshot:
+            snapshot.write(header + state_bytes + matrix)
+        # Processes starting meanwhile read either the old file or the new one
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+    return path
+
+
+def read_header(data):
+    """Return (content hash hex, build key, state length, rows, dimensions)"""
+    if len(data) < HEADER.size:
+        raise SnapshotFormatError("File is too short to be an engine snapshot")
+    magic, version, digest, key, state_length, rows, dimensions = HEADER.unpack_from(data, 0)
+    if magic != MAGIC or version != FORMAT_VERSION:
+        raise SnapshotFormatError("Not a version {} engine snapshot".format(FORMAT_VERSION))
+    return digest.hex(), key, state_length, rows, dimensions
+
+
+def read_snapshot(path, knowledge_base, version, search_mode, cache_size=1024):
+    """Return the engine stored at path, or None when it was built from other inputs"""
+    with open(path, "rb") as snapshot:
+        data = snapshot.read()
+    _, key, state_length, rows, dimensions = read_header(data)
+    if key != build_key(version, search_mode):
+        return None
+
+    start = HEADER.size
+    state = json.loads(data[start:start + state_length].decode("utf-8"))
+    semantic = None
+    if "semantic" in state:
+        import numpy as np
+
+        from .semantic import SemanticIndex
+
+        matrix = np.frombuffer(data, dtype=np.float32, count=rows * dimensions, offset=start + state_length)
+        semantic = SemanticIndex.from_state(state["semantic"], matrix.reshape(rows, dimensions))
+    return AnswerEngine.from_parts(knowledge_base, version, state["search_mode"],
+                                   KnowledgeIndex.from_state(state["index"]), state["answers"],
+                                   SpellingIndex.from_state(state["spelling"]), semantic, cache_size,
+                                   IntentRouter.from_state(state["router"]))
+
+
+def load_engine(knowledge_base, version=None, path=DEFAULT_SNAPSHOT_PATH, search_mode=None, cache_size=1024):
+    """Engine for knowledge_base from the snapshot at path, or built from scratch.
+
+    A ``path`` of None always rebuilds. ``engine.startup`` records where the
+    engine came from ("snapshot" or "built"), the load time and the time
+    from the start of loading to a first answer.
+    """
+    metrics = get_metrics()
+    started = time.perf_counter()
+    version = version or content_hash(knowledge_base)
+    search_mode = resolve_search_mode(search_mode)
+
+    engine, source, reason = None, "snapshot", None
+    if path is not None:
+        try:
+            engine = read_snapshot(path, knowledge_base, version, search_mode, cache_size)
+            if engine is None:
+                reason = "snapshot was built from another knowledge base, search mode or index settings"
+        except FileNotFoundError:
+            reason = "no snapshot"
+        except (ValueError, KeyError, ImportError) as error:
+            # A damaged or foreign file only costs the rebuild it was meant to avoid
+            reason = "unreadable snapshot: {}".format(error)
+    if engine is None:
+        engine = AnswerEngine(knowledge_base, cache_size, version, search_mode)
+        source = "built"
+    loaded = time.perf_counter()
+
+    # Uncached, so the warm-up leaves the answer cache and its counters alone
+    engine.compose_answer(WARMUP_QUESTION)
+    answered = time.perf_counter()
+
+    engine.startup = {"source": source, "reason": reason,
+                      "load_ms": (loaded - started) * 1000,
+                      "first_answer_ms": (answered - started) * 1000}
+    metrics.observe("engine.load", loaded - started)
+    metrics.observe("engine.time_to_first_answer", answered - started)
+    return engine
+
+
+def format_startup(startup):
+    """One-line summary of an engine.startup report"""
+    line = "{source} in {load_ms:.1f} ms, first answer after {first_answer_ms:.1f} ms".format(**startup)
+    return line + (" ({})".format(startup["reason"]) if startup.get("reason") else "")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build or check the answer engine snapshot")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    build = commands.add_parser("build", help="snapshot the engine for the current knowledge base")
+    build.add_argument("--output", default=DEFAULT_SNAPSHOT_PATH)
+    build.add_argument("--search-mode", help="default: $STUDY_TOOL_SEARCH or hybrid")
+
+    check = commands.add_parser("check", help="compare a cold start from the snapshot with a rebuild")
+    check.add_argument("path", nargs="?", default=DEFAULT_SNAPSHOT_PATH)
+    check.add_argument("--search-mode", help="default: $STUDY_TOOL_SEARCH or hybrid")
+
+    args = parser.parse_args(argv)
+    # The compiled knowledge base file when there is one, as the app serves
+    knowledge_base, version = open_knowledge_store().snapshot()
+    search_mode = resolve_search_mode(args.search_mode)
+    if args.command == "build":
+        engine = AnswerEngine(knowledge_base, version=version, search_mode=search_mode)
+        path = write_snapshot(engine, args.output, search_mode)
+        print("Snapshot of {} topics (version {}) written to {} ({} bytes)".format(
+            len(knowledge_base), version[:12], path, os.path.getsize(path)))
+        return 0
+
+    try:
+        with open(args.path, "rb") as snapshot:
+            digest = read_header(snapshot.read(HEADER.size))[0]
+        print("{} (knowledge base version {})".format(args.path, digest[:12]))
+    except (OSError, SnapshotFormatError) as error:
+        print("{}: {}".format(args.path, error))
+    print("Current knowledge base version {}".format(version[:12]))
+    print("  snapshot: " + format_startup(load_engine(knowledge_base, version, args.path, search_mode).startup))
+    print("  rebuild:  " + format_startup(load_engine(knowledge_base, version, None, search_mode).startup))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
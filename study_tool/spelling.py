@@ -0,0 +1,164 @@
+"""Typo-tolerant term lookup backed by a precomputed deletion index.
+
+Following the SymSpell approach, every vocabulary term is stored under all
+the strings obtained by deleting up to ``max_distance`` characters from it.
+A misspelled word is then corrected by generating its own deletions and
+looking them up, so only a handful of candidates ever need an exact
+edit-distance check.
+"""
+
+import functools
+
+from .search import STOP_WORDS
+
+# Words shorter than this are never corrected; too many short words are valid
+MIN_WORD_LENGTH = 4
+# Words this long may be two edits from a term; shorter ones have too many real neighbours
+MIN_TWO_EDIT_LENGTH = 11
+# Edits the deletion index covers
+MAX_DISTANCE = 2
+
+# Everyday words within reach of a keyword ("most" is one edit from "cost"),
+# which are valid and so never corrected
+COMMON_WORDS = {
+    "most", "post", "host", "lost", "cast", "coat", "coast", "cosy", "colt", "coot",
+    "remand", "marker", "marked", "supple", "plastic", "plasticity", "produce",
+    "consume", "consumed", "consumes", "futility", "cleaning", "behaviour",
+    "stricture", "structured", "prepared", "prepares", "preparer", "reparation",
+    "competitive", "composition",
+    # Words students frame questions with
+    "define", "list", "simple", "main", "behind", "work", "real", "important",
+    "example", "word", "mean", "meaning", "between", "affect", "happen", "matter",
+    "help", "understand", "need", "know",
+}
+
+
+def deletions(word, max_distance):
+    """All strings reachable from word by deleting up to max_distance characters"""
+    results = {word}
+    frontier = {word}
+    for _ in range(max_distance):
+        next_frontier = set()
+        for item in frontier:
+            if len(item) <= 1:
+                continue
+            for i in range(len(item)):
+                next_frontier.add(item[:i] + item[i + 1:])
+        results |= next_frontier
+        frontier = next_frontier
+    return results
+
+
+def edit_distance(first, second, limit):
+    """Damerau-Levenshtein distance (adjacent transpositions), or limit + 1 if larger"""
+    if abs(len(first) - len(second)) > limit:
+        return limit + 1
+    previous_previous = None
+    previous = list(range(len(second) + 1))
+    for i, first_char in enumerate(first, 1):
+        current = [i] + [0] * len(second)
+        for j, second_char in enumerate(second, 1):
+            cost = 0 if first_char == second_char else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if (previous_previous is not None and i > 1 and j > 1
+                    and first_char == second[j - 2] and first[i - 2] == second_char):
+                current[j] = min(current[j], previous_previous[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+        previous_previous, previous = previous, current
+    return previous[-1]
+
+
+def max_distance_for(word):
+    """Allow one edit, or two in words of MIN_TWO_EDIT_LENGTH letters or more"""
+    return 1 if len(word) < MIN_TWO_EDIT_LENGTH else 2
+
+
+class SpellingIndex:
+    """Deletion index over a vocabulary of terms with frequencies"""
+
+    def __init__(self, frequencies, max_distance=MAX_DISTANCE, known_terms=()):
+        self.frequencies = dict(frequencies)
+        self.max_distance = max_distance
+        # Valid words that are never corrected but are not suggested either
+        self.known_terms = set(known_terms) | set(self.frequencies)
+        self.deletes = {}
+        # Students reuse the same words, so each unknown word is looked up once
+        self.lookup = functools.lru_cache(maxsize=4096)(self._lookup)
+        for term in self.frequencies:
+            if len(term) < MIN_WORD_LENGTH:
+                continue
+            for variant in deletions(term, max_distance):
+                self.deletes.setdefault(variant, []).append(term)
+
+    @classmethod
+    def from_index(cls, knowledge_index, max_distance=MAX_DISTANCE):
+        """Build from the terms of a KnowledgeIndex, weighted by document frequency.
+
+        Only keyword terms are suggested: body text words such as "willing"
+        or "pricing" would otherwise swallow ordinary English words. Every
+        body term, and COMMON_WORDS, are known to be valid.
+        """
+        frequencies = {}
+        known_terms = set(COMMON_WORDS)
+        for field, postings in knowledge_index.postings.items():
+            known_terms.update(postings)
+            if field != "keywords":
+                continue
+            for term, documents in postings.items():
+                if term.isalpha():
+                    frequencies[term] = frequencies.get(term, 0) + len(documents)
+        return cls(frequencies, max_distance, known_terms)
+
+    def to_state(self):
+        """JSON-ready data that from_state turns back into an equal index"""
+        return {"frequencies": self.frequencies, "max_distance": self.max_distance,
+                "known_terms": sorted(self.known_terms), "deletes": self.deletes}
+
+    @classmethod
+    def from_state(cls, state):
+        # The deletion index is restored as is rather than regenerated
+        index = cls({}, state["max_distance"])
+        index.frequencies = state["frequencies"]
+        index.known_terms = set(state["known_terms"])
+        index.deletes = state["deletes"]
+        return index
+
+    def __contains__(self, term):
+        return term in self.frequencies
+
+    def _lookup(self, word):
+        """Return the closest vocabulary term to word, or None if nothing is close"""
+        if word in self.frequencies:
+            return word
+        if len(word) < MIN_WORD_LENGTH:
+            return None
+
+        limit = min(self.max_distance, max_distance_for(word))
+        best = None
+        best_key = None
+        seen = set()
+        for variant in deletions(word, limit):
+            for term in self.deletes.get(variant, ()):
+                if term in seen:
+                    continue
+                seen.add(term)
+                distance = edit_distance(word, term, limit)
+                if distance > limit:
+                    continue
+                # Closest first, then the most common term
+                key = (distance, -self.frequencies[term])
+                if best_key is None or key < best_key:
+                    best, best_key = term, key
+        return best
+
+    def correct(self, words):
+        """Return (word, correction) pairs for the words that are misspelled"""
+        corrections = []
+        for word in words:
+            if word in STOP_WORDS or word in self.known_terms or len(word) < MIN_WORD_LENGTH:
+                continue
+            suggestion = self.lookup(word)
+            if suggestion and suggestion != word:
+                corrections.append((word, suggestion))
+        return corrections
@@ -0,0 +1,210 @@
+"""Durable per-student storage for chat history, study notes and flashcard
+review state.
+
+Writes go through a queue to one background thread that commits them to a
+SQLite database in WAL mode, in batches, so the Streamlit script thread
+never waits on disk. Reads open their own connection and fetch one page at
+a time.
+"""
+
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+log = logging.getLogger(__name__)
+
+DEFAULT_DB_PATH = os.environ.get(
+    "STUDY_TOOL_DB",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "study_tool.db"))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS messages (
+    id INTEGER PRIMARY KEY,
+    student TEXT NOT NULL,
+    role TEXT NOT NULL,
+    content TEXT NOT NULL,
+    timestamp INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS messages_by_student ON messages (student, id);
+CREATE TABLE IF NOT EXISTS notes (
+    id INTEGER PRIMARY KEY,
+    student TEXT NOT NULL,
+    source TEXT NOT NULL,
+    passage TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS notes_by_student ON notes (student, id);
+CREATE TABLE IF NOT EXISTS flashcards (
+    student TEXT PRIMARY KEY,
+    deck TEXT NOT NULL,
+    state BLOB NOT NULL
+);
+"""
+
+INSERT_MESSAGE = "INSERT INTO messages (student, role, content, timestamp) VALUES (?, ?, ?, ?)"
+INSERT_NOTE = "INSERT INTO notes (student, source, passage) VALUES (?, ?, ?)"
+DELETE_MESSAGES = "DELETE FROM messages WHERE student = ?"
+SAVE_FLASHCARDS = "INSERT OR REPLACE INTO flashcards (student, deck, state) VALUES (?, ?, ?)"
+
+# The writer commits after this many operations or this many seconds
+BATCH_SIZE = 256
+FLUSH_INTERVAL = 0.5
+
+# Queued by flush(student): ends the writer's batch early and is set once it commits
+_FLUSH = object()
+
+
+class SessionStore:
+    """SQLite-backed store with a batching background writer"""
+
+    def __init__(self, path=DEFAULT_DB_PATH):
+        self.path = path
+        # The most recent failed batch, and how many writes were lost in total
+        self.last_error = None
+        self.failed_writes = 0
+        # Queued writes not yet committed, per student
+        self._pending = {}
+        self._pending_lock = threading.Lock()
+        with self._reading() as connection:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.executescript(SCHEMA)
+        self._queue = queue.Queue()
+        self._writer = threading.Thread(target=self._write_loop, name="session-store", daemon=True)
+        self._writer.start()
+
+    def _connect(self):
+        connection = sqlite3.connect(self.path, timeout=30)
+        connection.execute("PRAGMA synchronous=NORMAL")
+        return connection
+
+    @contextmanager
+    def _reading(self):
+        connection = self._connect()
+        try:
+            yield connection
+        finally:
+            connection.close()
+
+    # Writes, queued for the background thread
+
+    def _put(self, student, statement, params):
+        with self._pending_lock:
+            self._pending[student] = self._pending.get(student, 0) + 1
+        self._queue.put((statement, params, student))
+
+    def add_message(self, student, role, content, timestamp):
+        self._put(student, INSERT_MESSAGE, (student, role, content, timestamp))
+
+    def add_notes(self, student, source, passages):
+        for passage in passages:
+            self._put(student, INSERT_NOTE, (student, source, passage))
+
+    def clear_messages(self, student):
+        self._put(student, DELETE_MESSAGES, (student,))
+
+    def save_flashcards(self, student, deck, state):
+        """Replace a student's review state; ``deck`` identifies the card set"""
+        self._put(student, SAVE_FLASHCARDS, (student, deck, state))
+
+    def flush(self, student=None):
+        """Block until queued writes are committed: every student's, or only ``student``'s.
+
+        Flushing one student waits for the writes queued before the call,
+        not for whatever other sessions keep queueing after it.
+        """
+        if student is None:
+            self._queue.join()
+            return
+        with self._pending_lock:
+            if not self._pending.get(student):
+                return
+        committed = threading.Event()
+        self._queue.put((_FLUSH, committed, None))
+        committed.wait()
+
+    def close(self):
+        """Commit pending writes and stop the writer thread"""
+        self._queue.put(None)
+        self._writer.join()
+
+    def _write_loop(self):
+        connection = self._connect()
+        try:
+            while True:
+                batch = [self._queue.get()]
+                deadline = time.monotonic() + FLUSH_INTERVAL
+                while batch[-1] is not None and batch[-1][0] is not _FLUSH and len(batch) < BATCH_SIZE:
+                    try:
+                        batch.append(self._queue.get(timeout=max(0.0, deadline - time.monotonic())))
+                    except queue.Empty:
+                        break
+
+                stop = batch[-1] is None
+                operations = [item for item in batch if item is not None and item[0] is not _FLUSH]
+                try:
+                    self._commit(connection, operations)
+                except sqlite3.Error as error:
+                    # Keep the writer alive; the failed batch is reported, not retried
+                    log.error("Lost %d writes to %s: %s", len(operations), self.path, error)
+                    self.last_error = error
+                    self.failed_writes += len(operations)
+                finally:
+                    with self._pending_lock:
+                        for _, _, student in operations:
+                            self._pending[student] -= 1
+                            if not self._pending[student]:
+                                del self._pending[student]
+                    for item in batch:
+                        if item is not None and item[0] is _FLUSH:
+                            item[1].set()
+                        self._queue.task_done()
+                if stop:
+                    return
+        finally:
+            connection.close()
+
+    @staticmethod
+    def _commit(connection, operations):
+        """Run a batch of operations in one transaction"""
+        with connection:
+            # Group runs of the same statement into one executemany
+            start = 0
+            while start < len(operations):
+                end = start
+                while end < len(operations) and operations[end][0] == operations[start][0]:
+                    end += 1
+                connection.executemany(operations[start][0],
+                                       [params for _, params, _ in operations[start:end]])
+                start = end
+
+    # Reads, on the caller's thread
+
+    def count_messages(self, student):
+        with self._reading() as connection:
+            return connection.execute("SELECT COUNT(*) FROM messages WHERE student = ?",
+                                      (student,)).fetchone()[0]
+
+    def load_messages(self, student, start, stop):
+        """Return (role, content, timestamp) rows [start, stop) in chronological order"""
+        if start >= stop:
+            return []
+        with self._reading() as connection:
+            return connection.execute(
+                "SELECT role, content, timestamp FROM messages WHERE student = ? "
+                "ORDER BY id LIMIT ? OFFSET ?", (student, stop - start, start)).fetchall()
+
+    def load_notes(self, student):
+        """Return (source, passage) rows for a student"""
+        with self._reading() as connection:
+            return connection.execute("SELECT source, passage FROM notes WHERE student = ? ORDER BY id",
+                                      (student,)).fetchall()
+
+    def load_flashcards(self, student):
+        """Return (deck, state bytes) for a student, or None"""
+        with self._reading() as connection:
+            row = connection.execute("SELECT deck, state FROM flashcards WHERE student = ?",
+                                     (student,)).fetchone()
+        return None if row is None else (row[0], bytes(row[1]))
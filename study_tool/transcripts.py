@@ -0,0 +1,483 @@
+"""Searchable transcripts of the video lectures, with timestamp deep links.
+
+Transcript files (.srt, .vtt or .json) in the transcripts directory are
+parsed into timed cues and added to a positional inverted index: for every
+word, the positions at which it is said in each video. Positions run
+through a whole video rather than restarting per cue, so a phrase split
+across two cues still matches. A query's words must appear in order
+("quoted phrases") or within a few words of each other (anything else),
+and each hit links to the moment it is said.
+
+The directory is checked at most once every ``check_interval`` seconds and
+only new or changed files are parsed, so a large collection is indexed once
+per process, not on every rerun.
+
+A file's name without the extension identifies its video. An optional
+``videos.json`` in the same directory maps those names to a "title" and
+"url"; names that look like YouTube video ids link to YouTube by default.
+
+Usage:
+    python -m study_tool.transcripts search "law of demand" [--dir path]
+    python -m study_tool.transcripts show [--dir path]
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+import threading
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+
+from .search import STOP_WORDS, normalize_token
+
+TRANSCRIPT_DIR = os.environ.get(
+    "STUDY_TOOL_TRANSCRIPTS",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "transcripts"))
+TRANSCRIPT_EXTENSIONS = (".srt", ".vtt", ".json")
+MANIFEST_NAME = "videos.json"
+
+# Words of an unquoted query must all be said within this many words
+NEAR_WINDOW = 12
+
+WORD = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+TIMESTAMP = re.compile(r"(?:(\d+):)?(\d{1,2}):(\d{2})(?:[.,](\d{1,3}))?")
+CUE_TIMING = re.compile(r"^\s*(\S+)\s+-->\s+(\S+)")
+MARKUP = re.compile(r"<[^>]*>|\{\\[^}]*\}")
+QUOTED = re.compile(r'"([^"]+)"')
+YOUTUBE_ID = re.compile(r"^[A-Za-z0-9_-]{11}$")
+
+
+class TranscriptFormatError(ValueError):
+    """Raised when a transcript file cannot be parsed"""
+
+
+def tokenize_words(text):
+    """Lowercase, normalized words in order, stop words included"""
+    return [normalize_token(word) for word in WORD.findall(text.lower())]
+
+
+def parse_timestamp(value):
+    """Seconds from "HH:MM:SS,mmm", "MM:SS.mmm" or a number of seconds"""
+    if isinstance(value, (int, float)):
+        return float(value)
+    match = TIMESTAMP.fullmatch(str(value).strip())
+    if not match:
+        try:
+            return float(value)
+        except ValueError:
+            raise TranscriptFormatError("Bad timestamp: {!r}".format(value)) from None
+    hours, minutes, seconds, fraction = match.groups()
+    return (int(hours or 0) * 3600 + int(minutes) * 60 + int(seconds)
+            + (int(fraction.ljust(3, "0")) / 1000 if fraction else 0.0))
+
+
+def format_timestamp(seconds):
+    """"1:02:03" or "2:03" for a number of seconds"""
+    seconds = int(seconds)
+    hours, rest = divmod(seconds, 3600)
+    minutes, seconds = divmod(rest, 60)
+    if hours:
+        return "{}:{:02d}:{:02d}".format(hours, minutes, seconds)
+    return "{}:{:02d}".format(minutes, seconds)
+
+
+def _clean(text):
+    return " ".join(MARKUP.sub("", text).split())
+
+
+def parse_cue_blocks(text):
+    """Cues from SRT or WebVTT text: a list of (start, end, text)"""
+    cues = []
+    for block in re.split(r"\n\s*\n", text.replace("\r\n", "\n").replace("\r", "\n")):
+        lines = block.strip("\n").split("\n")
+        for position, line in enumerate(lines):
+            timing = CUE_TIMING.match(line)
+            if timing:
+                # Anything before the timing line is a cue number or identifier
+                words = _clean(" ".join(lines[position + 1:]))
+                if words:
+                    cues.append((parse_timestamp(timing.group(1)), parse_timestamp(timing.group(2)), words))
+                break
+    return cues
+
+
+def parse_json_transcript(text):
+    """Cues and metadata from a JSON transcript.
+
+    Accepts a list of cues or an object with "cues" (or "segments") and
+    optional "title" and "url". Each cue has "text", a "start" and either
+    an "end" or a "duration", as YouTube transcript exports do.
+    """
+    try:
+        data = json.loads(text)
+    except ValueError as error:
+        raise TranscriptFormatError("Invalid JSON: {}".format(error)) from None
+    meta = {}
+    if isinstance(data, dict):
+        meta = {key: data[key] for key in ("title", "url") if isinstance(data.get(key), str)}
+        data = data.get("cues", data.get("segments"))
+    if not isinstance(data, list):
+        raise TranscriptFormatError("Expected a list of cues")
+
+    cues = []
+    for cue in data:
+        if not isinstance(cue, dict) or not isinstance(cue.get("text"), str) or "start" not in cue:
+            raise TranscriptFormatError("Each cue needs a \"text\" string and a \"start\"")
+        start = parse_timestamp(cue["start"])
+        if "end" in cue:
+            end = parse_timestamp(cue["end"])
+        else:
+            end = start + parse_timestamp(cue.get("duration", 0))
+        words = _clean(cue["text"])
+        if words:
+            cues.append((start, end, words))
+    return cues, meta
+
+
+def read_transcript(path):
+    """Return (cues, metadata) for one transcript file"""
+    with open(path, encoding="utf-8-sig", errors="replace") as source:
+        text = source.read()
+    if path.lower().endswith(".json"):
+        return parse_json_transcript(text)
+    return parse_cue_blocks(text), {}
+
+
+def video_url(key):
+    """Default link for a video: YouTube when the name is a video id"""
+    return "https://www.youtube.com/watch?v=" + key if YOUTUBE_ID.match(key) else None
+
+
+def deep_link(url, seconds):
+    """Link to url at a point in time"""
+    if not url:
+        return None
+    seconds = int(seconds)
+    if "youtube.com/" in url or "youtu.be/" in url:
+        return "{}{}t={}s".format(url, "&" if "?" in url else "?", seconds)
+    # Media fragment, understood by browsers for direct video links
+    return "{}#t={}".format(url, seconds)
+
+
+class Video:
+    """One indexed transcript: cue timings and text, and where each cue's words start"""
+
+    __slots__ = ("key", "title", "url", "meta", "starts", "ends", "texts", "cue_positions", "word_count")
+
+    def __init__(self, key, title, url, cues, meta=None):
+        self.key = key
+        self.title = title
+        self.url = url
+        self.meta = meta or {}
+        self.starts = array("d", (cue[0] for cue in cues))
+        self.ends = array("d", (cue[1] for cue in cues))
+        self.texts = [cue[2] for cue in cues]
+        self.cue_positions = array("I")
+        self.word_count = 0
+
+    def cue_at(self, position):
+        """Index of the cue containing a word position"""
+        return bisect_right(self.cue_positions, position) - 1
+
+
+class TranscriptHit:
+    """A match: the cues it is said in and a link to the moment it starts"""
+
+    __slots__ = ("video", "cue", "start", "text", "span")
+
+    def __init__(self, video, cue, last_cue, span):
+        self.video = video
+        self.cue = cue
+        self.start = video.starts[cue]
+        self.text = " ".join(video.texts[cue:last_cue + 1])
+        self.span = span
+
+    def link(self):
+        return deep_link(self.video.url, self.start)
+
+
+class TranscriptIndex:
+    """Positional inverted index over every transcript in a directory.
+
+    ``postings`` maps a word to {video key: array of positions}. Files are
+    tracked by (mtime, size): ``refresh`` parses only those that are new or
+    changed and drops videos whose file is gone.
+    """
+
+    def __init__(self, directory=TRANSCRIPT_DIR, check_interval=2.0):
+        self.directory = directory
+        self.check_interval = check_interval
+        self.videos = {}
+        self.postings = {}
+        self.errors = {}
+        self.parsed_files = 0
+        self._signatures = {}
+        self._manifest_signature = None
+        self._manifest = {}
+        self._checked_at = None
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.videos)
+
+    def refresh(self, force=False):
+        """Index new and changed files, at most once every check_interval seconds"""
+        now = time.monotonic()
+        if not force and self._checked_at is not None and now - self._checked_at < self.check_interval:
+            return
+        with self._lock:
+            self._checked_at = now
+            self._sync()
+
+    def _sync(self):
+        try:
+            entries = {entry.name: entry.stat() for entry in os.scandir(self.directory) if entry.is_file()}
+        except FileNotFoundError:
+            entries = {}
+
+        manifest = entries.pop(MANIFEST_NAME, None)
+        manifest_signature = manifest and (manifest.st_mtime_ns, manifest.st_size)
+        if manifest_signature != self._manifest_signature:
+            self._manifest_signature = manifest_signature
+            self._manifest = self._read_manifest() if manifest else {}
+            # Titles and links may have changed for every video
+            for key, video in self.videos.items():
+                video.title, video.url = self._describe(key, video.meta)
+
+        current = {}
+        for name, stat in entries.items():
+            key, extension = os.path.splitext(name)
+            if extension.lower() in TRANSCRIPT_EXTENSIONS:
+                current[key] = (name, (stat.st_mtime_ns, stat.st_size))
+
+        for key in list(self._signatures):
+            if key not in current or current[key] != self._signatures[key]:
+                self._remove(key)
+        for key, (name, signature) in sorted(current.items()):
+            if key in self._signatures:
+                continue
+            # Recorded even when parsing fails, so a bad file is not retried until it changes
+            self._signatures[key] = (name, signature)
+            try:
+                cues, meta = read_transcript(os.path.join(self.directory, name))
+            except (OSError, TranscriptFormatError) as error:
+                self.errors[name] = str(error)
+                continue
+            self.errors.pop(name, None)
+            self.add_video(key, cues, meta)
+            self.parsed_files += 1
+
+    def _read_manifest(self):
+        try:
+            with open(os.path.join(self.directory, MANIFEST_NAME), encoding="utf-8") as manifest:
+                data = json.load(manifest)
+        except (OSError, ValueError) as error:
+            self.errors[MANIFEST_NAME] = str(error)
+            return {}
+        self.errors.pop(MANIFEST_NAME, None)
+        return data if isinstance(data, dict) else {}
+
+    def _describe(self, key, meta):
+        """(title, url) for a video from the manifest, then the file, then defaults"""
+        entry = self._manifest.get(key)
+        entry = entry if isinstance(entry, dict) else {}
+        title = entry.get("title") or meta.get("title") or key
+        url = entry.get("url") or meta.get("url") or video_url(key)
+        return title, url
+
+    def add_video(self, key, cues, meta=None):
+        """Index a video's cues, replacing any earlier version of it"""
+        self._remove(key, forget_file=False)
+        meta = meta or {}
+        video = Video(key, *self._describe(key, meta), cues, meta)
+        postings = self.postings
+        position = 0
+        for text in video.texts:
+            video.cue_positions.append(position)
+            for word in tokenize_words(text):
+                by_video = postings.get(word)
+                if by_video is None:
+                    by_video = postings[word] = {}
+                positions = by_video.get(key)
+                if positions is None:
+                    positions = by_video[key] = array("I")
+                positions.append(position)
+                position += 1
+        video.word_count = position
+        self.videos[key] = video
+        return video
+
+    def _remove(self, key, forget_file=True):
+        if forget_file:
+            self._signatures.pop(key, None)
+        video = self.videos.pop(key, None)
+        if video is None:
+            return
+        for word in set(tokenize_words(" ".join(video.texts))):
+            by_video = self.postings.get(word)
+            if by_video is not None:
+                by_video.pop(key, None)
+                if not by_video:
+                    del self.postings[word]
+
+    def search(self, query, limit=5, near=NEAR_WINDOW):
+        """Return up to limit TranscriptHits, tightest matches first.
+
+        Quoted phrases must be said word for word; the other words of the
+        query (stop words aside) must all be said within ``near`` words of
+        the first phrase or word.
+        """
+        phrases = [tokenize_words(phrase) for phrase in QUOTED.findall(query)]
+        words = [word for word in tokenize_words(QUOTED.sub(" ", query)) if word not in STOP_WORDS]
+        # Each requirement is a run of words said in order
+        terms = [phrase for phrase in phrases if phrase] + [[word] for word in dict.fromkeys(words)]
+        if not terms:
+            return []
+
+        with self._lock:
+            candidates = None
+            for phrase in terms:
+                for word in phrase:
+                    by_video = self.postings.get(word, {})
+                    keys = set(by_video)
+                    candidates = keys if candidates is None else candidates & keys
+            # Matches sort by span, then video; once enough have the smallest
+            # span possible, later videos cannot displace them
+            tightest = sum(len(phrase) for phrase in terms) - 1
+            matches = []
+            tight = 0
+            for key in sorted(candidates or ()):
+                found = self._search_video(self.videos[key], terms, near)
+                matches.extend(found)
+                tight += sum(1 for match in found if match[0] == tightest)
+                if tight >= limit:
+                    break
+            # Only the hits that are returned are built
+            matches.sort()
+            return [TranscriptHit(self.videos[key], cue, last_cue, span)
+                    for span, key, cue, last_cue in matches[:limit]]
+
+    def _search_video(self, video, terms, near):
+        """(span, video key, first cue, last cue) per match, at most one per cue"""
+        postings = self.postings
+        key = video.key
+        # Phrase starts per requirement; the rarest one anchors the search
+        starts = sorted(((_phrase_starts([postings[word][key] for word in phrase]), len(phrase)) for phrase in terms),
+                        key=lambda item: len(item[0]))
+        (anchor, length), others = starts[0], starts[1:]
+        # Anchors come in order, so each other requirement is walked once
+        cursors = [0] * len(others)
+        best = {}
+        for position in anchor:
+            low, high = position, position + length - 1
+            for number, (candidates, other_length) in enumerate(others):
+                index = cursors[number]
+                count = len(candidates)
+                while index < count and candidates[index] < position:
+                    index += 1
+                cursors[number] = index
+                # The nearest start is just before or at/after the anchor
+                found = None
+                if index < count and candidates[index] - position <= near:
+                    found = candidates[index]
+                if index and position - candidates[index - 1] <= near and (
+                        found is None or position - candidates[index - 1] < found - position):
+                    found = candidates[index - 1]
+                if found is None:
+                    break
+                if found < low:
+                    low = found
+                if found + other_length - 1 > high:
+                    high = found + other_length - 1
+            else:
+                cue = video.cue_at(low)
+                span = high - low
+                if cue not in best or span < best[cue][0]:
+                    best[cue] = (span, high)
+        return [(span, key, cue, video.cue_at(high)) for cue, (span, high) in best.items()]
+
+    def stats(self):
+        return {"videos": len(self.videos),
+                "words": sum(video.word_count for video in self.videos.values()),
+                "terms": len(self.postings),
+                "parsed_files": self.parsed_files,
+                "errors": len(self.errors)}
+
+
+def _phrase_starts(positions):
+    """Sorted positions where the words with these position arrays are said in a row"""
+    if len(positions) == 1:
+        return positions[0]
+    order = sorted(range(len(positions)), key=lambda offset: len(positions[offset]))
+    rarest = order[0]
+    starts = {position - rarest for position in positions[rarest] if position >= rarest}
+    for offset in order[1:]:
+        others = positions[offset]
+        if len(others) <= 8 * len(starts):
+            starts.intersection_update(position - offset for position in others)
+        else:
+            # A common word such as "of": look up each remaining start instead
+            starts = {start for start in starts if _contains(others, start + offset)}
+        if not starts:
+            break
+    return sorted(starts)
+
+
+def _contains(positions, position):
+    index = bisect_left(positions, position)
+    return index < len(positions) and positions[index] == position
+
+
+def format_transcript_matches(hits, max_chars=300):
+    """Format hits as a markdown section with timestamp links"""
+    parts = ["**🎥 From the video lectures:**\n\n"]
+    for hit in hits:
+        snippet = hit.text if len(hit.text) <= max_chars else hit.text[:max_chars].rsplit(" ", 1)[0] + "…"
+        stamp = format_timestamp(hit.start)
+        link = hit.link()
+        where = "[{} at {}]({})".format(hit.video.title, stamp, link) if link else "{} at {}".format(hit.video.title, stamp)
+        parts.append("> " + snippet + "\n>\n> — *" + where + "*\n\n")
+    return "".join(parts)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Search or inspect the video transcripts")
+    parser.add_argument("--dir", default=TRANSCRIPT_DIR, help="transcripts directory")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    search = commands.add_parser("search", help="find where something is said")
+    search.add_argument("query", help='words, or a "quoted phrase"')
+    search.add_argument("--limit", type=int, default=10)
+
+    commands.add_parser("show", help="list the indexed videos")
+
+    args = parser.parse_args(argv)
+    index = TranscriptIndex(args.dir)
+    started = time.perf_counter()
+    index.refresh(force=True)
+    indexed = time.perf_counter() - started
+    for name, error in sorted(index.errors.items()):
+        print("{}: {}".format(name, error), file=sys.stderr)
+
+    if args.command == "show":
+        print("{videos} videos, {words} words, {terms} distinct terms".format(**index.stats())
+              + " (indexed in {:.2f}s)".format(indexed))
+        for video in index.videos.values():
+            print("  {:<24} {:>6} cues  {}".format(video.key, len(video.texts), video.title))
+        return 0
+
+    started = time.perf_counter()
+    hits = index.search(args.query, args.limit)
+    print("{} hits in {:.2f} ms".format(len(hits), (time.perf_counter() - started) * 1000))
+    for hit in hits:
+        print("  [{} {}] {}".format(hit.video.title, format_timestamp(hit.start), hit.text))
+        if hit.link():
+            print("    " + hit.link())
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,215 @@
+"""Offline text-to-speech for the dialogue with a content-addressed audio cache.
+
+Clips are keyed by a hash of the synthesizer, voice and text, so each line
+is synthesized once per deployment and reused by every session after that.
+"""
+
+import hashlib
+import io
+import math
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+import wave
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+
+AUDIO_CACHE_DIR = os.environ.get(
+    "STUDY_TOOL_AUDIO_CACHE", os.path.join(tempfile.gettempdir(), "study_tool_audio"))
+
+# Voice used for each dialogue speaker
+SPEAKER_VOICES = {"Teacher": "teacher", "Student": "student"}
+
+
+class Synthesizer:
+    """Turns text into WAV bytes; subclasses implement synthesize()"""
+
+    name = "base"
+
+    def synthesize(self, text, voice):
+        raise NotImplementedError
+
+
+class ToneSynthesizer(Synthesizer):
+    """Deterministic stand-in that renders one short tone per word.
+
+    Useful for tests and machines without a speech engine: the clip length
+    follows the text length and each voice gets its own pitch.
+    """
+
+    name = "tone"
+    VOICE_PITCH = {"teacher": 220.0, "student": 330.0}
+
+    def __init__(self, sample_rate=16000, word_seconds=0.12):
+        self.sample_rate = sample_rate
+        self.word_seconds = word_seconds
+
+    def synthesize(self, text, voice):
+        pitch = self.VOICE_PITCH.get(voice, 260.0)
+        word_samples = int(self.sample_rate * self.word_seconds)
+        gap_samples = word_samples // 4
+        samples = array("h")
+        for word in text.split():
+            # Nudge the pitch per word so clips are not a single flat tone
+            frequency = pitch * (1 + (len(word) % 5) / 20)
+            step = 2 * math.pi * frequency / self.sample_rate
+            samples.extend(int(8000 * math.sin(step * i)) for i in range(word_samples))
+            samples.extend([0] * gap_samples)
+        return _wav_bytes(samples, self.sample_rate)
+
+
+class Pyttsx3Synthesizer(Synthesizer):
+    """Local offline speech through the optional pyttsx3 package"""
+
+    name = "pyttsx3"
+    VOICE_RATE = {"teacher": 165, "student": 185}
+
+    def synthesize(self, text, voice):
+        try:
+            import pyttsx3
+        except ImportError as error:
+            raise ImportError("Install pyttsx3 to use the offline speech engine: "
+                              "pip install pyttsx3") from error
+
+        engine = pyttsx3.init()
+        engine.setProperty("rate", self.VOICE_RATE.get(voice, 175))
+        handle, path = tempfile.mkstemp(suffix=".wav")
+        os.close(handle)
+        try:
+            engine.save_to_file(text, path)
+            engine.runAndWait()
+            with open(path, "rb") as clip:
+                return clip.read()
+        finally:
+            os.remove(path)
+
+
+SYNTHESIZERS = {
+    ToneSynthesizer.name: ToneSynthesizer,
+    Pyttsx3Synthesizer.name: Pyttsx3Synthesizer,
+}
+
+
+def get_synthesizer(name=None):
+    """Create the synthesizer named by ``name`` or $STUDY_TOOL_TTS (default: tone)"""
+    name = name or os.environ.get("STUDY_TOOL_TTS", ToneSynthesizer.name)
+    try:
+        return SYNTHESIZERS[name]()
+    except KeyError:
+        raise ValueError("Unknown synthesizer {!r}, choose one of {}".format(
+            name, ", ".join(sorted(SYNTHESIZERS)))) from None
+
+
+def _wav_bytes(samples, sample_rate):
+    """Encode 16-bit mono samples as a WAV file"""
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as clip:
+        clip.setnchannels(1)
+        clip.setsampwidth(2)
+        clip.setframerate(sample_rate)
+        clip.writeframes(samples.tobytes())
+    return buffer.getvalue()
+
+
+def clip_seconds(path):
+    """Length of a WAV clip in seconds, read from its header; None if it is not a WAV file"""
+    try:
+        with wave.open(path, "rb") as clip:
+            return clip.getnframes() / clip.getframerate()
+    except (wave.Error, EOFError):
+        return None
+
+
+class AudioCache:
+    """On-disk clip store addressed by a hash of synthesizer, voice and text"""
+
+    def __init__(self, root=AUDIO_CACHE_DIR):
+        self.root = root
+
+    @staticmethod
+    def key(text, voice, synthesizer_name):
+        digest = hashlib.sha256()
+        for part in (synthesizer_name, voice, text):
+            digest.update(part.encode("utf-8") + b"\0")
+        return digest.hexdigest()
+
+    def path_for(self, key):
+        # Two-level fan-out keeps directories small as the cache grows
+        return os.path.join(self.root, key[:2], key + ".wav")
+
+    def get(self, key):
+        """Return the clip path for key, or None when it is not cached"""
+        path = self.path_for(key)
+        return path if os.path.exists(path) else None
+
+    def put(self, key, data):
+        """Store a clip atomically and return its path"""
+        path = self.path_for(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        handle, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        with os.fdopen(handle, "wb") as clip:
+            clip.write(data)
+        os.replace(tmp_path, path)
+        return path
+
+
+def _synthesize_job(job):
+    """Process pool worker: synthesize one (synthesizer, text, voice) job"""
+    synthesizer, text, voice = job
+    return synthesizer.synthesize(text, voice)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_synthesis_pool():
+    """The process-wide synthesis pool, started on first use.
+
+    Workers are spawned rather than forked: the pool is used from the
+    dialogue library's threads inside a multithreaded server, and forking
+    such a process copies locks other threads may be holding.
+    """
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ProcessPoolExecutor(mp_context=multiprocessing.get_context("spawn"))
+    return _pool
+
+
+def synthesize_dialogue(dialogues, synthesizer=None, cache=None):
+    """Make sure every dialogue line has a cached clip.
+
+    Missing clips are synthesized in parallel in the shared process pool.
+    Returns a report with the clip path and length in seconds for each line,
+    how many clips were generated versus already cached, and the wall time
+    in seconds.
+    """
+    synthesizer = synthesizer or get_synthesizer()
+    cache = cache or AudioCache()
+    start = time.perf_counter()
+
+    keys = []
+    missing = {}
+    for dialogue in dialogues:
+        voice = SPEAKER_VOICES.get(dialogue["speaker"], "teacher")
+        key = cache.key(dialogue["text"], voice, synthesizer.name)
+        keys.append(key)
+        if key not in missing and cache.get(key) is None:
+            missing[key] = (synthesizer, dialogue["text"], voice)
+
+    if missing:
+        for key, data in zip(missing, get_synthesis_pool().map(_synthesize_job, missing.values())):
+            cache.put(key, data)
+
+    paths = [cache.path_for(key) for key in keys]
+    return {
+        "paths": paths,
+        "durations": [clip_seconds(path) for path in paths],
+        "generated": len(missing),
+        "cached": len(set(keys)) - len(missing),
+        "seconds": time.perf_counter() - start,
+    }
@@ -0,0 +1,34 @@
+"""Comparison questions that name concepts by their shared head noun"""
+
+import subprocess
+import sys
+
+import pytest
+
+from study_tool import AnswerEngine, ECONOMICS_KNOWLEDGE_BASE
+
+
+@pytest.fixture(scope="module")
+def engine():
+    return AnswerEngine(ECONOMICS_KNOWLEDGE_BASE, search_mode="keyword")
+
+
+@pytest.mark.parametrize("question, title", [
+    ("compare fixed and variable costs", "Fixed Costs and Variable Costs"),
+    ("fixed vs variable costs", "Fixed Costs and Variable Costs"),
+    ("what is the difference between fixed and variable costs", "Fixed Costs and Variable Costs"),
+    ("difference between marginal and average cost", "Marginal Cost and Average Cost"),
+    ("difference between marginal and average product", "Marginal Product and Average Product"),
+    ("compare fixed costs and variable costs", "Fixed Costs and Variable Costs"),
+])
+def test_shared_head_nouns_name_both_concepts(engine, question, title):
+    response, topic = engine.answer_with_topic(question)
+    assert topic == "comparison"
+    assert response.startswith("**Difference Between {}:**".format(title))
+
+
+def test_module_runs_without_a_runpy_warning():
+    # The engine imports this module lazily, so running it does not import it twice
+    completed = subprocess.run([sys.executable, "-W", "error", "-m", "study_tool.comparisons", "list"],
+                               capture_output=True, text=True)
+    assert completed.returncode == 0, completed.stderr
@@ -0,0 +1,56 @@
+"""Dialogue playback pacing and the library's handling of speech failures"""
+
+import logging
+
+import pytest
+
+from study_tool.dialogue import DIALOGUE, DialogueLibrary, DialoguePlayback
+from study_tool.knowledge_base import ECONOMICS_KNOWLEDGE_BASE
+from study_tool.tts import ToneSynthesizer, clip_seconds
+
+
+def test_clip_seconds_reads_the_wav_header(tmp_path):
+    path = tmp_path / "clip.wav"
+    # Three words of 0.12s, each followed by a quarter-word gap
+    path.write_bytes(ToneSynthesizer().synthesize("one two three", "teacher"))
+    assert clip_seconds(str(path)) == pytest.approx(0.45)
+
+    path.write_bytes(b"not a wav file")
+    assert clip_seconds(str(path)) is None
+
+
+def test_each_line_waits_for_its_clip():
+    playback = DialoguePlayback(3, interval=0.5, durations=[2.0, None, 1.0])
+    assert playback.starts == [0.0, 2.0, 2.5]
+    assert playback.length == 3.5
+
+    playback.play()
+    start = playback._resumed_at
+    assert playback.visible_lines(start) == 1
+    assert playback.visible_lines(start + 1.9) == 1
+    assert playback.visible_lines(start + 2.0) == 2
+    assert playback.visible_lines(start + 2.6) == 3
+    assert not playback.finished()
+
+    playback.skip()
+    assert playback.visible_lines() == 3
+    assert playback.finished()
+
+
+def test_lines_without_audio_use_the_interval():
+    playback = DialoguePlayback(4, interval=0.5)
+    assert playback.starts == [0.0, 0.5, 1.0, 1.5]
+    assert playback.visible_lines() == 0
+
+
+def failing_synthesize(lines):
+    raise RuntimeError("speech engine is not installed")
+
+
+def test_failed_synthesis_keeps_the_script(caplog):
+    library = DialogueLibrary(synthesize=failing_synthesize)
+    with caplog.at_level(logging.ERROR, logger="study_tool.dialogue"):
+        dialogue = library.get(ECONOMICS_KNOWLEDGE_BASE, "v1", "introduction")
+    assert dialogue.lines == DIALOGUE
+    assert dialogue.audio is None
+    assert "speech engine is not installed" in caplog.text
@@ -0,0 +1,74 @@
+"""Equilibrium and cost-curve solvers against values worked out by hand"""
+
+import numpy as np
+import pytest
+
+from study_tool.economics import (Curve, cost_curves, efficient_scale, point_elasticity,
+                                  solve_equilibrium)
+
+
+@pytest.mark.parametrize("demand, supply, price, quantity", [
+    # 100 - 2P = 10 + P
+    (Curve.linear(100, -2), Curve.linear(10, 1), 30.0, 40.0),
+    # 100 / P = 4P
+    (Curve.power(100, -1), Curve.power(4, 1), 5.0, 20.0),
+    # 100 / P**2 = 25P
+    (Curve.power(100, -2), Curve.power(25, 1), 4 ** (1 / 3), 25 * 4 ** (1 / 3)),
+])
+def test_closed_forms_match_hand_computed_equilibria(demand, supply, price, quantity):
+    solved_price, solved_quantity = solve_equilibrium(demand, supply)
+    assert solved_price == pytest.approx(price)
+    assert solved_quantity == pytest.approx(quantity)
+
+
+@pytest.mark.parametrize("demand, supply, price, quantity", [
+    # 100 - 2P = 10 * sqrt(P), so sqrt(P) = 5
+    (Curve.linear(100, -2), Curve.power(10, 0.5), 25.0, 50.0),
+    # 100 / P = P
+    (Curve.power(100, -1), Curve.linear(0, 1), 10.0, 10.0),
+])
+def test_bisection_solves_mixed_pairs(demand, supply, price, quantity):
+    solved_price, solved_quantity = solve_equilibrium(demand, supply)
+    assert solved_price == pytest.approx(price)
+    assert solved_quantity == pytest.approx(quantity)
+
+
+def test_mixed_pairs_solve_a_whole_grid_at_once():
+    intercepts = np.linspace(50, 150, 11)
+    prices, quantities = solve_equilibrium(Curve.linear(intercepts, -2), Curve.power(10, 0.5))
+    for intercept, price, quantity in zip(intercepts, prices, quantities):
+        expected = solve_equilibrium(Curve.linear(intercept, -2), Curve.power(10, 0.5))
+        assert (price, quantity) == pytest.approx(expected)
+        assert intercept - 2 * price == pytest.approx(10 * np.sqrt(price))
+
+
+@pytest.mark.parametrize("demand, supply", [
+    # Supply starts above the demand intercept
+    (Curve.linear(10, -1), Curve.linear(20, 1)),
+    (Curve.linear(10, -1), Curve.power(20, 0)),
+    # Equal exponents never cross unless the scales match
+    (Curve.power(10, -1), Curve.power(20, -1)),
+])
+def test_curves_that_never_cross_have_no_equilibrium(demand, supply):
+    price, quantity = solve_equilibrium(demand, supply)
+    assert np.isnan(price) and np.isnan(quantity)
+
+
+def test_power_curves_have_constant_elasticity():
+    prices = np.array([0.5, 1.0, 7.0, 40.0])
+    assert point_elasticity(Curve.power(100, -1.5), prices) == pytest.approx([-1.5] * 4)
+
+
+@pytest.mark.parametrize("fixed_cost, wage, productivity, labor_share", [
+    (100, 10, 5, 0.5),
+    (250, 18, 3, 0.7),
+    (40, 5, 12, 0.35),
+])
+def test_efficient_scale_is_the_lowest_average_total_cost(fixed_cost, wage, productivity, labor_share):
+    scale = float(efficient_scale(fixed_cost, wage, productivity, labor_share))
+    quantities = np.linspace(scale / 10, scale * 10, 200001)
+    average = cost_curves(quantities, fixed_cost, wage, productivity, labor_share)["average_total"]
+    assert scale == pytest.approx(quantities[average.argmin()], rel=1e-3)
+    # Marginal cost crosses average total cost at its minimum
+    curves = cost_curves(scale, fixed_cost, wage, productivity, labor_share)
+    assert curves["marginal"] == pytest.approx(curves["average_total"])
@@ -0,0 +1,43 @@
+"""Answer engine behaviour on the benchmark corpus and hand-picked questions"""
+
+import pytest
+
+from benchmarks.corpus import FALLBACKS
+from study_tool import AnswerEngine, ECONOMICS_KNOWLEDGE_BASE
+from study_tool.knowledge_base import FALLBACK_RESPONSE
+
+# Off-topic questions that share a word or two with the knowledge base text
+OFF_TOPIC = [
+    "what is the capital of france",
+    "how many legs does a spider have",
+    "how do i cook rice",
+]
+
+
+@pytest.fixture(scope="module", params=["keyword", "hybrid"])
+def engine(request):
+    return AnswerEngine(ECONOMICS_KNOWLEDGE_BASE, search_mode=request.param)
+
+
+@pytest.mark.parametrize("question", FALLBACKS + OFF_TOPIC)
+def test_off_topic_questions_fall_back(engine, question):
+    assert engine.answer_with_topic(question) == (FALLBACK_RESPONSE, "fallback")
+
+
+@pytest.mark.parametrize("question, topic", [
+    ("why do firms have barriers to entry", "market_structures"),
+    ("what is a budget constraint", "consumer_behavior"),
+    ("what are taxes and subsidies", "supply"),
+])
+def test_strong_body_text_matches_are_answered(engine, question, topic):
+    assert engine.answer_with_topic(question)[1] == topic
+
+
+@pytest.mark.parametrize("question, topic", [
+    ("what are economies of scale", "costs"),
+    ("what is a shortage of goods", "equilibrium"),
+    ("hi, what are economies of scale", "costs"),
+])
+def test_topics_named_by_a_synonym_are_answered(engine, question, topic):
+    # The synonym is not in the topic's text, so only the router finds it
+    assert engine.answer_with_topic(question)[1] == topic
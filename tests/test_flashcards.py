@@ -0,0 +1,70 @@
+"""Spaced-repetition scheduling and saved review state"""
+
+import random
+
+import pytest
+
+from study_tool.flashcards import AGAIN, EASY, GOOD, HARD, RELEARN_DELAY_MS, ReviewState, Scheduler
+
+START = 1_700_000_000.0
+
+
+def scanned_due_count(state, now):
+    """Reviewed cards due at now, by a linear scan of the due column"""
+    now_ms = int(now * 1000)
+    return sum(1 for due in state.due if due and due <= now_ms)
+
+
+def test_due_count_matches_a_linear_scan():
+    rng = random.Random(7)
+    # A small deck reviewed many times, so the heap is rebuilt along the way
+    scheduler = Scheduler(40)
+    now = START
+    rebuilds = 0
+    for _ in range(2000):
+        heap_size = len(scheduler._heap)
+        scheduler.review(rng.randrange(40), rng.choice((AGAIN, HARD, GOOD, EASY)), now)
+        rebuilds += len(scheduler._heap) <= heap_size
+        now += rng.uniform(0, 3 * 24 * 3600)
+        probe = now + rng.uniform(-10 * 24 * 3600, 10 * 24 * 3600)
+        assert scheduler.due_count(probe) == scanned_due_count(scheduler.state, probe)
+    assert rebuilds
+
+    # And on a scheduler restored from the same state
+    restored = Scheduler(40, ReviewState.from_bytes(40, scheduler.state.to_bytes()))
+    for probe in (START, now, now + 30 * 24 * 3600):
+        assert restored.due_count(probe) == scheduler.due_count(probe) == scanned_due_count(scheduler.state, probe)
+
+
+def test_next_card_prefers_overdue_cards_to_new_ones():
+    scheduler = Scheduler(5)
+    assert scheduler.next_card(START) == 0
+    scheduler.review(0, AGAIN, START)
+    # Not due yet: the next new card comes first
+    assert scheduler.next_card(START + 1) == 1
+    scheduler.review(1, GOOD, START + 1)
+    overdue = START + 2 * RELEARN_DELAY_MS / 1000
+    assert scheduler.next_card(overdue) == 0
+    scheduler.review(0, GOOD, overdue)
+    assert scheduler.next_card(overdue) == 2
+
+
+def test_review_state_round_trips_through_bytes():
+    rng = random.Random(3)
+    scheduler = Scheduler(25)
+    for step in range(100):
+        scheduler.review(rng.randrange(25), rng.choice((AGAIN, HARD, GOOD, EASY)), START + step * 3600)
+
+    state = scheduler.state
+    restored = ReviewState.from_bytes(25, state.to_bytes())
+    for name, _, _ in ReviewState.COLUMNS:
+        assert getattr(restored, name) == getattr(state, name)
+    assert len(state.to_bytes()) == 25 * ReviewState.bytes_per_card()
+
+
+def test_saved_state_for_another_deck_size_is_rejected():
+    data = ReviewState(25).to_bytes()
+    with pytest.raises(ValueError):
+        ReviewState.from_bytes(26, data)
+    with pytest.raises(ValueError):
+        ReviewState.from_bytes(25, data[:-1])
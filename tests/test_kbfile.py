@@ -0,0 +1,57 @@
+"""Hot reload of the compiled knowledge base file"""
+
+import logging
+import os
+
+import pytest
+
+from study_tool.kbfile import KnowledgeBaseFormatError, KnowledgeBaseStore, MappedKnowledgeBase, compile_knowledge_base
+from study_tool.knowledge_base import ECONOMICS_KNOWLEDGE_BASE, content_hash
+
+
+def replace_file(path, data):
+    # Swapped in atomically, the way kbfile build replaces the file
+    tmp_path = str(path) + ".new"
+    with open(tmp_path, "wb") as out:
+        out.write(data)
+    os.replace(tmp_path, path)
+
+
+@pytest.fixture
+def store(tmp_path):
+    path = tmp_path / "knowledge_base.ekb"
+    compile_knowledge_base(ECONOMICS_KNOWLEDGE_BASE, str(path))
+    return KnowledgeBaseStore(str(path), check_interval=0)
+
+
+@pytest.mark.parametrize("data", [b"", b"not a knowledge base file at all", None])
+def test_bad_replacement_keeps_the_last_good_version(store, data, caplog):
+    good = open(store.path, "rb").read()
+    # None stands for a valid header whose table is cut off
+    replace_file(store.path, good[:60] if data is None else data)
+
+    with caplog.at_level(logging.ERROR, logger="study_tool.kbfile"):
+        knowledge_base, version = store.snapshot()
+        store.snapshot()
+    assert version == content_hash(ECONOMICS_KNOWLEDGE_BASE)
+    assert dict(knowledge_base) == ECONOMICS_KNOWLEDGE_BASE
+    # Logged once, not on every check
+    assert len(caplog.records) == 1
+
+
+def test_good_file_after_a_bad_one_is_loaded(store):
+    replace_file(store.path, b"garbage")
+    store.snapshot()
+
+    edited = dict(ECONOMICS_KNOWLEDGE_BASE, extra_topic={"definition": "Added later."})
+    compile_knowledge_base(edited, store.path)
+    knowledge_base, version = store.snapshot()
+    assert version == content_hash(edited)
+    assert "extra_topic" in knowledge_base
+
+
+def test_truncated_file_is_a_format_error(store):
+    good = open(store.path, "rb").read()
+    replace_file(store.path, good[:len(good) // 2])
+    with pytest.raises(KnowledgeBaseFormatError):
+        MappedKnowledgeBase(store.path)
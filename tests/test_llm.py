@@ -0,0 +1,130 @@
+"""Streaming tutor behaviour against the in-process stand-in model server"""
+
+import asyncio
+import json
+import threading
+import time
+
+import pytest
+
+from study_tool.engine import get_default_engine
+from study_tool.llm import COMPLETIONS_PATH, ChatCompletionsBackend, StandInServer, StreamingTutor, _chunk
+
+QUESTION = "What is the law of demand?"
+FALLBACK = "Rule-based answer"
+
+
+class FailingServer(StandInServer):
+    """Streams one token, then reports an error in the event stream"""
+
+    async def _complete(self, writer, request):
+        self.requests += 1
+        writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\n"
+                     b"Transfer-Encoding: chunked\r\n\r\n")
+        event = {"choices": [{"index": 0, "delta": {"content": "Demand "}}]}
+        writer.write(_chunk(b"data: " + json.dumps(event).encode("utf-8") + b"\n\n"))
+        await writer.drain()
+        await asyncio.sleep(0.05)
+        writer.write(_chunk(b'data: {"error": "model overloaded"}\n\n') + b"0\r\n\r\n")
+
+
+def serve(server):
+    """Run server on its own event loop thread; returns (url, stop)"""
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    asyncio.run_coroutine_threadsafe(server.start(), loop).result(5)
+
+    async def shutdown():
+        server._server.close()
+        # Drop the keep-alive connections still waiting for a next request
+        handlers = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+        for task in handlers:
+            task.cancel()
+        await asyncio.gather(*handlers, return_exceptions=True)
+
+    def stop():
+        asyncio.run_coroutine_threadsafe(shutdown(), loop).result(5)
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        loop.close()
+
+    return "http://127.0.0.1:{}{}".format(server.port, COMPLETIONS_PATH), stop
+
+
+@pytest.fixture
+def tutor_for():
+    """Build a tutor against a started server; both are shut down afterwards"""
+    cleanups = []
+
+    def make(server, **options):
+        url, stop = serve(server)
+        tutor = StreamingTutor(ChatCompletionsBackend(url), **options)
+        cleanups.extend([tutor.close, stop])
+        return tutor
+
+    yield make
+    for cleanup in cleanups:
+        cleanup()
+
+
+def on_loop(tutor, function):
+    """Call function on the tutor's event loop thread and return its result"""
+    async def call():
+        return function()
+    return asyncio.run_coroutine_threadsafe(call(), tutor._loop).result(5)
+
+
+def test_identical_questions_share_one_upstream_call(tutor_for):
+    server = StandInServer(port=0, token_delay=0, first_token_delay=0.3)
+    tutor = tutor_for(server)
+
+    streams = [tutor.stream_answer(QUESTION, FALLBACK) for _ in range(2)]
+    threads = [threading.Thread(target=list, args=(stream,)) for stream in streams]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert server.requests == 1
+    assert on_loop(tutor, lambda: (tutor.upstream_calls, tutor.coalesced)) == (1, 1)
+    assert [stream.source for stream in streams] == ["llm", "llm"]
+    assert streams[0].text == streams[1].text == get_default_engine().answer(QUESTION)
+
+
+def test_first_token_timeout_falls_back_to_the_rules(tutor_for):
+    server = StandInServer(port=0, token_delay=0, first_token_delay=1.0)
+    tutor = tutor_for(server, first_token_timeout=0.1)
+
+    stream = tutor.stream_answer(QUESTION, FALLBACK)
+    assert list(stream) == [FALLBACK]
+    assert stream.source == "fallback"
+    assert "No answer" in str(stream.error)
+
+
+def test_server_error_mid_stream_falls_back_to_the_rules(tutor_for):
+    tutor = tutor_for(FailingServer(port=0))
+
+    stream = tutor.stream_answer(QUESTION, FALLBACK)
+    # The token that did arrive was streamed; the answer to keep is the fallback
+    assert list(stream) == ["Demand "]
+    assert stream.source == "fallback"
+    assert stream.text == FALLBACK
+    assert "model overloaded" in str(stream.error)
+
+
+def test_last_listener_leaving_cancels_the_flight(tutor_for):
+    server = StandInServer(port=0, token_delay=1.0, first_token_delay=0)
+    tutor = tutor_for(server)
+
+    stream = tutor.stream_answer(QUESTION, FALLBACK)
+    tokens = iter(stream)
+    next(tokens)
+    [flight] = on_loop(tutor, lambda: list(tutor._flights.values()))
+    tokens.close()
+
+    deadline = time.monotonic() + 5
+    while not on_loop(tutor, flight.task.done) and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert on_loop(tutor, flight.task.cancelled)
+    assert on_loop(tutor, lambda: tutor._flights) == {}
@@ -0,0 +1,106 @@
+"""Semantic search on phrasings that were not used to write TOPIC_PARAPHRASES"""
+
+import pytest
+
+from study_tool import AnswerEngine, ECONOMICS_KNOWLEDGE_BASE, semantic
+from study_tool.knowledge_base import FALLBACK_RESPONSE, TOPIC_PARAPHRASES
+from study_tool.semantic import HashedNgramEmbedder, build_semantic_index
+
+# Questions that describe a topic without naming it; kept out of TOPIC_PARAPHRASES
+HELD_OUT = {
+    "demand": ["why do people buy less when things get pricier",
+               "do people order fewer takeaways when the menu gets more expensive",
+               "why do customers want more of a product when it is cheaper"],
+    "supply": ["do producers sell more when the price they get goes up",
+               "why do sellers bring more to market at higher prices"],
+    "equilibrium": ["what price leaves no shortage and no surplus",
+                    "when does the amount bought equal the amount sold"],
+    "elasticity": ["how sensitive are shoppers to a price rise",
+                   "do sales drop a lot when the price goes up"],
+    "consumer_behavior": ["why does each extra cookie give less enjoyment",
+                          "how do shoppers get the most satisfaction from their money"],
+    "production": ["how much more output does another worker add",
+                   "how are raw materials and labour turned into goods"],
+    "costs": ["which business expenses stay the same however much is made",
+              "what does it cost to make one more unit"],
+    "market_structures": ["what is it called when one company controls the whole market",
+                          "what happens when a few big firms dominate"],
+}
+
+# Hashed n-grams only match spellings, so a fraction of paraphrases is still missed
+MIN_RECALL = 0.7
+# ...but no topic may lose most of its phrasings to a neighbouring one
+MIN_TOPIC_RECALL = 0.5
+
+OFF_TOPIC = [
+    "what is gdp",
+    "who wrote hamlet",
+    "how do vaccines work",
+    "explain the french revolution",
+    "what is the boiling point of water",
+    "how far away is the moon",
+    "who invented the telephone",
+    "how do plants grow",
+    "what language is spoken in brazil",
+    "how do airplanes fly",
+    "when did world war two end",
+]
+
+
+@pytest.fixture(scope="module", params=["semantic", "hybrid"])
+def engine(request):
+    return AnswerEngine(ECONOMICS_KNOWLEDGE_BASE, search_mode=request.param)
+
+
+def test_held_out_questions_are_not_paraphrases():
+    paraphrases = {text for texts in TOPIC_PARAPHRASES.values() for text in texts}
+    assert not paraphrases & {question for questions in HELD_OUT.values() for question in questions}
+
+
+def test_held_out_phrasings_find_their_topic(engine):
+    cases = [(topic, question) for topic, questions in HELD_OUT.items() for question in questions]
+    missed = [(topic, question, engine.answer_with_topic(question)[1]) for topic, question in cases
+              if engine.answer_with_topic(question)[1] != topic]
+    assert len(missed) <= (1 - MIN_RECALL) * len(cases), missed
+
+
+@pytest.mark.parametrize("topic", sorted(HELD_OUT))
+def test_every_topic_keeps_its_recall(engine, topic):
+    questions = HELD_OUT[topic]
+    missed = [(question, engine.answer_with_topic(question)[1]) for question in questions
+              if engine.answer_with_topic(question)[1] != topic]
+    assert len(missed) <= (1 - MIN_TOPIC_RECALL) * len(questions), missed
+
+
+@pytest.mark.parametrize("question", [
+    "why do people buy less when things get pricier",
+    # "product" only hints at production; the paraphrase match is about demand
+    "why do customers want more of a product when it is cheaper",
+])
+def test_buying_less_at_higher_prices_is_demand(engine, question):
+    assert engine.answer_with_topic(question)[1] == "demand"
+
+
+@pytest.mark.parametrize("question", OFF_TOPIC)
+def test_off_topic_questions_fall_back(engine, question):
+    assert engine.answer_with_topic(question) == (FALLBACK_RESPONSE, "fallback")
+
+
+def test_cached_word_vectors_are_not_modified():
+    embedder = HashedNgramEmbedder()
+    first = embedder.embed("price of bread").copy()
+    # Word vectors are cached and shared, so embedding must not modify them
+    embedder.embed("bread bread bread")
+    assert (embedder.embed("price of bread") == first).all()
+
+
+@pytest.mark.parametrize("max_word_score_passages", [0, semantic.MAX_WORD_SCORE_PASSAGES])
+def test_summed_word_scores_match_the_embedding(monkeypatch, max_word_score_passages):
+    monkeypatch.setattr(semantic, "MAX_WORD_SCORE_PASSAGES", max_word_score_passages)
+    index = build_semantic_index(ECONOMICS_KNOWLEDGE_BASE)
+    question = "why do people buy less when things get pricier pricier"
+    expected = (index.matrix @ index.embedder.embed(question)).tolist()
+    # Per-word scores are cached and shared, so a second pass checks summing left them alone
+    for _ in range(2):
+        scores, norm = index.score_words(question.split())
+        assert (scores / norm).tolist() == pytest.approx(expected, abs=1e-6)
@@ -0,0 +1,38 @@
+"""Engine snapshots are used only when they were built from the same inputs"""
+
+import pytest
+
+from study_tool import engine, search, semantic, spelling
+from study_tool.knowledge_base import ECONOMICS_KNOWLEDGE_BASE
+from study_tool.snapshot import load_engine, write_snapshot
+
+
+@pytest.fixture
+def snapshot_path(tmp_path):
+    path = str(tmp_path / "engine_snapshot.bin")
+    write_snapshot(load_engine(ECONOMICS_KNOWLEDGE_BASE, path=None, search_mode="hybrid"), path)
+    return path
+
+
+def test_matching_snapshot_is_loaded(snapshot_path):
+    loaded = load_engine(ECONOMICS_KNOWLEDGE_BASE, path=snapshot_path, search_mode="hybrid")
+    assert loaded.startup["source"] == "snapshot"
+    built = load_engine(ECONOMICS_KNOWLEDGE_BASE, path=None, search_mode="hybrid")
+    question = "why do people buy less when prices go up?"
+    assert loaded.answer_with_topic(question) == built.answer_with_topic(question)
+
+
+@pytest.mark.parametrize("module, name, value", [
+    (engine, "SEMANTIC_DIMENSIONS", 64),
+    (spelling, "COMMON_WORDS", spelling.COMMON_WORDS | {"demend"}),
+    (spelling, "MIN_TWO_EDIT_LENGTH", 9),
+    (spelling, "MIN_WORD_LENGTH", 5),
+    (search, "FIELD_WEIGHTS", {"keywords": 2.0, "body": 1.0}),
+    (search, "BM25_K1", 1.5),
+    (semantic, "WORD_WEIGHT", 1.0),
+    (semantic, "MAX_WORD_SCORE_PASSAGES", 0),
+])
+def test_changed_index_settings_rebuild(snapshot_path, monkeypatch, module, name, value):
+    monkeypatch.setattr(module, name, value)
+    loaded = load_engine(ECONOMICS_KNOWLEDGE_BASE, path=snapshot_path, search_mode="hybrid")
+    assert loaded.startup["source"] == "built"
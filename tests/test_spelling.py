@@ -0,0 +1,50 @@
+"""Spelling correction: typos of economics terms are fixed, ordinary words are left alone"""
+
+import pytest
+
+from study_tool import AnswerEngine, ECONOMICS_KNOWLEDGE_BASE
+from study_tool.search import normalize_token
+
+
+@pytest.fixture(scope="module")
+def engine():
+    return AnswerEngine(ECONOMICS_KNOWLEDGE_BASE, search_mode="keyword")
+
+
+@pytest.mark.parametrize("typo, term", [
+    ("elastisity", "elasticity"),
+    ("equilibruim", "equilibrium"),
+    ("monopolly", "monopoly"),
+    ("suply", "supply"),
+    ("demnad", "demand"),
+    ("oligoply", "oligopoly"),
+    ("utilty", "utility"),
+    ("competiton", "competition"),
+    ("markt", "market"),
+    ("consumr", "consumer"),
+    ("compitetion", "competition"),
+])
+def test_typos_are_corrected(engine, typo, term):
+    assert engine.spelling.correct([normalize_token(typo)]) == [(normalize_token(typo), term)]
+
+
+@pytest.mark.parametrize("word", [
+    "pricier", "surplus", "selling", "costly", "perfectly", "most", "lost", "consider",
+    "depend", "target", "printing", "marked", "plastic", "structured", "reduction",
+])
+def test_ordinary_words_are_not_corrected(engine, word):
+    assert engine.spelling.correct([normalize_token(word)]) == []
+
+
+def test_note_shows_the_word_as_typed(engine):
+    answer = engine.compose_answer("What is a Suply curve and a surplus?")
+    assert answer.startswith("🔤 Corrected spelling: *Suply* → **supply**\n\n")
+
+
+def test_correctly_spelled_questions_skip_the_lookup(engine, monkeypatch):
+    def fail(words):
+        raise AssertionError("looked up {}".format(words))
+
+    monkeypatch.setattr(engine.spelling, "correct", fail)
+    question = "What are the main factors behind demand curves and fixed costs?"
+    assert engine.correct_spelling(question) == (question, [])
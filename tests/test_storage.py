@@ -0,0 +1,47 @@
+"""Background writes of the session store"""
+
+import logging
+
+import pytest
+
+from study_tool.history import ChatHistory
+from study_tool.storage import SessionStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = SessionStore(str(tmp_path / "study_tool.db"))
+    yield store
+    store.close()
+
+
+def test_history_pages_include_writes_still_queued(store):
+    history = ChatHistory(max_messages=4, store=store, student_id="ana")
+    for turn in range(10):
+        history.append("user", "question {}".format(turn), timestamp=turn)
+    store.add_message("ben", "user", "someone else's question", 0)
+
+    assert [message.content for message in history.window(0, 10)] == ["question {}".format(turn)
+                                                                      for turn in range(10)]
+
+
+def test_flushing_one_student_commits_their_writes(store):
+    store.add_message("ana", "user", "hello", 1)
+    store.flush("ana")
+    assert store.load_messages("ana", 0, 10) == [("user", "hello", 1)]
+    # Nothing pending: returns without a round trip to the writer
+    store.flush("ben")
+
+
+def test_failed_batch_is_logged_and_counted(store, caplog):
+    with caplog.at_level(logging.ERROR, logger="study_tool.storage"):
+        # content is NOT NULL, so the batch fails to commit
+        store.add_message("ana", "user", None, 1)
+        store.flush("ana")
+    assert store.failed_writes == 1
+    assert store.last_error is not None
+    assert "Lost 1 writes" in caplog.text
+
+    store.add_message("ana", "user", "hello", 2)
+    store.flush("ana")
+    assert store.count_messages("ana") == 1